@@ -0,0 +1,85 @@
+import threading
+from contextlib import contextmanager
+
+from ATE.cmw.consts import CmwChannels, CmwRFPaths
+
+
+class CmwChannelLease(object):
+    '''
+    A signaling channel of the CMW and its RF path, owned by a single UUT until it is released.
+    '''
+
+    def __init__(self, channel, rx_connector, rx_converter, tx_connector, tx_converter, owner):
+        self.channel = channel
+        self.rx_connector = rx_connector
+        self.rx_converter = rx_converter
+        self.tx_connector = tx_connector
+        self.tx_converter = tx_converter
+        self.owner = owner
+
+    def __repr__(self):
+        return "CmwChannelLease(channel={}, route={}/{}/{}/{}, owner={})".format(self.channel, self.rx_connector, self.rx_converter, self.tx_connector, self.tx_converter, self.owner)
+
+
+class CmwChannelLeaseManager(object):
+    '''
+    Assigns every UUT its own signaling channel and RF path, so up to four UUTs can be tested on one CMW at the same time.
+    '''
+    DEFAULT_ROUTES = {CmwChannels.CMW_CH1: (CmwRFPaths.RF1_COM, CmwRFPaths.RX1_CONVERTER, CmwRFPaths.RF1_COM, CmwRFPaths.TX1_CONVERTER),
+                      CmwChannels.CMW_CH2: (CmwRFPaths.RF2_COM, CmwRFPaths.RX2_CONVERTER, CmwRFPaths.RF2_COM, CmwRFPaths.TX2_CONVERTER),
+                      CmwChannels.CMW_CH3: (CmwRFPaths.RF3_COM, CmwRFPaths.RX3_CONVERTER, CmwRFPaths.RF3_COM, CmwRFPaths.TX3_CONVERTER),
+                      CmwChannels.CMW_CH4: (CmwRFPaths.RF4_COM, CmwRFPaths.RX4_CONVERTER, CmwRFPaths.RF4_COM, CmwRFPaths.TX4_CONVERTER)}
+
+    def __init__(self, routes = None):
+        '''
+        @param routes(dict): signaling channel -> (rx connector, rx converter, tx connector, tx converter), the default is a connector per channel
+        '''
+        self.routes = dict(routes or self.DEFAULT_ROUTES)
+        self._leases = {}
+        self._condition = threading.Condition()
+
+    @property
+    def active_count(self):
+        with self._condition:
+            return len(self._leases)
+
+    def acquire(self, owner, channel = None, timeout = None):
+        '''
+        Leases a free signaling channel, blocks until one is released if all of them are leased.
+        @param owner: the lease owner - for example the UUT serial port
+        @param channel(CmwChannels): a specific channel to lease, None for any free channel
+        @param timeout: timeout in seconds, None to wait forever
+        @raise ChannelLeaseException: in case no channel was released during the timeout
+        @return(CmwChannelLease): the lease
+        '''
+        if channel is not None and channel not in self.routes:
+            raise ChannelLeaseException("Channel {} has no RF route - the routed channels are {}".format(channel, sorted(self.routes)))
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._free_channel(channel) is not None, timeout):
+                raise ChannelLeaseException("No free signaling channel for {} after {} seconds, leased channels: {}".format(owner, timeout, sorted(self._leases)))
+            leased_channel = self._free_channel(channel)
+            lease = CmwChannelLease(leased_channel, *self.routes[leased_channel], owner = owner)
+            self._leases[leased_channel] = lease
+            return lease
+
+    def release(self, lease):
+        with self._condition:
+            if self._leases.get(lease.channel) is lease:
+                del self._leases[lease.channel]
+                self._condition.notify_all()
+
+    @contextmanager
+    def lease(self, owner, channel = None, timeout = None):
+        lease = self.acquire(owner, channel, timeout)
+        try:
+            yield lease
+        finally:
+            self.release(lease)
+
+    def _free_channel(self, channel):
+        candidates = [channel] if channel is not None else sorted(self.routes)
+        return next((candidate for candidate in candidates if candidate not in self._leases), None)
+
+
+class ChannelLeaseException(Exception):
+    pass
@@ -0,0 +1,51 @@
+from ATE.cmw.consts import CmwChannels, CmwStates, CmwRFPaths, CmwAttDirections, CmwWLANStandards, CmwWLANSecurityModes, CmwWLANIPTypes, \
+    CmwRMCdomains, CmwWLANOperationMode
+from utils.connections.scpiCommand import CsvList, CsvTuple, Enum, Float, Int, QuotedText, ScpiCommand, ScpiQuery, ScpiSetting, Text
+
+CHANNEL = Enum(CmwChannels.supported_channels, "Channel")
+INTERFACE = Text() # the signaling application - WLAN etc.
+RF_PATH = Enum(CmwRFPaths.supported_rf_paths, "RF Paths")
+STATE = Enum(CmwStates.supported_states, "State")
+
+
+class CmwCommands():
+    '''
+    The commands of every CMW signaling application, the application (interface_name) is their first argument.
+    '''
+    IDENTITY = ScpiQuery("*IDN?")
+    PRESET = ScpiCommand("SYST:PRES:ALL")
+    SCENARIO = ScpiSetting("ROUT:{}:SIGN{}:SCEN:SCEL", CsvTuple(RF_PATH, RF_PATH, RF_PATH, RF_PATH), (INTERFACE, CHANNEL),
+                           title = "Standard Cell Scenario at signaling ch{1}") # rx connector, rx converter, tx connector, tx converter
+    EXT_ATTENUATION = ScpiSetting("CONF:{}:SIGN{}:RFS:EATT:{}", Float(), (INTERFACE, CHANNEL, Enum(CmwAttDirections.supported_att_directions, "Direction")),
+                                  title = "{2} attenuation at signaling ch{1}", tolerance = 0.05)
+    CHANNEL_STATE = ScpiCommand("SOUR:{}:SIGN{}:STAT {}", (INTERFACE, CHANNEL, STATE))
+    QUERY_CHANNEL_STATE = ScpiQuery("SOUR:{}:SIGN{}:STAT?", (INTERFACE, CHANNEL), CsvList(Text())) # the state, followed by the details of some applications
+
+
+class CmwWLANCommands():
+    '''
+    The commands of the CMW WLAN signaling application.
+    '''
+    SECURITY = ScpiSetting("CONF:WLAN:SIGN{}:CONN:SEC:TYPE", CsvTuple(Enum(CmwWLANSecurityModes.supported_wlan_security_modes, "Security mode"), QuotedText()),
+                           (CHANNEL,), title = "WLAN security and password at signaling ch{}", cached = False) # the mode and the last digit of the password
+    SSID = ScpiSetting("CONF:WLAN:SIGN{}:CONN:SSID", QuotedText(), (CHANNEL,), title = "SSID at signaling ch{}", cached = False)
+    STANDARD = ScpiSetting("CONF:WLAN:SIGN{}:CONN:STAN", Enum(CmwWLANStandards.supported_wlan_standards, "WLAN Standard"), (CHANNEL,),
+                           title = "WLAN Standard at signaling ch{}")
+    OPERATION_MODE = ScpiSetting("CONF:WLAN:SIGN{}:CONN:OMOD", Enum(CmwWLANOperationMode.supported_wlan_operation_modes, "Operation Mode"), (CHANNEL,),
+                                 title = "Operation mode at signaling ch{}", cached = False)
+    BROADCAST_CHANNEL = ScpiSetting("CONF:WLAN:SIGN{}:RFS:CHAN", Int(), (CHANNEL,), title = "WLAN broadcast channel at signaling ch{}")
+    FREQUENCY = ScpiSetting("CONF:WLAN:SIGN{}:RFS:FREQ", Float(), (CHANNEL,), title = "Frequency at signaling ch{}", cached = False)
+    AP_POWER = ScpiSetting("CONF:WLAN:SIGN{}:RFS:BOP", Float(), (CHANNEL,), title = "AP Power at signaling ch{}")
+    EPEP_POWER = ScpiCommand("CONF:WLAN:SIGN{}:RFS:EPEP {}", (CHANNEL, Float()))
+    APPROXIMATE_RX_BURST_POWER = ScpiQuery("SENS:WLAN:SIGN{}:UES:ARXB?", (CHANNEL,), Float())
+    CLIENT_RX_BURST_POWER = ScpiQuery("SENS:WLAN:SIGN{}:UES:RXBP?", (CHANNEL,), Float())
+    CLIENT_IP_ADDRESS = ScpiQuery("SENS:WLAN:SIGN{}:UES:UEAD:{}?", (CHANNEL, Enum(CmwWLANIPTypes.supported_ip_types, "Ip Type")), QuotedText())
+    CLIENT_MAC_ADDRESS = ScpiQuery("SENS:WLAN:SIGN{}:UEC:MAC:ADDR?", (CHANNEL,), QuotedText())
+    CLIENT_STATE = ScpiQuery("FETC:WLAN:SIGN{}:{}W:STAT?", (CHANNEL, Enum(CmwRMCdomains.supported_rmc_domains, "Domain")))
+    DISCONNECT = ScpiCommand("CALL:WLAN:SIGN{}:ACT:DISC", (CHANNEL,))
+    EVENT_LOG = ScpiQuery("SENS:WLAN:SIGN{}:ELOG:ALL?", (CHANNEL,), CsvList(QuotedText()))
+    PER_PACKETS = ScpiSetting("CONF:WLAN:SIGN{}:PER:PACK", Int(), (CHANNEL,), title = "Packets at signaling ch{}", cached = False)
+    PER_START = ScpiCommand("INIT:WLAN:SIGN{}:PER", (CHANNEL,))
+    PER_ABORT = ScpiCommand("ABORT:WLAN:SIGN{}:PER", (CHANNEL,))
+    PER_STATE = ScpiQuery("FETC:WLAN:SIGN{}:PER:STAT:ALL?", (CHANNEL,))
+    PER = ScpiQuery("FETC:WLAN:SIGN{}:PER?", (CHANNEL,), CsvTuple(Text(), Float(), Int(), minimum = 2)) # reliability, PER [%], sent packets (not reported by every firmware)
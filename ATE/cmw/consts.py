@@ -76,6 +76,13 @@ class CmwWLANChannels():
     
     supported_wlan_channels = range(1,197)
 
+class CmwWLANBands():
+    BAND_2_4GHZ = "2.4GHz"
+    BAND_5GHZ = "5GHz"
+    MAX_2_4GHZ_CHANNEL = 14
+
+    supported_bands = [BAND_2_4GHZ, BAND_5GHZ]
+
 class CmwWLANOperationMode():
     ACCESS_POINT = "AP"
     STATION = "STAT"
@@ -113,3 +120,10 @@ class CmwWLANIPTypes():
     IPV4 = "IPV4"
     
     supported_ip_types = [IPV6, IPV4]
+
+class CmwSensitivitySearchStrategies():
+    LINEAR = "LINEAR" #step down by the deviation until the PER threshold is crossed
+    BISECTION = "BISECTION" #halve the power window on every PER run
+    GOLDEN_SECTION = "GOLDEN" #split the power window at the golden ratio, biased towards the start power
+
+    supported_search_strategies = [LINEAR, BISECTION, GOLDEN_SECTION]
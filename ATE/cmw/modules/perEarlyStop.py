@@ -0,0 +1,107 @@
+
+import math
+
+
+class PEREarlyStopSettings(object):
+    '''
+    Settings of the sequential probability ratio test (SPRT) that stops a PER run as soon as its pass/fail decision is clear.
+    The PER threshold is widened to an indifference region [threshold * (1 - indifference) : threshold * (1 + indifference)],
+    a PER inside this region may be judged either way.
+    '''
+
+    def __init__(self, false_fail_rate = 0.01, false_pass_rate = 0.01, indifference = 0.25, min_packets = 50, poll_interval = 0.5):
+        '''
+        @param false_fail_rate(float): alpha - the probability to fail a client that its PER is below the indifference region
+        @param false_pass_rate(float): beta - the probability to pass a client that its PER is above the indifference region
+        @param indifference(float): the relative half width of the indifference region around the PER threshold
+        @param min_packets(int): no decision is taken before this amount of packets were sent
+        @param poll_interval(float): the delay in seconds between two intermediate PER fetches
+        '''
+        if not (0 < false_fail_rate < 0.5 and 0 < false_pass_rate < 0.5):
+            raise ValueError("The SPRT error rates must be between 0 and 0.5, got alpha = {}, beta = {}".format(false_fail_rate, false_pass_rate))
+        if not 0 < indifference < 1:
+            raise ValueError("The SPRT indifference must be between 0 and 1, got {}".format(indifference))
+        self.false_fail_rate = false_fail_rate
+        self.false_pass_rate = false_pass_rate
+        self.indifference = indifference
+        self.min_packets = min_packets
+        self.poll_interval = poll_interval
+
+    @property
+    def confidence(self):
+        return 1 - max(self.false_fail_rate, self.false_pass_rate)
+
+    def __repr__(self):
+        return "PEREarlyStopSettings(false_fail_rate={}, false_pass_rate={}, indifference={}, min_packets={})".format(
+            self.false_fail_rate, self.false_pass_rate, self.indifference, self.min_packets)
+
+
+class PERResult(object):
+    '''
+    The outcome of a single PER run.
+    '''
+
+    def __init__(self, per, packets_sent, packets_amount, PER_threshold, is_failed, early_stopped = False, settings = None):
+        '''
+        @param per(float): the measured PER in percents
+        @param packets_sent(int): the amount of packets that were sent until the run ended
+        @param packets_amount(int): the amount of packets the run was configured to
+        @param PER_threshold(float): the PER threshold in percents
+        @param is_failed(bool): True if the PER threshold was crossed
+        @param early_stopped(bool): True if the run was aborted by the sequential test
+        @param settings(PEREarlyStopSettings): the early stop settings, None for a full run
+        '''
+        self.per = per
+        self.packets_sent = packets_sent
+        self.packets_amount = packets_amount
+        self.PER_threshold = PER_threshold
+        self.is_failed = is_failed
+        self.early_stopped = early_stopped
+        self.settings = settings
+
+    @property
+    def packets_saved(self):
+        if self.packets_sent is None:
+            return 0
+        return max(self.packets_amount - self.packets_sent, 0)
+
+    def __repr__(self):
+        return "PERResult(per={}, packets_sent={}/{}, is_failed={}, early_stopped={}, settings={})".format(
+            self.per, self.packets_sent, self.packets_amount, self.is_failed, self.early_stopped, self.settings)
+
+
+class SequentialPERTest(object):
+    '''
+    Wald's sequential probability ratio test on the packet errors of a PER run.
+    H0: PER = threshold * (1 - indifference) (pass), H1: PER = threshold * (1 + indifference) (fail).
+    '''
+
+    def __init__(self, PER_threshold, settings):
+        '''
+        @param PER_threshold(float): the PER threshold in percents
+        @param settings(PEREarlyStopSettings): the test settings
+        '''
+        self.settings = settings
+        pass_rate = min(PER_threshold * (1 - settings.indifference) / 100.0, 1.0 - 1e-9)
+        fail_rate = min(PER_threshold * (1 + settings.indifference) / 100.0, 1.0 - 1e-9)
+        self._error_weight = math.log(fail_rate / pass_rate)
+        self._success_weight = math.log((1 - fail_rate) / (1 - pass_rate))
+        self._fail_bound = math.log((1 - settings.false_pass_rate) / settings.false_fail_rate)
+        self._pass_bound = math.log(settings.false_pass_rate / (1 - settings.false_fail_rate))
+
+    def decide(self, per, packets_sent):
+        '''
+        @param per(float): the intermediate PER in percents
+        @param packets_sent(int): the amount of packets the intermediate PER was measured on
+        @return: True - the threshold is crossed, False - the threshold is not crossed, None - there is no decision yet
+        '''
+        if packets_sent is None or packets_sent < self.settings.min_packets:
+            return None
+        errors = round(per * packets_sent / 100.0)
+        log_likelihood_ratio = errors * self._error_weight + (packets_sent - errors) * self._success_weight
+        if log_likelihood_ratio >= self._fail_bound:
+            return True
+        if log_likelihood_ratio <= self._pass_bound:
+            return False
+        return None
+
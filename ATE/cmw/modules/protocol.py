@@ -1,24 +1,55 @@
 
 
+import threading
 import time
+from contextlib import contextmanager
 from utils.validation import Validation
+from ATE.cmw.commands import CmwCommands
 from ATE.cmw.consts import CmwChannels, CmwStates, CmwRFPaths, CmwAttDirections, CmwAttValues
+from utils.stationLogging import get_logger
 
 
 class CmwProtocol(object):
 
-    def __init__(self, connection, port_name):
+    def __init__(self, connection, port_name, channel_leases = None):
         self.connection = connection
         self.port_name = port_name
+        self.channel_leases = channel_leases
+        self.logger = get_logger('cmw500.{}'.format(type(self).__name__.lower()), port_name)
+        self._unleased_channels = 0
+        self._unleased_channels_lock = threading.Lock()
         self.check_identity()
 
+    def _is_connection_shared(self):
+        '''
+        True while more than one signaling channel is driven - leased, or run concurrently without a lease (see _driving_channels).
+        *OPC and SRQ are instrument wide, so completion is polled per channel.
+        '''
+        leased = self.channel_leases.active_count if self.channel_leases is not None else 0
+        with self._unleased_channels_lock:
+            return leased + self._unleased_channels > 1
+
+    @contextmanager
+    def _driving_channels(self, channels):
+        '''
+        Counts the channels of the block as driven at the same time, for the callers that didnt lease them.
+        @param channels: the amount of signaling channels
+        '''
+        with self._unleased_channels_lock:
+            self._unleased_channels += channels
+        try:
+            yield
+        finally:
+            with self._unleased_channels_lock:
+                self._unleased_channels -= channels
+
     def check_identity(self, spectrum_name = "Rohde&Schwarz,CMW"):
-        self.print_to_log('Checking CMW Identity')
-        ans = self.connection.send_receive('*IDN?\r\n')
+        self.logger.info('Checking CMW Identity')
+        ans = CmwCommands.IDENTITY.query(self.connection)
         if ans.__contains__(spectrum_name):
-            self.print_to_log('{} Found and connected properly!')
+            self.logger.info('%s Found and connected properly!', spectrum_name)
         else:
-            self.print_to_log('{} didnt Found!'.format(spectrum_name))
+            self.logger.error('%s didnt Found!', spectrum_name)
             raise CMWNotFound('{} didnt Found!'.format(spectrum_name))
 
     def _wait_for_state(self, state, command, success_msg, failure_msg, delay, timeout):
@@ -27,22 +58,22 @@ class CmwProtocol(object):
         @param trigger: represents the stop trigger - when it accoures, the while will end. 
         @param command : the command that query the ATE in order to check the wanted trigger 
         @param success msg : the msg that will be printed at the log when success. 
-        @param failure msg : the msg that will be printed at the log when failure. 
+        @param failure msg : the msg of the raised exception when failure - not logged, the callers log it if the failure is an error. 
         @param delay : the delay between every loop. 
-        @raise timeout: the time limit for all while procedure.  
+        @raise timeout: the time limit for all while procedure - the state is checked at least once, even with no time left.  
         @return: No return value
         '''
         start = time.time()
-        while time.time() - start < timeout:
+        while True:
             ans = (self.connection.send_receive(command)).rstrip()
             if ans == state :
-                self.print_to_log(success_msg)
+                self.logger.info(success_msg)
+                return
+            if time.time() - start >= timeout:
                 break
-            else:
-                time.sleep(delay)
-        else:
-            self.print_to_log(failure_msg)
-            raise Exception(self._format_msg(failure_msg))
+            self.logger.debug('%s answered %s, waiting for %s', command, ans, state)
+            time.sleep(delay)
+        raise Exception(self._format_msg(failure_msg))
         
     def is_rf_on(self, channel):
         '''
@@ -54,11 +85,10 @@ class CmwProtocol(object):
         @return: 
         '''
         Validation.validate_elements_in_list("Channel",channel, CmwChannels.supported_channels)
-        self.print_to_log("Getting {} signaling CH{} state".format(self.interface_name, channel))
-        ans = self.connection.send_receive(self.QUERY_IS_RF_ON.format(channel)).rstrip()
-        ans = ans.split(',')
-        self.print_to_log("{} CH{} state is {}".format(self.interface_name, channel, ans[0]))
-        return ans[0] == CmwStates.ON
+        self.logger.info("Getting %s signaling CH%s state", self.interface_name, channel)
+        state = CmwCommands.QUERY_CHANNEL_STATE.query(self.connection, self.interface_name, channel)[0]
+        self.logger.info("%s CH%s state is %s", self.interface_name, channel, state)
+        return state == CmwStates.ON
     
     def config_standard_cell_scenario(self, channel, rx_connector, rx_converter, tx_connector, tx_converter):
         '''
@@ -73,12 +103,9 @@ class CmwProtocol(object):
         '''
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
         Validation.validate_elements_in_list("RF Paths", [rx_connector, rx_converter, tx_connector, tx_converter], CmwRFPaths.supported_rf_paths)
-        self.print_to_log("Establishing Standard Cell Scenario configured to: {}, {}, {}, {}".format(rx_connector, rx_converter, tx_connector, tx_converter))
-        self.connection.send("ROUT:{}:SIGN{}:SCEN:SCEL {}, {}, {}, {}".format(self.interface_name, channel, rx_connector, rx_converter, tx_connector, tx_converter))
-        ans = str(self.connection.send_receive("ROUT:{}:SIGN{}:SCEN:SCEL?".format(self.interface_name, channel)).rstrip())
-        path_list = ans.split(',')
-        Validation.validate_elements_in_list("RF Paths", path_list, CmwRFPaths.supported_rf_paths)
-        self.print_to_log("Standard Cell Scenario configured successfully to: {}, {}, {}, {}".format(path_list[0], path_list[1], path_list[2], path_list[3]))
+        self.logger.info("Establishing Standard Cell Scenario configured to: %s, %s, %s, %s", rx_connector, rx_converter, tx_connector, tx_converter)
+
+        CmwCommands.SCENARIO.set(self.connection, self.interface_name, channel, (rx_connector, rx_converter, tx_connector, tx_converter))
 
     def set_ext_attenuation(self, channel, attenuation, direction, tolerance = 0.05):
         '''
@@ -91,11 +118,10 @@ class CmwProtocol(object):
         '''
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
         Validation.validate_elements_in_list("Direction", direction, CmwAttDirections.supported_att_directions)
-        Validation.validate_limits_min_max(attenuation, CmwAttValues.MIN_ATT, CmwAttValues.MAX_ATT, float)
-        self.print_to_log("Configuring {}DB {} attenuation to sign channel{}".format(attenuation , direction, channel))
-        self.connection.send(self.CMD_SET_EXT_ATTENUATION.format(self.interface_name, channel, direction, attenuation))
-        ans = self.connection.send_receive(self.QUERY_SET_EXT_ATTENUATION.format(self.interface_name, channel, direction))
-        Validation.validate_limits_abs_tolerance(ans, attenuation, tolerance, float)
+        Validation.validate_limits_min_max(attenuation, CmwAttValues.MIN_ATT, CmwAttValues.MAX_ATT,
+                                           "External attenuation {} is out of [{}, {}]".format(attenuation, CmwAttValues.MIN_ATT, CmwAttValues.MAX_ATT))
+        self.logger.info("Configuring %sDB %s attenuation to sign channel%s", attenuation, direction, channel)
+        CmwCommands.EXT_ATTENUATION.set(self.connection, self.interface_name, channel, direction, attenuation, tolerance = tolerance)
         
     def set_channel_state(self, channel, state, timeout = 30):
         '''
@@ -108,12 +134,19 @@ class CmwProtocol(object):
         '''
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
         Validation.validate_elements_in_list("State", state, CmwStates.supported_states)
-        self.print_to_log("Establishing {} CH{} set to {}".format(self.interface_name ,channel, state))
-        self.connection.send(self.CMD_SET_CHANNEL_STATE.format(self.interface_name, channel, state))
-        self._wait_for_state(state, self.QUERY_SET_CHANNEL_STATE.format(self.interface_name, channel), "{} CH{} set to {} successfully".format(self.interface_name, channel, state), "Failed to set {} signaling channel {} to {} - didnt succeded the turn on!".format(self.interface_name, channel, state), 0.1, timeout)
-
-    def print_to_log(self, msg):
-        print(self._format_msg(msg))
+        self.logger.info("Establishing %s CH%s set to %s", self.interface_name, channel, state)
+        start = time.time()
+        if self._is_connection_shared():
+            CmwCommands.CHANNEL_STATE.send(self.connection, self.interface_name, channel, state)
+        else:
+            self.connection.wait_for_operation_complete(CmwCommands.CHANNEL_STATE.format(self.interface_name, channel, state), timeout)
+        failure_msg = "Failed to set {} signaling channel {} to {} - didnt succeded the turn on!".format(self.interface_name, channel, state)
+        # once *OPC fired the first state query confirms it, otherwise the state is polled for the rest of the timeout
+        try:
+            self._wait_for_state(state, CmwCommands.QUERY_CHANNEL_STATE.format(self.interface_name, channel), "{} CH{} set to {} successfully".format(self.interface_name, channel, state), failure_msg, 0.1, timeout - (time.time() - start))
+        except Exception:
+            self.logger.error(failure_msg)
+            raise
 
     def _format_msg(self, msg):
         return 'Rohde&Schwartz CMW500({}) : {}'.format(self.port_name, msg)
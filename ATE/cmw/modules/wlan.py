@@ -1,24 +1,29 @@
 
+import math
 import time
+from concurrent.futures import ThreadPoolExecutor
 
+from ATE.cmw.commands import CmwWLANCommands
 from ATE.cmw.consts import CmwChannels, CmwWLANSecurityModes, CmwWLANIPTypes, CmwWLANChannels, CmwWLANStandards, \
     CmwWLANAPPower, CmwRMCdomains, CmwSpecialWLANMessages, CmwWLANOperationMode, CmwPowerRange, CmwRFPaths, \
-    CmwAttDirections
+    CmwSensitivitySearchStrategies
+from ATE.cmw.modules.perEarlyStop import PERResult, SequentialPERTest
 from ATE.cmw.modules.protocol import CmwProtocol
+from ATE.instrumentProfiles import WLANScenarioProfile
 from utils.validation import Validation
 
 
 class WLAN(CmwProtocol):
     
-    QUERY_IS_RF_ON = "SOUR:WLAN:SIGN{}:STAT?"
-    CMD_SET_EXT_ATTENUATION = "CONF:{}:SIGN{}:RFS:EATT:{} {}"
-    QUERY_SET_EXT_ATTENUATION = "CONF:{}:SIGN{}:RFS:EATT:{}?"
-    CMD_SET_CHANNEL_STATE = "SOUR:{}:SIGN{}:STAT {}"
-    QUERY_SET_CHANNEL_STATE = "SOUR:{}:SIGN{}:STAT?"
+    GOLDEN_SECTION_RATIO = (3 - math.sqrt(5)) / 2
+    PER_STATUS_POLL_INTERVAL = 0.1
+    PER_SHARED_STATUS_POLL_INTERVAL = 0.5
 
-    def __init__(self, connection, port_name):
-        CmwProtocol.__init__(self, connection, port_name)
+    def __init__(self, connection, port_name, channel_leases = None):
+        CmwProtocol.__init__(self, connection, port_name, channel_leases)
         self.interface_name = "WLAN"
+        self.sensitivity_search_per_runs = {}
+        self.sensitivity_search_per_results = {}
     
     def _format_msg(self, msg):
         return "CMW500 ({}) (WLAN): {}".format(self.port_name, msg)
@@ -36,13 +41,11 @@ class WLAN(CmwProtocol):
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
         Validation.validate_elements_in_list("Security last digit password", last_digit_password, range(0, 10))
         Validation.validate_elements_in_list("Security mode", security_mode, CmwWLANSecurityModes.supported_wlan_security_modes)
-        self.print_to_log("Configuring at signaling channel{} security mode to {} and last digit password to {}".format(channel, security_mode, last_digit_password))
+        self.logger.info("Configuring at signaling channel%s security mode to %s and last digit password to %s", channel, security_mode, last_digit_password)
         if not self.is_rf_on(channel):
-            self.connection.send('CONF:WLAN:SIGN{}:CONN:SEC:TYPE {}, "{}"'.format(channel, security_mode, last_digit_password))
-            ans = self.connection.send_receive("CONF:WLAN:SIGN{}:CONN:SEC:TYPE?".format(channel))
-            Validation.check_identical_value("WLAN security and password at signaling ch{}".format(channel), ans, security_mode + "," +'{}'.format(last_digit_password), str)
+            CmwWLANCommands.SECURITY.set(self.connection, channel, (security_mode, last_digit_password))
         else:
-            self.print_to_log("The Security config failed! please turn Off the RF!!")
+            self.logger.error("The Security config failed! please turn Off the RF!!")
             raise Exception("The WLAN security and password at signaling channel {} wernet been configured because the channel is ON!. please turn OFF the channel.".format(channel))
             
     def set_ssid(self, channel, ssid):
@@ -54,9 +57,8 @@ class WLAN(CmwProtocol):
         @return: No return value
         '''
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
-        self.print_to_log("Configuring WLAN CH{} SSID to {}".format(channel, ssid))
-        self.connection.send("CONF:WLAN:SIGN{}:CONN:SSID {}".format(channel, ssid))
-        Validation.check_identical_value("SSID at signaling ch{}".format(channel), self.connection.send_receive("CONF:WLAN:SIGN{}:CONN:SSID?".format(channel)), ssid, str)
+        self.logger.info("Configuring WLAN CH%s SSID to %s", channel, ssid)
+        CmwWLANCommands.SSID.set(self.connection, channel, ssid)
         
     def get_client_ipv4_address(self, channel):
         return self._get_client_ip_address(channel, CmwWLANIPTypes.IPV4)
@@ -72,14 +74,12 @@ class WLAN(CmwProtocol):
         '''
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
         Validation.validate_elements_in_list("Ip Type", ip_type, CmwWLANIPTypes.supported_ip_types)
-        self.print_to_log("Checking if the client is associated to signaling channel {}...".format(channel))
+        self.logger.info("Checking if the client is associated to signaling channel %s...", channel)
         if self.is_client_associated(channel):
-            self.print_to_log("Getting the client {} address, that associated to signaling channel{}".format(channel, ip_type))
-            value = self.connection.send_receive("SENS:WLAN:SIGN{}:UES:UEAD:{}?".format(channel, ip_type))
-            ip_addr = str(value).replace('"', "")
-            return ip_addr
+            self.logger.info("Getting the client %s address, that associated to signaling channel%s", channel, ip_type)
+            return CmwWLANCommands.CLIENT_IP_ADDRESS.query(self.connection, channel, ip_type)
         else:
-            self.print_to_log("The Client isnt associated to the WLAN AP!")
+            self.logger.info("The Client isnt associated to the WLAN AP!")
             raise Exception("The Client isnt associated!")
 
     def get_client_mac_address(self, channel):
@@ -89,14 +89,12 @@ class WLAN(CmwProtocol):
         @return: the MAC address
         '''
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
-        self.print_to_log("Checking if the client is associated to signaling channel {}...".format(channel))
+        self.logger.info("Checking if the client is associated to signaling channel %s...", channel)
         if self.is_client_associated(channel):
-            self.print_to_log("Getting the client MAC address, that associated to signaling channel{}".format(channel))
-            value = self.connection.send_receive("SENS:WLAN:SIGN{}:UEC:MAC:ADDR?".format(channel))
-            mac = str(value).replace('"', "")
-            return mac
+            self.logger.info("Getting the client MAC address, that associated to signaling channel%s", channel)
+            return CmwWLANCommands.CLIENT_MAC_ADDRESS.query(self.connection, channel)
         else:
-            self.print_to_log("The Client isnt associated to the WLAN AP!")
+            self.logger.info("The Client isnt associated to the WLAN AP!")
             raise Exception("The Client isnt associated!")
 
     def get_event_log_messages(self, channel):
@@ -106,13 +104,8 @@ class WLAN(CmwProtocol):
         @return(list): Log messgaes
         '''
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
-        self.print_to_log("Getting the event log from signaling channel{}".format(channel))
-        log = str(self.connection.send_receive("SENS:WLAN:SIGN{}:ELOG:ALL?".format(channel)).rstrip())
-        full_log = log.split(',')
-        for row in full_log:
-            if row == ("EMPT") or  ('""'):
-                full_log.remove(row)
-        return full_log
+        self.logger.info("Getting the event log from signaling channel%s", channel)
+        return [row for row in CmwWLANCommands.EVENT_LOG.query(self.connection, channel) if row not in ("EMPT", "")]
 
     def set_broadcast_channel(self, channel, wlan_broadcast_channel):
         '''
@@ -122,10 +115,10 @@ class WLAN(CmwProtocol):
         @return: No return value
         '''
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
-        Validation.validate_limits_min_max(wlan_broadcast_channel, CmwWLANChannels.WLAN_BROADCAST_CHANNEL_MIN, CmwWLANChannels.WLAN_BROADCAST_CHANNEL_MAX, int)
-        self.print_to_log("Configuring WLAN signaling channel {} broadcast wifi channel to {}".format(channel, wlan_broadcast_channel))
-        self.connection.send("CONF:WLAN:SIGN{}:RFS:CHAN {}".format(channel, wlan_broadcast_channel))
-        Validation.check_identical_value("WLAN broadcast channel at signaling ch{}".format(channel), self.connection.send_receive("CONF:WLAN:SIGN{}:RFS:CHAN?".format(channel)), wlan_broadcast_channel, str)
+        Validation.validate_limits_min_max(wlan_broadcast_channel, CmwWLANChannels.WLAN_BROADCAST_CHANNEL_MIN, CmwWLANChannels.WLAN_BROADCAST_CHANNEL_MAX,
+                                           "WLAN broadcast channel {} is out of [{}, {}]".format(wlan_broadcast_channel, CmwWLANChannels.WLAN_BROADCAST_CHANNEL_MIN, CmwWLANChannels.WLAN_BROADCAST_CHANNEL_MAX))
+        self.logger.info("Configuring WLAN signaling channel %s broadcast wifi channel to %s", channel, wlan_broadcast_channel)
+        CmwWLANCommands.BROADCAST_CHANNEL.set(self.connection, channel, wlan_broadcast_channel)
                 
     def set_stadnard(self, channel, wlan_standard):
         '''
@@ -136,9 +129,8 @@ class WLAN(CmwProtocol):
         '''
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
         Validation.validate_elements_in_list("WLAN Standard", wlan_standard, CmwWLANStandards.supported_wlan_standards)
-        self.print_to_log("configuring the WLAN Standard at signaling channel {} to {}".format(channel, wlan_standard))
-        self.connection.send("CONF:WLAN:SIGN{}:CONN:STAN {}".format(channel, wlan_standard))
-        Validation.check_identical_value("WLAN Standard at signaling ch{}".format(channel), self.connection.send_receive("CONF:WLAN:SIGN{}:CONN:STAN?".format(channel)), wlan_standard, str)
+        self.logger.info("configuring the WLAN Standard at signaling channel %s to %s", channel, wlan_standard)
+        CmwWLANCommands.STANDARD.set(self.connection, channel, wlan_standard)
         
     def set_AP_power(self, channel, power):
         '''
@@ -149,10 +141,10 @@ class WLAN(CmwProtocol):
         @return: No return value
         '''
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
-        Validation.validate_limits_min_max(power, CmwWLANAPPower.AP_POWER_MIN, CmwWLANAPPower.AP_POWER_MAX, float)
-        self.print_to_log("Setting the AP Power channel {} to {}".format(channel, power))
-        self.connection.send("CONF:WLAN:SIGN{}:RFS:BOP {}".format(channel, power))
-        Validation.check_identical_value("AP Power  at signaling ch{}".format(channel), float(self.connection.send_receive("CONF:WLAN:SIGN{}:RFS:BOP?".format(channel))), float(power), float)
+        Validation.validate_limits_min_max(power, CmwWLANAPPower.AP_POWER_MIN, CmwWLANAPPower.AP_POWER_MAX,
+                                           "AP power {} is out of [{}, {}]".format(power, CmwWLANAPPower.AP_POWER_MIN, CmwWLANAPPower.AP_POWER_MAX))
+        self.logger.info("Setting the AP Power channel %s to %s", channel, power)
+        CmwWLANCommands.AP_POWER.set(self.connection, channel, power)
     
     def set_frequency(self, channel, freq):
         '''
@@ -163,9 +155,9 @@ class WLAN(CmwProtocol):
         @return: No return value
         '''
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
-        self.connection.send("CONF:WLAN:SIGN{}:RFS:FREQ {}".format(channel, freq))
-        self.print_to_log("Setting the AP frequency channel {} to {}".format(channel, freq))
-        Validation.check_identical_value("Frequency at signaling ch{}".format(channel), self.connection.send_receive("CONF:WLAN:SIGN{}:RFS:FREQ?".format(channel)), freq, float)
+        self.logger.info("Setting the AP frequency channel %s to %s", channel, freq)
+        CmwWLANCommands.FREQUENCY.set(self.connection, channel, freq)
+        self.connection.state_cache.invalidate(self.connection.state_cache.key_of(CmwWLANCommands.BROADCAST_CHANNEL.query.format(channel)))
     
     def is_client_associated(self, channel, domain = CmwRMCdomains.PS_DOMAIN, timeout = 20):
         '''
@@ -177,12 +169,12 @@ class WLAN(CmwProtocol):
         '''
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)        
         Validation.validate_elements_in_list("Domain", domain, CmwRMCdomains.supported_rmc_domains)
-        self.print_to_log("Checking if client is associated at signaling channel {} - {} domain".format(channel, domain))
+        self.logger.info("Checking if client is associated at signaling channel %s - %s domain", channel, domain)
         try:
-            self._wait_for_state(CmwSpecialWLANMessages.CLIENT_ASSOCIATED, "FETC:WLAN:SIGN{}:{}W:STAT?".format(channel, domain), "Client is Associated!!", "Client isnt Associated at signaling channel {}, {} domain".format(channel, domain), 0.1, timeout)
+            self._wait_for_state(CmwSpecialWLANMessages.CLIENT_ASSOCIATED, CmwWLANCommands.CLIENT_STATE.format(channel, domain), "Client is Associated!!", "Client isnt Associated at signaling channel {}, {} domain".format(channel, domain), 0.1, timeout)
             is_associated = True
         except: 
-            self.print_to_log("Client isnt Associated at signaling channel {}, {} domain".format(channel, domain))
+            self.logger.info("Client isnt Associated at signaling channel %s, %s domain", channel, domain)
             is_associated = False
             
         return is_associated
@@ -193,11 +185,16 @@ class WLAN(CmwProtocol):
         @param channel(CmwChannels): string represents needed channel 
         @param domain(CmwRMCdomains): the type of domain   
         @param timeout(int): timeout in seconds
+        @raise Exception: in case the client isnt associated during the timeout - logged as an error
         '''
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)        
         Validation.validate_elements_in_list("Domain", domain, CmwRMCdomains.supported_rmc_domains)
-        self.print_to_log("Checking if client is associated at signaling channel {} - {} domain".format(channel, domain))
-        self._wait_for_state(CmwSpecialWLANMessages.CLIENT_ASSOCIATED, "FETC:WLAN:SIGN{}:{}W:STAT?".format(channel, domain), "Client is Associated!!", "Client isnt Associated at signaling channel {}, {} domain".format(channel, domain), 0.1, timeout)
+        self.logger.info("Checking if client is associated at signaling channel %s - %s domain", channel, domain)
+        try:
+            self._wait_for_state(CmwSpecialWLANMessages.CLIENT_ASSOCIATED, CmwWLANCommands.CLIENT_STATE.format(channel, domain), "Client is Associated!!", "Client isnt Associated at signaling channel {}, {} domain".format(channel, domain), 0.1, timeout)
+        except Exception:
+            self.logger.error("Client isnt Associated at signaling channel %s, %s domain", channel, domain)
+            raise
         
     def disconnect(self, channel):
         '''
@@ -206,12 +203,12 @@ class WLAN(CmwProtocol):
         @return: No return value
         '''
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)        
-        self.print_to_log("Disconnecting at signaling channel{}".format(channel))
-        self.connection.send("CALL:WLAN:SIGN{}:ACT:DISC".format(channel))
+        self.logger.info("Disconnecting at signaling channel%s", channel)
+        CmwWLANCommands.DISCONNECT.send(self.connection, channel)
         if not self.is_client_associated(channel):
-            self.print_to_log("The Client is disconnected from the WLAN AP")
+            self.logger.info("The Client is disconnected from the WLAN AP")
         else: 
-            self.print_to_log("Client is still associated at signaling channel {}..".format(channel))
+            self.logger.info("Client is still associated at signaling channel %s..", channel)
             raise Exception(self._format_msg("Client is still associated at signaling channel {}..".format(channel)))
     
     def set_operation_mode(self, channel, operation_mode):
@@ -224,9 +221,8 @@ class WLAN(CmwProtocol):
         '''
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)        
         Validation.validate_elements_in_list("Operation Mode", operation_mode, CmwWLANOperationMode.supported_wlan_operation_modes)
-        self.print_to_log("Setting the operation mode at signaling channel{} to {}".format(channel, operation_mode))
-        self.connection.send("CONF:WLAN:SIGN{}:CONN:OMOD {}".format(channel, operation_mode))
-        Validation.check_identical_value("Operation mode at signaling ch{}".format(channel), self.connection.send_receive("CONF:WLAN:SIGN{}:CONN:OMOD?".format(channel)), operation_mode, str)
+        self.logger.info("Setting the operation mode at signaling channel%s to %s", channel, operation_mode)
+        CmwWLANCommands.OPERATION_MODE.set(self.connection, channel, operation_mode)
 
     def get_client_max_power(self, channel, timeout = 20):
         '''
@@ -238,12 +234,12 @@ class WLAN(CmwProtocol):
         '''        
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)        
         if self.is_client_associated(channel):
-            self.print_to_log("Getting client Power at signaling channel {}..".format(channel))
-            power = float(self.connection.send_receive("SENS:WLAN:SIGN{}:UES:RXBP?".format(channel)).rstrip())
-            self.print_to_log("The Client Power is {}dbm".format(str(power)))
+            self.logger.info("Getting client Power at signaling channel %s..", channel)
+            power = CmwWLANCommands.CLIENT_RX_BURST_POWER.query(self.connection, channel)
+            self.logger.info("The Client Power is %sdbm", str(power))
             return power
         else: 
-            self.print_to_log("The Client isnt Associated to the WLAN AP!")
+            self.logger.info("The Client isnt Associated to the WLAN AP!")
             raise Exception("The Client isnt Associated to the WLAN AP!")
 
     def ext_set_approximate_rx_burst_power(self, channel, power):
@@ -253,124 +249,240 @@ class WLAN(CmwProtocol):
         @param power(float): float represents the wanted power. 
         @return: No return value
         '''
-        Validation.validate_limits_min_max(power, CmwPowerRange.MIN_POWER, CmwPowerRange.MAX_POWER, float)
+        Validation.validate_limits_min_max(power, CmwPowerRange.MIN_POWER, CmwPowerRange.MAX_POWER,
+                                           "Approximate rx burst power {} is out of [{}, {}]".format(power, CmwPowerRange.MIN_POWER, CmwPowerRange.MAX_POWER))
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
-        self.print_to_log("Setting the BS Power channel {} to {}".format(channel, power))
+        self.logger.info("Setting the BS Power channel %s to %s", channel, power)
         self._set_epep_power(channel, power)
-        self.print_to_log("Getting the aproximate RX Burst Power from signaling channel {} ".format(channel))
+        self.logger.info("Getting the aproximate RX Burst Power from signaling channel %s ", channel)
         app_rx_burst_power = self._get_approximate_rx_burst_power(channel)
-        self.print_to_log("Fixing the aproximate RX Burst Power to {} at signaling channel {}.".format(power, channel))
+        self.logger.info("Fixing the aproximate RX Burst Power to %s at signaling channel %s.", power, channel)
         self._set_epep_power(channel, float(power) + abs(float(app_rx_burst_power - power)))
-        Validation.check_identical_value("WLAN approximate rx burst channel at signaling ch{}".format(channel), float(self.connection.send_receive("SENS:WLAN:SIGN{}:UES:ARXB?".format(channel)).rstrip()), power, float)
+        Validation.check_identical_value("WLAN approximate rx burst power at signaling ch{}".format(channel), CmwWLANCommands.APPROXIMATE_RX_BURST_POWER.query(self.connection, channel), power, float)
+        self.connection.state_cache.update(self.connection.state_cache.key_of(CmwWLANCommands.APPROXIMATE_RX_BURST_POWER.format(channel)), float(power))
     
     def _get_approximate_rx_burst_power(self, channel):
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
-        self.print_to_log("Getting the approximate rx burst power at channel {}".format(channel))
-        return float(self.connection.send_receive("SENS:WLAN:SIGN{}:UES:ARXB?".format(channel)).rstrip())
+        self.logger.info("Getting the approximate rx burst power at channel %s", channel)
+        return CmwWLANCommands.APPROXIMATE_RX_BURST_POWER.query(self.connection, channel)
         
     def _set_epep_power(self, channel, power):
-        Validation.validate_limits_min_max(power, CmwPowerRange.MIN_POWER, CmwPowerRange.MAX_POWER, float)
+        Validation.validate_limits_min_max(power, CmwPowerRange.MIN_POWER, CmwPowerRange.MAX_POWER,
+                                           "EPEP power {} is out of [{}, {}]".format(power, CmwPowerRange.MIN_POWER, CmwPowerRange.MAX_POWER))
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
-        self.print_to_log("Setting the EPEP Power channel {} to {}".format(channel, power))
-        self.connection.send("CONF:WLAN:SIGN{}:RFS:EPEP {}".format(channel, power))
+        self.logger.info("Setting the EPEP Power channel %s to %s", channel, power)
+        CmwWLANCommands.EPEP_POWER.send(self.connection, channel, power)
     
     def _initiate_test(self, channel, start_power, stop_power, deviation, transport_blocks_amount, PER_threshold):
         ap_power = start_power
         per_measured = 0
-        self.print_to_log("Start PER procedure in signaling channel {}..".format(channel))
-        self.print_to_log("\n The start AP power is : {}dbm\n The Stop power is : {}dbm\n The deviation is : {}DB\n "
-                          "The amount of transported packets is : {}\n The PER threshold is : {}%\n"
-                          .format(start_power, stop_power, deviation, transport_blocks_amount, PER_threshold))
+        self.logger.info("Start PER procedure in signaling channel %s..", channel)
+        self.logger.info("\n The start AP power is : %sdbm\n The Stop power is : %sdbm\n The deviation is : %sDB\n "
+                          "The amount of transported packets is : %s\n The PER threshold is : %s%%\n", start_power, stop_power, deviation, transport_blocks_amount, PER_threshold)
         self._configure_packets_amount(channel, transport_blocks_amount)
         return ap_power, per_measured
     
     def _configure_packets_amount(self, channel, transport_blocks_amount):
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
-        self.print_to_log("Configure packets to {} in signaling channel {}..".format(transport_blocks_amount, channel))
-        self.connection.send("CONF:WLAN:SIGN{}:PER:PACK {}".format(channel, transport_blocks_amount))
-        ans = self.connection.send_receive("CONF:WLAN:SIGN{}:PER:PACK?".format(channel))
-        Validation.check_identical_value("Packets at signaling ch{}".format(channel), ans, transport_blocks_amount, int)
+        self.logger.info("Configure packets to %s in signaling channel %s..", transport_blocks_amount, channel)
+        CmwWLANCommands.PER_PACKETS.set(self.connection, channel, transport_blocks_amount)
         
     def _get_per(self, channel):
-        per_list = self.connection.send_receive("FETC:WLAN:SIGN{}:PER?".format(channel))
+        _, per_measured, _ = CmwWLANCommands.PER.query(self.connection, channel)
         self._abort_per(channel)
-        values = per_list.split(',')
-        per_measured = eval(values[1])
         return per_measured
+
+    def _fetch_intermediate_per(self, channel):
+        '''
+        fetches the PER results of a running PER measurement - <reliability>, <PER>, <sent packets>
+        @param channel(CmwChannels): string represents needed channel
+        @return: the PER in percents and the amount of packets it was measured on (None if the CMW doesnt report it)
+        '''
+        _, per_measured, packets_sent = CmwWLANCommands.PER.query(self.connection, channel)
+        return per_measured, packets_sent
     
     def _abort_per(self, channel):
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
-        self.print_to_log("Aborting PER in signaling channel {}".format(channel))
-        self.connection.send("ABORT:WLAN:SIGN{}:PER".format(channel))
+        self.logger.info("Aborting PER in signaling channel %s", channel)
+        CmwWLANCommands.PER_ABORT.send(self.connection, channel)
     
     def _transport_packets(self, channel, timeout = 300):
+        '''
+        runs a full PER measurement and blocks until the CMW reports it finished (*OPC), then the PER state confirms it -
+        it is polled for the rest of the timeout if the completion event didnt fire, and checked at least once even if the event took all of it. 
+        @param channel(CmwChannels): string represents needed channel
+        @param timeout(int): timeout in seconds
+        '''
+        Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
+        self.logger.info("Starting transport packets in signaling channel %s", channel)
+        start = time.time()
+        if self._is_connection_shared():
+            CmwWLANCommands.PER_START.send(self.connection, channel)
+            poll_interval = self.PER_SHARED_STATUS_POLL_INTERVAL
+        else:
+            per_operation = self.connection.start_operation(CmwWLANCommands.PER_START.format(channel))
+            per_operation.wait(timeout)
+            poll_interval = self.PER_STATUS_POLL_INTERVAL
+        while not self._is_per_finished(channel):
+            if time.time() - start >= timeout:
+                self.logger.warning("Timeout reached, and per isnt finished!")
+                raise Exception("Timeout reached, and per isnt finished!")
+            self.logger.debug("PER isnt ready, collecting measurements")
+            time.sleep(poll_interval)
+        self.logger.info("PER finished..")
+
+    def _transport_packets_early_stop(self, channel, transport_blocks_amount, PER_threshold, early_stop_settings, timeout = 300):
+        '''
+        runs a PER measurement and aborts it as soon as the sequential probability ratio test decides whether the PER threshold is crossed. 
+        a run that finished is judged by its final PER, like a full run, even if the test decided at the same poll. 
+        @param channel(CmwChannels): string represents needed channel
+        @param transport_blocks_amount(int): the amount of packets the PER measurement is configured to
+        @param PER_threshold(float): the PER threshold
+        @param early_stop_settings(PEREarlyStopSettings): the sequential test settings
+        @param timeout(int): timeout in seconds
+        @return(PERResult): the PER result, with the early stop settings it was decided by
+        '''
+        sequential_test = SequentialPERTest(PER_threshold, early_stop_settings)
         self._start_per(channel)
-        
         start = time.time()
         while (time.time() - start < timeout):
-            if self._is_per_finished(channel):
-                self.print_to_log("PER finished..")
-                break
-            else: 
-                self.print_to_log("PER isnt ready, collecting measurements")
-                time.sleep(2)
+            is_finished = self._is_per_finished(channel)
+            per_measured, packets_sent = self._fetch_intermediate_per(channel)
+            if is_finished:
+                is_failed = per_measured >= PER_threshold
+            else:
+                is_failed = sequential_test.decide(per_measured, packets_sent)
+            if is_finished or is_failed is not None:
+                self._abort_per(channel)
+                self.logger.info("PER %s after %s packets, PER is %s", "finished" if is_finished else "early stopped", packets_sent, per_measured)
+                return PERResult(per_measured, packets_sent, transport_blocks_amount, PER_threshold, is_failed, not is_finished, early_stop_settings)
+            self.logger.debug("PER isnt decided yet, %s packets sent, PER is %s", packets_sent, per_measured)
+            time.sleep(early_stop_settings.poll_interval)
         else:
-            self.print_to_log("Timeout reached, and per isnt finished!")
+            self._abort_per(channel)
+            self.logger.warning("Timeout reached, and per isnt finished!")
             raise Exception("Timeout reached, and per isnt finished!")
+
+    def _measure_per(self, channel, transport_blocks_amount, PER_threshold, early_stop_settings = None, timeout = 300):
+        if early_stop_settings is not None:
+            return self._transport_packets_early_stop(channel, transport_blocks_amount, PER_threshold, early_stop_settings, timeout)
+        self._transport_packets(channel, timeout)
+        per_measured = self._get_per(channel)
+        return PERResult(per_measured, transport_blocks_amount, transport_blocks_amount, PER_threshold, per_measured >= PER_threshold)
+
+    def ext_measure_per(self, channel, transport_blocks_amount = 500, PER_threshold = 8.0, early_stop_settings = None, transport_timeout = 300):
+        '''
+        runs a single PER measurement at the current AP power. 
+        @param channel(CmwChannels): string represents needed channel
+        @param transport_blocks_amount(int): the amount of packets to transport
+        @param PER_threshold(float): the PER threshold
+        @param early_stop_settings(PEREarlyStopSettings): if given, the run is aborted as soon as the pass/fail decision is clear
+        @param transport_timeout(int): timeout in seconds
+        @return(PERResult): the PER result
+        '''
+        Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
+        self._configure_packets_amount(channel, transport_blocks_amount)
+        return self._measure_per(channel, transport_blocks_amount, PER_threshold, early_stop_settings, transport_timeout)
     
     def _start_per(self, channel):
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)
-        self.print_to_log("Starting transport packets in signaling channel {}".format(channel))
-        self.connection.send("INIT:WLAN:SIGN{}:PER".format(channel))
+        self.logger.info("Starting transport packets in signaling channel %s", channel)
+        CmwWLANCommands.PER_START.send(self.connection, channel)
     
     def _is_per_finished(self, channel):
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)        
-        self.print_to_log("Checking PER status in signaling channel{}".format(channel))
-        ans = self.connection.send_receive("FETC:WLAN:SIGN{}:PER:STAT:ALL?".format(channel)).rstrip()
+        self.logger.debug("Checking PER status in signaling channel%s", channel)
+        ans = CmwWLANCommands.PER_STATE.query(self.connection, channel)
         if ans == CmwSpecialWLANMessages.PER_FINISHED:
-            self.print_to_log("PER finished..")
+            self.logger.debug("PER finished..")
             return True
         elif ans == CmwSpecialWLANMessages.PER_NOT_FINISHED:
-            self.print_to_log("PER not finished..")
+            self.logger.debug("PER not finished..")
             return False 
         else:
-            self.print_to_log("{} is not a valid answer for PER status".format(ans))
+            self.logger.error("%s is not a valid answer for PER status", ans)
             raise Exception("{} is not a valid answer for PER status".format(ans))
         
-    def ext_get_sesetivity_threshold(self, channel, start_power, stop_power, deviation = 0.5, transport_blocks_amount = 500, PER_threshold = 8.0, transport_timeout = 300):
+    def ext_get_sesetivity_threshold(self, channel, start_power, stop_power, deviation = 0.5, transport_blocks_amount = 500, PER_threshold = 8.0, transport_timeout = 300, search_strategy = CmwSensitivitySearchStrategies.LINEAR, early_stop_settings = None):
         '''
         gets the sensetivity of the client. 
+        the AP power window [start_power : stop_power] is treated as a grid of deviation steps, the sensetivity is the lowest grid power that
+        still passes the PER threshold. LINEAR walks the grid from the start power, BISECTION and GOLDEN_SECTION assume the PER rises
+        monotonically while the power drops and need only log2 of the grid size PER runs. 
+        the amount of PER runs the search used is saved at self.sensitivity_search_per_runs[channel] and their results at self.sensitivity_search_per_results[channel] 
         @param channel(CmwChannels): string represents needed channel
         @param start_power(float): the start power 
         @param stop_power(float): the stop power 
         @param deviation(float): the deviation. 
         @param timeout(int): timeout in seconds
         @param PER_threshold(float): the PER threshold
+        @param search_strategy(CmwSensitivitySearchStrategies): the way the power window is searched
+        @param early_stop_settings(PEREarlyStopSettings): if given, every PER run is aborted as soon as its pass/fail decision is clear
         @raise ConfigException: in case that the configure failed.
         @return: the sensetivity threshold value.
         '''
         Validation.validate_elements_in_list("Channel", channel, CmwChannels.supported_channels)        
+        Validation.validate_elements_in_list("Search strategy", [search_strategy], CmwSensitivitySearchStrategies.supported_search_strategies)
         ap_power, per_measured = self._initiate_test(channel, start_power, stop_power, deviation, transport_blocks_amount, PER_threshold)
         self._validate_client_associated(channel)
-        while (ap_power >= stop_power):
-            self.set_AP_power(channel, ap_power)
-            time.sleep(1)
-            if not self.is_client_associated(channel):
-                self.print_to_log("Client isnt Associated - the client disconnected after updating the AP power to {}".format(ap_power))
-                return ap_power + deviation
-            self._transport_packets(channel, transport_timeout)
-            per_measured = self._get_per(channel)
-            if per_measured >= PER_threshold:
-                self.print_to_log("The Sensetivity threshold is {}, per value is {}".format(ap_power, per_measured))
-                return ap_power + deviation
-            else:
-                self.print_to_log("The BS power is {}, PER measured is {}, still smaller than PER threshold ({}%)".format(ap_power, per_measured, PER_threshold))
-                ap_power = ap_power - deviation
-        else: 
-            self.print_to_log("BS Power is {} and the stop power is {}, and the PER that have been measured is still smaller than {}.".format(ap_power, stop_power, PER_threshold))
-            raise Exception("BS Power is {} and the stop power is {}, and the PER that have been measured is still smaller than {}.".format(ap_power, stop_power, PER_threshold))                    
+        self.sensitivity_search_per_runs[channel] = 0
+        self.sensitivity_search_per_results[channel] = []
+        steps_amount = int(math.floor((start_power - stop_power) / deviation + 1e-9)) + 1
+        failed_steps = {}
+
+        def is_step_failed(step):
+            if step not in failed_steps:
+                failed_steps[step] = self._is_per_threshold_crossed(channel, start_power - step * deviation, transport_blocks_amount, PER_threshold, transport_timeout, early_stop_settings)
+            return failed_steps[step]
+
+        if search_strategy == CmwSensitivitySearchStrategies.LINEAR:
+            first_failed_step = next((step for step in range(steps_amount) if is_step_failed(step)), steps_amount)
+        else:
+            split_ratio = 0.5 if search_strategy == CmwSensitivitySearchStrategies.BISECTION else self.GOLDEN_SECTION_RATIO
+            low_step, high_step = 0, steps_amount
+            while low_step < high_step:
+                step = low_step + int((high_step - low_step - 1) * split_ratio)
+                if is_step_failed(step):
+                    high_step = step
+                else:
+                    low_step = step + 1
+            first_failed_step = low_step
+
+        self.logger.info("The %s sensetivity search used %s PER runs", search_strategy, self.sensitivity_search_per_runs[channel])
+        if first_failed_step == steps_amount:
+            ap_power = start_power - steps_amount * deviation
+            self.logger.info("BS Power is %s and the stop power is %s, and the PER that have been measured is still smaller than %s.", ap_power, stop_power, PER_threshold)
+            raise Exception("BS Power is {} and the stop power is {}, and the PER that have been measured is still smaller than {}.".format(ap_power, stop_power, PER_threshold))
+        ap_power = start_power - first_failed_step * deviation
+        self.logger.info("The Sensetivity threshold is %s", ap_power + deviation)
+        return ap_power + deviation
 
-    def ext_config_wlan_scenario(self, output_connector = CmwRFPaths.RF1_COM, rx_converter = CmwRFPaths.RX1_CONVERTER, tx_converter = CmwRFPaths.TX1_CONVERTER, wifi_standard = CmwWLANStandards.W80211AC, ext_attenuation=0, ap_power = -60, approximate_burst_power = -17.0, freq_channel = 1):
+    def _is_per_threshold_crossed(self, channel, ap_power, transport_blocks_amount, PER_threshold, transport_timeout, early_stop_settings = None):
+        '''
+        sets the AP power and runs a single PER measurement at it. 
+        @param channel(CmwChannels): string represents needed channel
+        @param ap_power(float): the AP power to measure at 
+        @param transport_blocks_amount(int): the amount of packets the PER measurement is configured to
+        @param PER_threshold(float): the PER threshold
+        @param transport_timeout(int): timeout in seconds for the PER run
+        @param early_stop_settings(PEREarlyStopSettings): the sequential test settings, None for a full PER run
+        @return: True if the client disconnected or the PER reached the threshold, False otherwise
+        '''
+        self.set_AP_power(channel, ap_power)
+        time.sleep(1)
+        if not self.is_client_associated(channel):
+            self.logger.info("Client isnt Associated - the client disconnected after updating the AP power to %s", ap_power)
+            return True
+        self.sensitivity_search_per_runs[channel] += 1
+        per_result = self._measure_per(channel, transport_blocks_amount, PER_threshold, early_stop_settings, transport_timeout)
+        self.sensitivity_search_per_results[channel].append(per_result)
+        if per_result.is_failed:
+            self.logger.info("The BS power is %s, PER measured is %s, reached the PER threshold (%s%%)", ap_power, per_result.per, PER_threshold)
+            return True
+        self.logger.info("The BS power is %s, PER measured is %s, still smaller than PER threshold (%s%%)", ap_power, per_result.per, PER_threshold)
+        return False
+
+    def ext_config_wlan_scenario(self, output_connector = CmwRFPaths.RF1_COM, rx_converter = CmwRFPaths.RX1_CONVERTER, tx_converter = CmwRFPaths.TX1_CONVERTER, wifi_standard = CmwWLANStandards.W80211AC, ext_attenuation=0, ap_power = -60, approximate_burst_power = -17.0, freq_channel = 1, channel = CmwChannels.CMW_CH1):
         '''
         ext config for wlan - configes the RF path, the the RF converter, the wifi standard, ext attenuation, app burst power, AP power, and freq channel. 
         @param output_connector = represents the physical output connector - CmwRFPaths.RF<1..4>_COM 
@@ -381,11 +493,31 @@ class WLAN(CmwProtocol):
         @param ap_power - float that represents the Access point power level. 
         @param approximate_burst_power - float that represents the approximate_burst_power in the cmw configuration. 
         @param freq_channel - the freq channel represents the frequency that we will trnasmit - channel 1 = 2.412Ghz, channel 64 = 5.320 Ghz
+        @param channel(CmwChannels): the signaling channel to configure
+        '''
+        WLANScenarioProfile(output_connector, rx_converter, tx_converter, wifi_standard, ext_attenuation, ap_power, approximate_burst_power,
+                            freq_channel, channel).apply(self)
+
+    def ext_config_leased_wlan_scenario(self, lease, **scenario):
         '''
-        self.config_standard_cell_scenario(CmwChannels.CMW_CH1, output_connector, rx_converter, output_connector, tx_converter)
-        self.set_stadnard(CmwChannels.CMW_CH1, wifi_standard)
-        self.set_ext_attenuation(CmwChannels.CMW_CH1, ext_attenuation, CmwAttDirections.INPUT)
-        self.set_ext_attenuation(CmwChannels.CMW_CH1, ext_attenuation, CmwAttDirections.OUTPUT)
-        self.set_AP_power(CmwChannels.CMW_CH1, ap_power)
-        self.ext_set_approximate_rx_burst_power(CmwChannels.CMW_CH1, approximate_burst_power)
-        self.set_broadcast_channel(CmwChannels.CMW_CH1, freq_channel)
+        ext config for wlan at a leased signaling channel, over the RF path of the lease. 
+        @param lease(CmwChannelLease): the lease of the signaling channel
+        @param scenario: the rest of the ext_config_wlan_scenario arguments (wifi_standard, ap_power etc.)
+        '''
+        self.ext_config_wlan_scenario(output_connector = lease.rx_connector, rx_converter = lease.rx_converter, tx_converter = lease.tx_converter, channel = lease.channel, **scenario)
+
+    def ext_get_sesetivity_thresholds(self, searches):
+        '''
+        runs the sensetivity searches of several signaling channels at the same time, every search at its own thread. 
+        the commands of all the searches are serialized on the shared connection, and their completion is polled per channel,
+        whether the channels were leased or not. 
+        @param searches(dict): signaling channel -> dict of ext_get_sesetivity_threshold arguments (start_power, stop_power etc.)
+        @raise: the failure of the first search that failed, after all the searches ended
+        @return(dict): signaling channel -> the sensetivity threshold value
+        '''
+        for channel in searches:
+            Validation.validate_elements_in_list("Channel", [channel], CmwChannels.supported_channels)
+        self.logger.info("Running sensetivity searches at signaling channels %s concurrently", sorted(searches))
+        with self._driving_channels(len(searches)), ThreadPoolExecutor(max_workers = len(searches)) as executor:
+            futures = dict((channel, executor.submit(self.ext_get_sesetivity_threshold, channel, **arguments)) for channel, arguments in searches.items())
+        return dict((channel, future.result()) for channel, future in futures.items())
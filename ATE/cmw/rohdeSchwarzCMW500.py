@@ -1,28 +1,29 @@
+from ATE.cmw.channelLeaseManager import CmwChannelLeaseManager
+from ATE.cmw.commands import CmwCommands
 from ATE.cmw.modules.wlan import WLAN
-from utils.connections.visaCommunication import VisaCommunication
+from utils.connections.visaSessionPool import get_session_pool
+from utils.stationLogging import get_logger
 
 
 class CMW500(object):
     
     def __init__(self, port_name):
         self.port_name = port_name
-        self.connection = VisaCommunication(port_name)
-        self.wlan = WLAN(self.connection, port_name)
+        self.logger = get_logger('cmw500', port_name)
+        self.connection = get_session_pool().acquire(port_name)
+        self.channel_leases = CmwChannelLeaseManager()
+        self.wlan = WLAN(self.connection, port_name, self.channel_leases)
         
     def preset(self):
-        self.print_to_log(self._format_msg("Reset all.."))
-        self.connection.send("SYST:PRES:ALL")
-        self.print_to_log(self._format_msg("Reset Finished!"))
+        self.logger.info("Reset all..")
+        CmwCommands.PRESET.send(self.connection)
+        self.connection.state_cache.invalidate()
+        self.logger.info("Reset Finished!")
         
     def close(self):
-        self.connection.close()
-        self.print_to_log(self._format_msg("Closed"))
-
-    def print_to_log(self, msg):
-        print(self._format_msg(msg))
-
-    def _format_msg(self, msg):
-        return 'R&S CMW500({}) : {}'.format(self.port_name, msg)
+        self.logger.info("%s - every hit saved a write and a read back", self.connection.state_cache)
+        get_session_pool().release(self.connection)
+        self.logger.info("Closed")
 
 
 if __name__ == "__main__":  
@@ -0,0 +1,67 @@
+from ATE.cmw.commands import CmwCommands, CmwWLANCommands
+from ATE.cmw.consts import CmwAttDirections, CmwChannels, CmwRFPaths, CmwWLANStandards
+from ATE.spectrumCommands import SpectrumCommands
+from utils.connections.instrumentProfile import InstrumentProfile, ProfileSetting
+from utils.validation import Validation
+
+
+class WLANScenarioProfile(InstrumentProfile):
+    '''
+    The CMW WLAN scenario of a signaling channel - RF routing, standard, external attenuations, AP power, burst power leveling and broadcast channel.
+    applied on the WLAN module of the CMW (CMW500.wlan).
+    '''
+
+    def __init__(self, output_connector = CmwRFPaths.RF1_COM, rx_converter = CmwRFPaths.RX1_CONVERTER, tx_converter = CmwRFPaths.TX1_CONVERTER,
+                 wifi_standard = CmwWLANStandards.W80211AC, ext_attenuation = 0, ap_power = -60, approximate_burst_power = -17.0, freq_channel = 1,
+                 channel = CmwChannels.CMW_CH1):
+        InstrumentProfile.__init__(self, self._scenario_settings)
+        self.output_connector = output_connector
+        self.rx_converter = rx_converter
+        self.tx_converter = tx_converter
+        self.wifi_standard = wifi_standard
+        self.ext_attenuation = ext_attenuation
+        self.ap_power = ap_power
+        self.approximate_burst_power = approximate_burst_power
+        self.freq_channel = freq_channel
+        self.channel = channel
+
+    def _scenario_settings(self, wlan):
+        channel, interface = self.channel, wlan.interface_name
+        routes = (self.output_connector, self.rx_converter, self.output_connector, self.tx_converter)
+        settings = [self._setting('routing', CmwCommands.SCENARIO, (interface, channel), routes, lambda: wlan.config_standard_cell_scenario(channel, *routes)),
+                    self._setting('standard', CmwWLANCommands.STANDARD, (channel,), self.wifi_standard, lambda: wlan.set_stadnard(channel, self.wifi_standard))]
+        for direction in (CmwAttDirections.INPUT, CmwAttDirections.OUTPUT):
+            settings.append(self._setting('{} attenuation'.format(direction), CmwCommands.EXT_ATTENUATION, (interface, channel, direction), self.ext_attenuation,
+                                          lambda direction = direction: wlan.set_ext_attenuation(channel, self.ext_attenuation, direction)))
+        approximate_burst_power = CmwWLANCommands.APPROXIMATE_RX_BURST_POWER
+        settings += [self._setting('AP power', CmwWLANCommands.AP_POWER, (channel,), self.ap_power, lambda: wlan.set_AP_power(channel, self.ap_power)),
+                     ProfileSetting('approximate burst power', approximate_burst_power.format(channel), float(self.approximate_burst_power),
+                                    lambda: wlan.ext_set_approximate_rx_burst_power(channel, self.approximate_burst_power),
+                                    lambda ans: Validation.check_identical_value('WLAN approximate rx burst power at signaling ch{}'.format(channel),
+                                                                                 approximate_burst_power.decode(ans), float(self.approximate_burst_power))),
+                     self._setting('broadcast channel', CmwWLANCommands.BROADCAST_CHANNEL, (channel,), self.freq_channel, lambda: wlan.set_broadcast_channel(channel, self.freq_channel))]
+        return settings
+
+
+class SpectrumProfile(InstrumentProfile):
+    '''
+    The spectrum analyzer measurement setup - center frequency, span, ref level and optionally the trace data format.
+    applied on a SpectrumAnalyzer.
+    '''
+
+    def __init__(self, center_frequency, span, ref_level, trace_data_format = None):
+        InstrumentProfile.__init__(self, self._measurement_settings)
+        self.center_frequency = center_frequency
+        self.span = span
+        self.ref_level = ref_level
+        self.trace_data_format = trace_data_format
+
+    def _measurement_settings(self, spectrum):
+        settings = [self._setting('center freq', SpectrumCommands.CENTER_FREQUENCY, (), self.center_frequency, lambda: spectrum.set_center_frequency(self.center_frequency)),
+                    self._setting('span', SpectrumCommands.SPAN, (), self.span, lambda: spectrum.set_span(self.span)),
+                    self._setting('ref level', SpectrumCommands.REF_LEVEL, (), self.ref_level, lambda: spectrum.set_ref_level(self.ref_level))]
+        if self.trace_data_format is not None:
+            settings += [self._setting('trace data format', SpectrumCommands.TRACE_DATA_FORMAT, (), self.trace_data_format,
+                                       lambda: spectrum.set_trace_data_format(self.trace_data_format)),
+                         self._setting('byte order', SpectrumCommands.BYTE_ORDER, (), 'SWAP', lambda: SpectrumCommands.BYTE_ORDER.set(spectrum.connection, 'SWAP'))]
+        return settings
@@ -0,0 +1,154 @@
+import numpy
+
+GAUSSIAN_RBW_NOISE_BANDWIDTH = 1.0645 # the noise equivalent bandwidth of a gaussian RBW filter, relative to its 3 dB bandwidth - sqrt(pi / (4 ln 2))
+
+
+class SpectrumMask(object):
+    '''
+    A limit line - the highest allowed level at every frequency, linearly interpolated between its breakpoints.
+    '''
+
+    def __init__(self, frequencies, limits):
+        '''
+        @param frequencies: the breakpoint frequencies [Hz], ascending
+        @param limits: the limit [dBm] at every breakpoint
+        '''
+        self.frequencies = numpy.asarray(frequencies, dtype = float)
+        self.limits = numpy.asarray(limits, dtype = float)
+
+    @classmethod
+    def flat(cls, limit):
+        return cls([0.0, 1.0], [limit, limit])
+
+    def limits_at(self, frequencies):
+        return numpy.interp(frequencies, self.frequencies, self.limits)
+
+    def margins(self, frequencies, levels):
+        '''
+        @return: the limit minus the level of every point, negative where the mask is violated
+        '''
+        return self.limits_at(frequencies) - levels
+
+
+class SpectrumMeasurements(object):
+    '''
+    The RF metrics of one trace, or of many traces at once - every attribute has the shape of the traces without their points axis.
+    '''
+
+    def __init__(self, peak_frequency, peak_level, channel_power, occupied_bandwidth, spur_frequencies, spur_levels, spur_margins):
+        self.peak_frequency = peak_frequency
+        self.peak_level = peak_level
+        self.channel_power = channel_power
+        self.occupied_bandwidth = occupied_bandwidth
+        self.spur_frequencies = spur_frequencies # (..., spurs) - NaN where there are less spurs than asked for
+        self.spur_levels = spur_levels
+        self.spur_margins = spur_margins # the spur mask limit minus the spur level, NaN without a mask
+
+    @property
+    def worst_spur_margin(self):
+        '''
+        the smallest spur margin of every trace, +inf if there are no spurs or no mask
+        '''
+        margins = numpy.where(numpy.isnan(self.spur_margins), numpy.inf, self.spur_margins)
+        return margins.min(axis = -1) if margins.shape[-1] else numpy.full(margins.shape[:-1], numpy.inf)
+
+
+def dbm_to_mw(levels):
+    return numpy.power(10.0, numpy.asarray(levels) / 10.0)
+
+
+def mw_to_dbm(powers):
+    with numpy.errstate(divide = 'ignore'):
+        return 10.0 * numpy.log10(powers)
+
+
+def peak(frequencies, levels):
+    '''
+    @param frequencies: the frequency axis [Hz] of the traces, shape (points,)
+    @param levels: the trace levels [dBm], shape (points,) or (traces, points)
+    @return(tuple): the peak frequency and the peak level of every trace
+    '''
+    levels = numpy.asarray(levels)
+    indexes = levels.argmax(axis = -1)
+    return numpy.asarray(frequencies)[indexes], numpy.take_along_axis(levels, indexes[..., numpy.newaxis], axis = -1)[..., 0]
+
+
+def channel_power(frequencies, levels, center, bandwidth, resolution_bandwidth = None, noise_bandwidth = GAUSSIAN_RBW_NOISE_BANDWIDTH):
+    '''
+    Integrates the power of the points inside the channel.
+    @param center,bandwidth: the channel [Hz]
+    @param resolution_bandwidth: the RBW of the sweep [Hz] - the points are scaled by the bin width over the noise equivalent bandwidth of the RBW filter,
+                                 None if every point is the power of its bin
+    @param noise_bandwidth: the noise equivalent bandwidth of the RBW filter, relative to the RBW - depends on the filter shape
+    @return: the channel power [dBm] of every trace
+    '''
+    frequencies = numpy.asarray(frequencies)
+    in_channel = numpy.abs(frequencies - center) <= bandwidth / 2.0
+    powers = (dbm_to_mw(levels) * in_channel).sum(axis = -1)
+    if resolution_bandwidth is not None and len(frequencies) > 1:
+        powers = powers * (frequencies[1] - frequencies[0]) / (resolution_bandwidth * noise_bandwidth)
+    return mw_to_dbm(powers)
+
+
+def occupied_bandwidth(frequencies, levels, percent = 99.0):
+    '''
+    @param percent: the share of the total power inside the occupied bandwidth
+    @return: the bandwidth [Hz] of every trace that holds the percent of its power, with the same power left out on each side
+    '''
+    frequencies = numpy.asarray(frequencies)
+    cumulative = numpy.cumsum(dbm_to_mw(levels), axis = -1)
+    total = cumulative[..., -1:]
+    outside = (1.0 - percent / 100.0) / 2.0
+    lower = (cumulative < total * outside).sum(axis = -1)
+    upper = numpy.minimum((cumulative < total * (1.0 - outside)).sum(axis = -1), len(frequencies) - 1)
+    return frequencies[upper] - frequencies[lower]
+
+
+def spurs(frequencies, levels, count = 5, carrier_frequency = None, exclusion_bandwidth = 0.0, mask = None):
+    '''
+    Finds the highest local maxima of every trace, outside the carrier.
+    @param count: the number of spurs to return
+    @param carrier_frequency: the carrier [Hz] of every trace (scalar or per trace), None for the peak of every trace
+    @param exclusion_bandwidth: the band around the carrier [Hz] that isnt searched for spurs
+    @param mask(SpectrumMask): the spur limit line, None for no margins
+    @return(tuple): the frequencies, levels and mask margins of the spurs, shape (..., count), highest first, NaN padded
+    '''
+    frequencies = numpy.asarray(frequencies)
+    levels = numpy.asarray(levels, dtype = float)
+    if carrier_frequency is None:
+        carrier_frequency, _ = peak(frequencies, levels)
+    carrier_frequency = numpy.asarray(carrier_frequency, dtype = float)[..., numpy.newaxis]
+    candidates = numpy.full(levels.shape, -numpy.inf)
+    is_local_maximum = (levels[..., 1:-1] > levels[..., :-2]) & (levels[..., 1:-1] >= levels[..., 2:])
+    candidates[..., 1:-1] = numpy.where(is_local_maximum, levels[..., 1:-1], -numpy.inf)
+    candidates = numpy.where(numpy.abs(frequencies - carrier_frequency) <= exclusion_bandwidth / 2.0, -numpy.inf, candidates)
+    count = min(count, levels.shape[-1])
+    indexes = numpy.argsort(-candidates, axis = -1)[..., :count]
+    spur_levels = numpy.take_along_axis(candidates, indexes, axis = -1)
+    found = numpy.isfinite(spur_levels)
+    spur_frequencies = numpy.where(found, frequencies[indexes], numpy.nan)
+    spur_levels = numpy.where(found, spur_levels, numpy.nan)
+    spur_margins = mask.margins(spur_frequencies, spur_levels) if mask is not None else numpy.full(spur_levels.shape, numpy.nan)
+    return spur_frequencies, spur_levels, spur_margins
+
+
+def analyze(frequencies, levels, channel_bandwidth, resolution_bandwidth = None, obw_percent = 99.0, spur_count = 5,
+            spur_exclusion_bandwidth = None, spur_mask = None):
+    '''
+    Computes all the RF metrics of the traces in one pass - the channel is centered on the peak of every trace.
+    @param frequencies: the frequency axis [Hz], shape (points,)
+    @param levels: the trace levels [dBm], shape (points,) or (traces, points)
+    @param channel_bandwidth: the bandwidth [Hz] of the channel power and of the band excluded from the spur search
+    @param resolution_bandwidth: the RBW of the sweep [Hz], None if every point is the power of its bin
+    @param obw_percent: the share of the power inside the occupied bandwidth
+    @param spur_count: the number of spurs to find
+    @param spur_exclusion_bandwidth: the band around the peak that isnt searched for spurs, None for the channel bandwidth
+    @param spur_mask(SpectrumMask): the spur limit line, None for no margins
+    @return(SpectrumMeasurements): the metrics of every trace
+    '''
+    peak_frequency, peak_level = peak(frequencies, levels)
+    power = channel_power(frequencies, levels, peak_frequency[..., numpy.newaxis], channel_bandwidth, resolution_bandwidth)
+    bandwidth = occupied_bandwidth(frequencies, levels, obw_percent)
+    exclusion = channel_bandwidth if spur_exclusion_bandwidth is None else spur_exclusion_bandwidth
+    spur_frequencies, spur_levels, spur_margins = spurs(frequencies, levels, spur_count, peak_frequency, exclusion, spur_mask)
+    return SpectrumMeasurements(peak_frequency, peak_level, power, bandwidth, spur_frequencies, spur_levels, spur_margins)
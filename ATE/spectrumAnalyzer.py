@@ -1,20 +1,32 @@
-from utils.connections.visaCommunication import VisaCommunication
+import numpy
+
+from ATE.instrumentProfiles import SpectrumProfile
+from ATE.spectrumCommands import SpectrumCommands
+from utils.connections.scpiCommand import query_all
+from utils.connections.visaSessionPool import get_session_pool
+from utils.stationLogging import get_logger
 from utils.validation import Validation
 
 
 class SpectrumAnalyzer(object):
+    TRACE_DATA_FORMATS = {'REAL,32': (SpectrumCommands.TRACE_DATA_REAL32, None),
+                          'INT,32': (SpectrumCommands.TRACE_DATA_INT32, 0.001)} # the query of the little endian (FORM:BORD SWAP) points and their scale to dBm
+    MAX_LIST_POINTS = 1000
+
     def __init__(self, gpib_address):
         self.gpib_address = gpib_address
-        self.connection = VisaCommunication(gpib_address)
+        self.logger = get_logger('spectrum', gpib_address)
+        self.connection = get_session_pool().acquire(gpib_address)
+        self.list_points = None # the amount of points of the armed list sweep
         self.check_identity()
 
     def check_identity(self, spectrum_name = 'Keysight CXA N9000B'):
-        self.print_to_log('Checking Spectrum Identity')
-        ans = self.connection.send_receive('*IDN?\r\n')
+        self.logger.info('Checking Spectrum Identity')
+        ans = SpectrumCommands.IDENTITY.query(self.connection)
         if ans.__contains__(spectrum_name):
-            self.print_to_log('{} Found and connected properly!')
+            self.logger.info('%s Found and connected properly!', spectrum_name)
         else:
-            self.print_to_log('{} didnt Found!'.format(spectrum_name))
+            self.logger.error('%s didnt Found!', spectrum_name)
             raise SpectrumNotFoundException('{} didnt Found!'.format(spectrum_name))
 
     def reset(self):
@@ -22,9 +34,10 @@ class SpectrumAnalyzer(object):
         Resets the SA sets all parameters to default
         :return: None
         '''
-        self.print_to_log('Resetting..')
-        self.connection.send('*RST\r\n')
-        self.print_to_log('Reset finished')
+        self.logger.info('Resetting..')
+        SpectrumCommands.RESET.send(self.connection)
+        self.connection.state_cache.invalidate()
+        self.logger.info('Reset finished')
 
     def set_ref_level(self, ref_level_value):
         '''
@@ -32,11 +45,10 @@ class SpectrumAnalyzer(object):
         @:param ref_level_value : ref value
         :return:None
         '''
-        self.print_to_log('Set Ref level to {}'.format(ref_level_value))
+        self.logger.info('Set Ref level to %s', ref_level_value)
         Validation.validate_input_parameter_in_range('Spectrum Ref level', ref_level_value, -40.0, 60.0)
-        self.connection.send('SPEC:REF {}\r\n'.format(ref_level_value))
-        Validation.check_identical_value('Ref level', self.connection.send_receive('SPEC:REF?\r\n'), cast=float)
-        self.print_to_log('Ref level is {}!'.format(ref_level_value))
+        SpectrumCommands.REF_LEVEL.set(self.connection, ref_level_value)
+        self.logger.info('Ref level is %s!', ref_level_value)
 
     def set_center_frequency(self, center_freq):
         '''
@@ -45,37 +57,125 @@ class SpectrumAnalyzer(object):
         @:param center_freq : center freq
         :return: None
         '''
-        self.print_to_log('Set Center freq to {}'.format(center_freq))
+        self.logger.info('Set Center freq to %s', center_freq)
         Validation.validate_input_parameter_in_range('Center Freq', center_freq, 50, 7*1E9)
-        self.connection.send('SPEC:CENT {}\r\n'.format(center_freq))
-        Validation.check_identical_value('Center freq', self.connection.send_receive('SPEC:CENT?\r\n'), cast=float)
-        self.print_to_log('Center freq is {}!'.format(center_freq))
+        SpectrumCommands.CENTER_FREQUENCY.set(self.connection, center_freq)
+        self.logger.info('Center freq is %s!', center_freq)
 
     def set_span(self, span):
-        self.print_to_log('Set span to {}'.format(span))
+        self.logger.info('Set span to %s', span)
         Validation.validate_input_parameter_in_range('Span', span, 1, 100E6)
-        self.connection.send('SPEC:SPAN {}\r\n'.format(span))
-        Validation.check_identical_value('Span', self.connection.send_receive('SPEC:SPAN?\r\n'), cast=float)
-        self.print_to_log('Span is {}!'.format(span))
+        SpectrumCommands.SPAN.set(self.connection, span)
+        self.logger.info('Span is %s!', span)
+
+    def ext_config_measurement(self, center_freq, span, ref_level_value):
+        '''
+        sets the center freq, span and ref level as one batch - only the settings that changed are sent, with their read backs in a single bus transaction
+        @:param center_freq : center freq
+        @:param span : span
+        @:param ref_level_value : ref value
+        :return: None
+        '''
+        self.logger.info('Configuring measurement..')
+        SpectrumProfile(center_freq, span, ref_level_value).apply(self)
+        self.logger.info('Measurement configured!')
 
     def get_peak(self):
-        self.print_to_log('Get peak..')
-        resp = float(self.connection.send_receive('SPEC:PEAK? {}\r\n'))
-        self.print_to_log('Peak is {}!'.format(resp))
+        self.logger.info('Get peak..')
+        resp = SpectrumCommands.PEAK.query(self.connection)
+        self.logger.info('Peak is %s!', resp)
         return resp
 
-    def close(self):
-        self.print_to_log('Closing....')
-        self.connection.send('CLOS\r\n')
-        self.connection.close()
-        self.print_to_log('Closed....')
+    def configure_list_sweep(self, frequencies, dwell_time, resolution_bandwidth = None):
+        '''
+        programs all the list sweep points at once, every point is measured on a bus trigger (*TRG) - see trigger_list_point
+        the list is armed (INIT:LIST) in the same bus transaction as the settings and their read backs
+        @:param frequencies : the point frequencies [Hz]
+        @:param dwell_time : the measurement time of every point [s]
+        @:param resolution_bandwidth : the RBW of the points [Hz], None to keep the current one
+        :return: None
+        '''
+        Validation.validate_limits_min_max(len(frequencies), 1, self.MAX_LIST_POINTS, 'List sweep - {} points, up to {} are supported'.format(len(frequencies), self.MAX_LIST_POINTS),
+                                           SpectrumListSweepException)
+        for frequency in frequencies:
+            Validation.validate_input_parameter_in_range('List freq', frequency, 50, 7*1E9)
+        self.logger.info('Configuring list sweep, %s points, dwell time %s', len(frequencies), dwell_time)
+        with self.connection.batch():
+            SpectrumCommands.LIST_FREQUENCIES.set(self.connection, frequencies)
+            SpectrumCommands.LIST_DWELL_TIME.set(self.connection, dwell_time)
+            if resolution_bandwidth is not None:
+                SpectrumCommands.LIST_RBW.set(self.connection, resolution_bandwidth)
+            SpectrumCommands.LIST_TRIGGER_SOURCE.set(self.connection, 'BUS')
+            SpectrumCommands.LIST_INIT.send(self.connection)
+        self.list_points = len(frequencies)
+        self.logger.info('List sweep armed!')
+
+    def trigger_list_point(self):
+        '''
+        measures the next list sweep point - the trigger and *OPC? share a bus transaction, that returns once the point was measured (its dwell time)
+        :return: None
+        '''
+        SpectrumCommands.TRIGGER_AND_WAIT.query(self.connection, time_to_wait = 0)
 
-    def print_to_log(self, msg):
-        print(self._format_msg(msg))
+    def fetch_list_sweep(self):
+        '''
+        :return: the peak [dBm] of every list sweep point, numpy array
+        :raise SpectrumListSweepException: in case the spectrum didnt measure every point of the armed list
+        '''
+        peaks = SpectrumCommands.LIST_PEAKS.query(self.connection, time_to_wait = 0)
+        self.logger.info('List sweep fetched, %s points', len(peaks))
+        if self.list_points is not None and len(peaks) != self.list_points:
+            raise SpectrumListSweepException('List sweep measured {} points instead of {}'.format(len(peaks), self.list_points))
+        return peaks
+
+    def set_trace_data_format(self, data_format):
+        '''
+        sets the binary format of the trace data, with the little endian byte order
+        @:param data_format : REAL,32 or INT,32
+        :return: None
+        '''
+        Validation.validate_elements_in_list('Trace data format', [data_format], list(self.TRACE_DATA_FORMATS))
+        self.logger.info('Set trace data format to %s', data_format)
+        with self.connection.batch():
+            SpectrumCommands.TRACE_DATA_FORMAT.set(self.connection, data_format)
+            SpectrumCommands.BYTE_ORDER.set(self.connection, 'SWAP')
+
+    def fetch_trace(self, data_format = 'REAL,32', trace = 1):
+        '''
+        fetches a whole trace as an IEEE 488.2 binary block in a single transfer - the points are mapped to an array, nothing is parsed per point
+        @:param data_format : REAL,32 or INT,32
+        @:param trace : the trace number
+        :return: tuple of the frequency axis [Hz] and the trace levels [dBm], both numpy arrays, and the resolution bandwidth [Hz] of the sweep
+        '''
+        self.set_trace_data_format(data_format)
+        self.logger.debug('Fetching trace %s..', trace)
+        center, span, points, resolution_bandwidth = query_all(self.connection, (SpectrumCommands.CENTER_FREQUENCY.query, ()), (SpectrumCommands.SPAN.query, ()),
+                                                               (SpectrumCommands.SWEEP_POINTS, ()), (SpectrumCommands.RESOLUTION_BANDWIDTH, ()))
+        trace_query, scale = self.TRACE_DATA_FORMATS[data_format]
+        levels = trace_query.query(self.connection, trace)
+        if len(levels) != points:
+            raise SpectrumTraceException('Trace {} has {} points instead of {}'.format(trace, len(levels), points))
+        if scale is not None:
+            levels = levels * scale
+        frequencies = numpy.linspace(center - span / 2, center + span / 2, len(levels))
+        self.logger.debug('Trace %s fetched, %s points, RBW %s Hz', trace, len(levels), resolution_bandwidth)
+        return frequencies, levels, resolution_bandwidth
+
+    def close(self):
+        self.logger.info('Closing....')
+        self.logger.info('%s - every hit saved a write and a read back', self.connection.state_cache)
+        SpectrumCommands.CLOSE.send(self.connection)
+        get_session_pool().release(self.connection)
+        self.logger.info('Closed....')
 
-    def _format_msg(self, msg):
-        return 'Keysight CXA N9000B({}) : {}'.format(self.gpib_address, msg)
 
 
 class SpectrumNotFoundException(Exception):
+    pass
+
+
+class SpectrumTraceException(Exception):
+    pass
+
+class SpectrumListSweepException(Exception):
     pass
\ No newline at end of file
@@ -0,0 +1,30 @@
+from utils.connections.scpiCommand import Block, CsvList, Enum, Float, FloatArray, Int, ScpiCommand, ScpiQuery, ScpiSetting
+
+TRACE = Int()
+
+
+class SpectrumCommands():
+    '''
+    The commands of the Keysight CXA spectrum analyzer.
+    '''
+    IDENTITY = ScpiQuery('*IDN?')
+    RESET = ScpiCommand('*RST')
+    CLOSE = ScpiCommand('CLOS')
+    REF_LEVEL = ScpiSetting('SPEC:REF', Float(), title = 'Ref level')
+    CENTER_FREQUENCY = ScpiSetting('SPEC:CENT', Float(), title = 'Center freq')
+    SPAN = ScpiSetting('SPEC:SPAN', Float(), title = 'Span')
+    SWEEP_POINTS = ScpiQuery('SWE:POIN?', (), Int())
+    RESOLUTION_BANDWIDTH = ScpiQuery('BAND?', (), Float())
+    PEAK = ScpiQuery('SPEC:PEAK?', (), Float())
+    LIST_FREQUENCIES = ScpiSetting('LIST:FREQ', CsvList(Float()), title = 'List freq', cached = False)
+    LIST_DWELL_TIME = ScpiSetting('LIST:SWE:TIME', Float(), title = 'List dwell time')
+    LIST_RBW = ScpiSetting('LIST:BAND:RES', Float(), title = 'List RBW')
+    LIST_TRIGGER_SOURCE = ScpiSetting('LIST:TRIG:SOUR', Enum(['IMM', 'BUS', 'EXT'], 'List trigger source'), title = 'List trigger source')
+    LIST_INIT = ScpiCommand('INIT:LIST')
+    TRIGGER = ScpiCommand('*TRG')
+    TRIGGER_AND_WAIT = ScpiQuery('*TRG;*OPC?', (), Int()) # answered once the triggered measurement is done
+    LIST_PEAKS = ScpiQuery('FETC:LIST?', (), FloatArray())
+    TRACE_DATA_FORMAT = ScpiSetting('FORM:DATA', Enum(['REAL,32', 'INT,32'], 'Trace data format'), title = 'Trace data format')
+    BYTE_ORDER = ScpiSetting('FORM:BORD', Enum(['NORM', 'SWAP'], 'Byte order'), title = 'Byte order')
+    TRACE_DATA_REAL32 = ScpiQuery('TRAC:DATA? TRACE{}', (TRACE,), Block('<f4'))
+    TRACE_DATA_INT32 = ScpiQuery('TRAC:DATA? TRACE{}', (TRACE,), Block('<i4'))
@@ -0,0 +1,61 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from ATE.cmw.rohdeSchwarzCMW500 import CMW500
+from ATE.spectrumAnalyzer import SpectrumAnalyzer
+from infra.tigerUUT import TigerUUT
+from utils.connections.asyncCommunication import AsyncDriver
+
+
+class AsyncCMW500(AsyncDriver):
+    '''
+    await cmw.preset(), await cmw.signaling(channel).set_AP_power(channel, power) ...
+    the instrument calls run on the CMW worker, and the WLAN calls of every signaling channel on a worker of the channel -
+    the calls of a channel keep their order while the channels run side by side. the bus transactions are still serialized by the shared connection.
+    '''
+    DRIVER_CLASS = CMW500
+
+    def __init__(self, driver, executor):
+        AsyncDriver.__init__(self, driver, executor)
+        self._signaling = {}
+
+    def signaling(self, channel):
+        '''
+        @param channel(CmwChannels): the signaling channel
+        @return: the async WLAN module of the CMW, on the worker of the signaling channel
+        '''
+        if channel not in self._signaling:
+            self._signaling[channel] = AsyncDriver(self.sync.wlan, ThreadPoolExecutor(max_workers = 1, thread_name_prefix = 'AsyncCMW500CH{}'.format(channel)))
+        return self._signaling[channel]
+
+    def release(self):
+        for wlan in self._signaling.values():
+            wlan.release()
+        AsyncDriver.release(self)
+
+
+class AsyncSpectrumAnalyzer(AsyncDriver):
+    '''
+    await spectrum.get_peak() ...
+    '''
+    DRIVER_CLASS = SpectrumAnalyzer
+
+
+class AsyncTigerUUT(AsyncDriver):
+    '''
+    await uut.set_system_mode(mode) ...
+    '''
+    DRIVER_CLASS = TigerUUT
+
+
+async def open_station(cmw_address, spectrum_address, uut_port):
+    '''
+    Opens the CMW, the spectrum analyzer and the UUT at the same time.
+    @return: AsyncCMW500, AsyncSpectrumAnalyzer, AsyncTigerUUT
+    '''
+    instruments = await asyncio.gather(AsyncCMW500.open(cmw_address), AsyncSpectrumAnalyzer.open(spectrum_address), AsyncTigerUUT.open(uut_port), return_exceptions = True)
+    failures = [instrument for instrument in instruments if isinstance(instrument, Exception)]
+    if failures:
+        await asyncio.gather(*[instrument.close() for instrument in instruments if not isinstance(instrument, Exception)])
+        raise failures[0]
+    return instruments
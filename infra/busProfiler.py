@@ -0,0 +1,145 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class BusProfile(object):
+    '''
+    What a flow spent its time on - the wall time, the bus transactions, the sleeps and the I/O.
+    the sleep time is the one of the thread that slept the longest - the sleeps of concurrent threads overlap, so they arent added up.
+    '''
+
+    def __init__(self, wall_time = 0.0, round_trips = 0, io_time = 0.0, sleep_time = 0.0):
+        self.wall_time = wall_time
+        self.round_trips = round_trips
+        self.io_time = io_time
+        self.sleep_time = sleep_time
+
+    @property
+    def other_time(self):
+        '''
+        the wall time that wasnt spent on I/O or sleeps - waiting on the UUT frames, other threads and the code itself
+        '''
+        return max(self.wall_time - self.io_time - self.sleep_time, 0.0)
+
+    def __sub__(self, other):
+        return BusProfile(self.wall_time - other.wall_time, self.round_trips - other.round_trips,
+                          self.io_time - other.io_time, self.sleep_time - other.sleep_time)
+
+    def __add__(self, other):
+        return BusProfile(self.wall_time + other.wall_time, self.round_trips + other.round_trips,
+                          self.io_time + other.io_time, self.sleep_time + other.sleep_time)
+
+    def to_dict(self):
+        return {'wall_time': round(self.wall_time, 4),
+                'round_trips': self.round_trips,
+                'io_time': round(self.io_time, 4),
+                'sleep_time': round(self.sleep_time, 4)}
+
+    @classmethod
+    def from_dict(cls, values):
+        return cls(values['wall_time'], values['round_trips'], values['io_time'], values['sleep_time'])
+
+    def __str__(self):
+        return 'wall {:.3f}s, {} round trips, I/O {:.3f}s, sleep {:.3f}s, other {:.3f}s'.format(self.wall_time, self.round_trips, self.io_time,
+                                                                                               self.sleep_time, self.other_time)
+
+
+class BusProfiler(object):
+    '''
+    Counts the bus transactions and times the I/O and the sleeps of all threads.
+    the transports are wrapped by wrap(), the sleeps are counted per thread while the profiler is installed - sleeps inside a transport call are I/O.
+    '''
+    VISA_METHODS = ('write', 'read', 'read_raw', 'query')
+    SERIAL_METHODS = ('write',) # the serial reads are done by the reader thread, the waits for the frames are counted as other time
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._round_trips = 0
+        self._io_time = 0.0
+        self._sleep_times = {} # thread ident -> the requested sleep time of the thread
+        self._sleep = time.sleep
+
+    def wrap(self, transport, methods = VISA_METHODS):
+        '''
+        @param transport: an open VISA resource or serial port
+        @param methods: the transport methods that are bus transactions
+        @return: the transport, with its transactions counted and timed
+        '''
+        return ProfiledTransport(self, transport, methods)
+
+    @contextmanager
+    def installed(self):
+        '''
+        Counts the time.sleep calls inside the block, of every thread on its own.
+        '''
+        time.sleep = self._profiled_sleep
+        try:
+            yield self
+        finally:
+            time.sleep = self._sleep
+
+    def snapshot(self):
+        '''
+        @return(BusProfile): the totals so far, the sleep time is of the thread that slept the longest
+        '''
+        with self._lock:
+            return BusProfile(time.time(), self._round_trips, self._io_time, max(self._sleep_times.values() or [0.0]))
+
+    def _thread_sleep_times(self):
+        with self._lock:
+            return dict(self._sleep_times)
+
+    @contextmanager
+    def measure(self):
+        '''
+        Profiles the block - the yielded profile is filled when the block ends.
+        '''
+        profile = BusProfile()
+        start, start_sleep_times = self.snapshot(), self._thread_sleep_times()
+        try:
+            yield profile
+        finally:
+            difference = self.snapshot() - start
+            sleep_times = [sleep_time - start_sleep_times.get(thread, 0.0) for thread, sleep_time in self._thread_sleep_times().items()]
+            profile.wall_time, profile.round_trips = difference.wall_time, difference.round_trips
+            profile.io_time, profile.sleep_time = difference.io_time, max(sleep_times or [0.0])
+
+    def _profiled_sleep(self, seconds):
+        '''
+        the requested time is counted, not the elapsed one - the oversleep of the scheduler is jitter, and is left to the other time
+        '''
+        if not getattr(self._local, 'in_transport', False):
+            thread = threading.current_thread().ident
+            with self._lock:
+                self._sleep_times[thread] = self._sleep_times.get(thread, 0.0) + max(seconds, 0)
+        return self._sleep(seconds)
+
+    def _transaction(self, method, *args, **kwargs):
+        self._local.in_transport = True
+        start = time.time()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self._local.in_transport = False
+            with self._lock:
+                self._round_trips += 1
+                self._io_time += time.time() - start
+
+
+class ProfiledTransport(object):
+    '''
+    A transport proxy - the profiled methods are counted and timed, everything else is passed to the transport as is.
+    '''
+
+    def __init__(self, profiler, transport, methods):
+        self._profiler = profiler
+        self._transport = transport
+        self._methods = tuple(methods)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._transport, name)
+        if name in self._methods:
+            return lambda *args, **kwargs: self._profiler._transaction(attribute, *args, **kwargs)
+        return attribute
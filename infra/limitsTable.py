@@ -0,0 +1,168 @@
+import json
+import os
+import threading
+
+import numpy
+
+from ATE.cmw.consts import CmwWLANBands, CmwWLANChannels, CmwWLANStandards
+from utils.validation import Validation
+
+
+def wlan_channel_band(channel):
+    '''
+    @return(CmwWLANBands): the band of the WLAN broadcast channel
+    '''
+    return CmwWLANBands.BAND_2_4GHZ if channel <= CmwWLANBands.MAX_2_4GHZ_CHANNEL else CmwWLANBands.BAND_5GHZ
+
+
+def wlan_channel_frequency(channel):
+    '''
+    @return: the center frequency [Hz] of the WLAN broadcast channel - channel 1 = 2.412Ghz, channel 64 = 5.320 Ghz
+    '''
+    if channel == 14:
+        return 2484E6
+    if wlan_channel_band(channel) == CmwWLANBands.BAND_2_4GHZ:
+        return 2407E6 + channel * 5E6
+    return 5000E6 + channel * 5E6
+
+
+class Limit(object):
+
+    def __init__(self, min_limit, max_limit):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+
+    def __repr__(self):
+        return 'Limit({}, {})'.format(self.min_limit, self.max_limit)
+
+
+class LimitsTable(object):
+    '''
+    The test limits of a spec file, compiled once into a dict keyed by (test, standard, channel) - a lookup is a single dict access.
+    every spec entry has a test name and min/max, and is narrowed down by an optional WLAN standard, band or broadcast channel.
+    instead of min/max an entry can have points of [frequency, min, max] - the limits are interpolated at the frequency of every channel,
+    and at any frequency by limits_at. when several entries match a key the most specific one wins (channel over band over standard).
+    the spec file:
+        {"revision": "A",
+         "limits": [{"test": "tx_peak", "min": -10.0, "max": 20.0},
+                    {"test": "rx_sensitivity", "standard": "ACST", "band": "5GHz", "points": [[5180E6, -78.0, -75.0], [5825E6, -77.0, -74.0]]}]}
+    '''
+    CHANNEL_SPECIFICITY = 4
+    BAND_SPECIFICITY = 2
+    STANDARD_SPECIFICITY = 1
+    _loaded = {}
+    _loaded_lock = threading.Lock()
+
+    def __init__(self, spec, source = None):
+        '''
+        @param spec(dict): the parsed spec file
+        @param source: where the spec came from, for the error messages
+        @raise LimitsSpecException: in case the spec is invalid or two entries of the same specificity overlap
+        '''
+        self.source = source
+        self.revision = spec.get('revision')
+        self._limits = {}
+        self._curves = {}
+        self._compile(spec.get('limits', []))
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Loads and compiles the spec file once - it is compiled again only when the file changed, so a new spec revision needs no code edits.
+        @return(LimitsTable): the compiled table
+        '''
+        modified = os.path.getmtime(path)
+        with cls._loaded_lock:
+            table, loaded_modified = cls._loaded.get(path, (None, None))
+            if table is None or loaded_modified != modified:
+                with open(path) as spec_file:
+                    table = cls(json.load(spec_file), path)
+                cls._loaded[path] = (table, modified)
+        return table
+
+    def get(self, test, standard = None, channel = None):
+        '''
+        @param test: the test name, like rx_sensitivity
+        @param standard(CmwWLANStandards): the WLAN standard of the measurement, None if it has none
+        @param channel(int): the WLAN broadcast channel of the measurement, None if it has none
+        @raise LimitsSpecException: in case the spec has no limits for the key
+        @return(Limit): the limits of the measurement
+        '''
+        try:
+            return self._limits[(test, standard, channel)]
+        except KeyError:
+            raise LimitsSpecException('{} : no limits for {} (standard {}, channel {})'.format(self.source, test, standard, channel))
+
+    def limits_at(self, test, frequencies, standard = None, band = None):
+        '''
+        interpolates the limits of a test at any frequencies, from the points of its entry
+        @param frequencies(array like): the frequencies [Hz]
+        @return(tuple): the min limits and the max limits, arrays of the frequencies shape
+        '''
+        try:
+            curve_frequencies, min_limits, max_limits = self._curves[(test, standard, band)]
+        except KeyError:
+            raise LimitsSpecException('{} : no limit points for {} (standard {}, band {})'.format(self.source, test, standard, band))
+        return numpy.interp(frequencies, curve_frequencies, min_limits), numpy.interp(frequencies, curve_frequencies, max_limits)
+
+    def evaluate(self, test, values, standard = None, channel = None):
+        '''
+        checks the values of a test against its limits - see Validation.evaluate_limits
+        @return(tuple): the limit, the pass mask and the margins
+        '''
+        limit = self.get(test, standard, channel)
+        mask, margins = Validation.evaluate_limits(values, limit.min_limit, limit.max_limit)
+        return limit, mask, margins
+
+    def _compile(self, entries):
+        specificities = {}
+        for entry in sorted(entries, key = self._specificity):
+            specificity = self._specificity(entry)
+            for key, limit in self._expand(entry):
+                if specificities.get(key) == specificity:
+                    raise LimitsSpecException('{} : the limits of {} are defined twice (standard {}, channel {})'.format(self.source, *key))
+                specificities[key] = specificity
+                self._limits[key] = limit
+
+    def _specificity(self, entry):
+        return (self.CHANNEL_SPECIFICITY * ('channel' in entry) + self.BAND_SPECIFICITY * ('band' in entry) +
+                self.STANDARD_SPECIFICITY * ('standard' in entry))
+
+    def _expand(self, entry):
+        '''
+        @return(generator): (key, Limit) of every lookup key the entry covers
+        '''
+        if 'test' not in entry:
+            raise LimitsSpecException('{} : a limits entry has no test name - {}'.format(self.source, entry))
+        test = entry['test']
+        standard = entry.get('standard')
+        if standard is not None:
+            Validation.validate_elements_in_list('Standard of {}'.format(test), standard, CmwWLANStandards.supported_wlan_standards, LimitsSpecException)
+        if 'band' in entry:
+            Validation.validate_elements_in_list('Band of {}'.format(test), entry['band'], CmwWLANBands.supported_bands, LimitsSpecException)
+        standards = [standard] if standard is not None else CmwWLANStandards.supported_wlan_standards + [None]
+        if 'channel' in entry:
+            channels = [entry['channel']]
+        elif 'band' in entry:
+            channels = [channel for channel in CmwWLANChannels.supported_wlan_channels if wlan_channel_band(channel) == entry['band']]
+        else:
+            channels = list(CmwWLANChannels.supported_wlan_channels) + [None]
+        if 'points' in entry:
+            points = numpy.array(sorted(entry['points']), dtype = float)
+            if points.ndim != 2 or points.shape[1] != 3:
+                raise LimitsSpecException('{} : the points of {} arent [frequency, min, max] - {}'.format(self.source, test, entry['points']))
+            for curve_standard in [standard] if standard is not None else [None]:
+                self._curves[(test, curve_standard, entry.get('band'))] = (points[:, 0], points[:, 1], points[:, 2])
+            limits = dict((channel, Limit(float(numpy.interp(wlan_channel_frequency(channel), points[:, 0], points[:, 1])),
+                                          float(numpy.interp(wlan_channel_frequency(channel), points[:, 0], points[:, 2]))))
+                          for channel in channels if channel is not None)
+        else:
+            limit = Limit(entry.get('min', float('-inf')), entry.get('max', float('inf')))
+            limits = dict((channel, limit) for channel in channels)
+        for key_standard in standards:
+            for channel, limit in limits.items():
+                yield (test, key_standard, channel), limit
+
+
+class LimitsSpecException(Exception):
+    pass
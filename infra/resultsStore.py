@@ -0,0 +1,248 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from utils.stationLogging import get_logger
+
+
+class Measurement(object):
+
+    def __init__(self, name, value, min_limit, max_limit, passed):
+        self.name = name
+        self.value = value
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.passed = passed
+
+
+class UnitResult(object):
+    '''
+    The results of a single unit - its identity and its measurements with their limits.
+    '''
+
+    def __init__(self, serial_number, batch_id, firmware_version = None, station = None, required_measurements = ()):
+        '''
+        @param required_measurements: the names of the measurements the test must take - the unit fails if any of them is missing
+        '''
+        self.serial_number = serial_number
+        self.batch_id = batch_id
+        self.firmware_version = firmware_version
+        self.station = station
+        self.required_measurements = list(required_measurements)
+        self.started_at = time.time()
+        self.finished_at = None
+        self.measurements = []
+        self.error = None
+
+    def add_measurement(self, name, value, min_limit, max_limit, passed):
+        '''
+        @param name: the measurement name, like tx_peak
+        @param value(float): the measured value
+        @param min_limit,max_limit(float): the limits the value was checked against
+        @param passed(bool): the check result
+        '''
+        self.measurements.append(Measurement(name, value, min_limit, max_limit, passed))
+
+    @property
+    def missing_measurements(self):
+        '''
+        @return(list): the required measurements the unit has no result of
+        '''
+        names = set(measurement.name for measurement in self.measurements)
+        return [name for name in self.required_measurements if name not in names]
+
+    @property
+    def passed(self):
+        '''
+        True if the test wasnt aborted, the unit has all the required measurements, and all of its measurements passed
+        '''
+        return self.error is None and bool(self.measurements) and not self.missing_measurements and \
+            all(measurement.passed for measurement in self.measurements)
+
+    def finish(self, error = None):
+        '''
+        @param error: the exception (or reason) the test of the unit was aborted by, None if it ran to its end
+        '''
+        self.finished_at = time.time()
+        if error is not None:
+            self.error = str(error) or type(error).__name__
+        elif self.missing_measurements:
+            self.error = 'missing measurements - {}'.format(', '.join(self.missing_measurements))
+
+
+class ResultsStore(object):
+    '''
+    Append only store of the unit results - SQLite in WAL mode, written by a background thread in batched transactions.
+    record() only queues the result, so the test never waits for the disk. readers use their own connections, and arent blocked by the writer.
+    '''
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS units (
+            id INTEGER PRIMARY KEY,
+            serial_number TEXT NOT NULL,
+            batch_id TEXT,
+            firmware_version TEXT,
+            station TEXT,
+            started_at REAL,
+            finished_at REAL,
+            passed INTEGER NOT NULL,
+            error TEXT
+        );
+        CREATE TABLE IF NOT EXISTS measurements (
+            unit_id INTEGER NOT NULL REFERENCES units(id),
+            name TEXT NOT NULL,
+            value REAL,
+            min_limit REAL,
+            max_limit REAL,
+            passed INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS units_serial_number ON units(serial_number);
+        CREATE INDEX IF NOT EXISTS units_batch_id ON units(batch_id);
+        CREATE INDEX IF NOT EXISTS measurements_unit_id ON measurements(unit_id);
+    '''
+    BATCH_SIZE = 200 # most results written in a single transaction
+    FLUSH_INTERVAL = 1.0 # longest time [s] a queued result waits for more results to share its transaction
+
+    def __init__(self, path):
+        '''
+        Opens (or creates) the store and starts its writer thread.
+        @param path: the SQLite database file
+        '''
+        self.path = path
+        self.logger = get_logger('results_store', path)
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        connection = self._connect()
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(self.SCHEMA)
+        self._migrate(connection)
+        connection.close()
+        self._results = queue.Queue()
+        self._writer_error = None
+        self._writer = threading.Thread(target=self._write_results, name='ResultsWriter')
+        self._writer.daemon = True
+        self._writer.start()
+
+    def record(self, unit_result):
+        '''
+        Queues the unit result for writing - returns right away.
+        @param unit_result(UnitResult): the result to store
+        '''
+        self._raise_writer_error()
+        self._results.put(unit_result)
+
+    def flush(self):
+        '''
+        Blocks until all the queued results are written.
+        '''
+        self._results.join()
+        self._raise_writer_error()
+
+    def close(self):
+        '''
+        Writes the queued results and stops the writer thread.
+        '''
+        self._results.put(None)
+        self._writer.join()
+        self._raise_writer_error()
+
+    def find_by_serial_number(self, serial_number):
+        '''
+        @return(list): dicts of the units with the serial number, each with its measurements, oldest first
+        '''
+        return self._find_units('serial_number = ?', (serial_number,))
+
+    def find_by_batch(self, batch_id):
+        '''
+        @return(list): dicts of the units of the batch, each with its measurements, oldest first
+        '''
+        return self._find_units('batch_id = ?', (batch_id,))
+
+    def batch_summary(self, batch_id):
+        '''
+        @return(dict): the units, passed units, aborted units and yield of the batch - a unit tested several times is counted by its last result
+        '''
+        connection = self._connect()
+        try:
+            units, passed, aborted = connection.execute('''
+                SELECT COUNT(*), COALESCE(SUM(passed AND error IS NULL), 0), COALESCE(SUM(error IS NOT NULL), 0) FROM units
+                WHERE id IN (SELECT MAX(id) FROM units WHERE batch_id = ? GROUP BY serial_number)''', (batch_id,)).fetchone()
+        finally:
+            connection.close()
+        return {'batch_id': batch_id, 'units': units, 'passed': passed, 'aborted': aborted, 'yield': float(passed) / units if units else 0.0}
+
+    def _find_units(self, condition, parameters):
+        connection = self._connect()
+        connection.row_factory = sqlite3.Row
+        try:
+            units = [dict(row) for row in connection.execute('SELECT * FROM units WHERE {} ORDER BY id'.format(condition), parameters)]
+            for unit in units:
+                unit['measurements'] = [dict(row) for row in connection.execute('SELECT name, value, min_limit, max_limit, passed FROM measurements '
+                                                                                 'WHERE unit_id = ?', (unit['id'],))]
+        finally:
+            connection.close()
+        return units
+
+    @staticmethod
+    def _migrate(connection):
+        '''
+        Adds the columns the store gained to a store created by an older version.
+        '''
+        columns = [row[1] for row in connection.execute('PRAGMA table_info(units)')]
+        if 'error' not in columns:
+            with connection:
+                connection.execute('ALTER TABLE units ADD COLUMN error TEXT')
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def _write_results(self):
+        connection = self._connect()
+        try:
+            stopping = False
+            while not stopping:
+                pending = [self._results.get()]
+                deadline = time.time() + self.FLUSH_INTERVAL
+                while pending[-1] is not None and len(pending) < self.BATCH_SIZE:
+                    try:
+                        pending.append(self._results.get(timeout=max(deadline - time.time(), 0)))
+                    except queue.Empty:
+                        break
+                stopping = pending[-1] is None
+                results = [unit_result for unit_result in pending if unit_result is not None]
+                try:
+                    if results:
+                        self._insert(connection, results)
+                        self.logger.debug('%s unit results written', len(results))
+                except Exception as e:
+                    self._writer_error = e
+                    self.logger.error('Failed writing %s unit results - %s', len(results), e)
+                finally:
+                    for _ in pending:
+                        self._results.task_done()
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _insert(connection, results):
+        with connection:
+            for unit_result in results:
+                cursor = connection.execute('INSERT INTO units (serial_number, batch_id, firmware_version, station, started_at, finished_at, passed, error) '
+                                            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                            (unit_result.serial_number, unit_result.batch_id, unit_result.firmware_version, unit_result.station,
+                                             unit_result.started_at, unit_result.finished_at, int(unit_result.passed), unit_result.error))
+                connection.executemany('INSERT INTO measurements (unit_id, name, value, min_limit, max_limit, passed) VALUES (?, ?, ?, ?, ?, ?)',
+                                       [(cursor.lastrowid, measurement.name, measurement.value, measurement.min_limit, measurement.max_limit,
+                                         int(measurement.passed)) for measurement in unit_result.measurements])
+
+    def _raise_writer_error(self):
+        if self._writer_error is not None:
+            raise ResultsStoreException('{} : writing the unit results failed - {}'.format(self.path, self._writer_error))
+
+
+class ResultsStoreException(Exception):
+    pass
@@ -0,0 +1,108 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TestStage(object):
+    '''
+    A step of a test body - it runs once all of its dependencies finished, while it holds all of its resources.
+    '''
+
+    def __init__(self, name, action, depends_on = (), resources = ()):
+        '''
+        @param name: the stage name
+        @param action: callable without arguments that runs the stage
+        @param depends_on: names of the stages that must finish before this stage starts
+        @param resources: names of the instruments the stage uses, stages that share a resource never run at the same time
+        '''
+        self.name = name
+        self.action = action
+        self.depends_on = tuple(depends_on)
+        self.resources = tuple(resources)
+
+
+class StageGraphReport(object):
+
+    def __init__(self, stage_durations, wall_time):
+        self.stage_durations = stage_durations
+        self.wall_time = wall_time
+
+    @property
+    def sequential_time(self):
+        return sum(self.stage_durations.values())
+
+    @property
+    def saved_time(self):
+        return self.sequential_time - self.wall_time
+
+    def __str__(self):
+        stages = ', '.join('{} {:.2f}s'.format(name, duration) for name, duration in self.stage_durations.items())
+        return 'stages: {} - wall time {:.2f}s instead of {:.2f}s sequentially, saved {:.2f}s'.format(stages, self.wall_time, self.sequential_time, self.saved_time)
+
+
+class StageGraph(object):
+    '''
+    Runs the stages of a test body concurrently - only dependencies and shared resources serialize them.
+    '''
+
+    def __init__(self, stages):
+        self.stages = self._sort_stages(stages)
+        resources = set(resource for stage in self.stages for resource in stage.resources)
+        self._resource_locks = dict((resource, threading.Lock()) for resource in resources)
+
+    def run(self):
+        '''
+        Runs all the stages, the first stage failure is raised after the running stages ended.
+        @return(StageGraphReport): the stage durations and the wall time
+        '''
+        stage_durations = dict((stage.name, 0.0) for stage in self.stages)
+        futures = {}
+        start = time.time()
+        with ThreadPoolExecutor(max_workers = len(self.stages), thread_name_prefix = 'TestStage') as executor:
+            for stage in self.stages:
+                dependencies = [futures[name] for name in stage.depends_on]
+                futures[stage.name] = executor.submit(self._run_stage, stage, dependencies, stage_durations)
+        for stage in self.stages:
+            futures[stage.name].result()
+        return StageGraphReport(stage_durations, time.time() - start)
+
+    def _run_stage(self, stage, dependencies, stage_durations):
+        for dependency in dependencies:
+            dependency.result()
+        locks = [self._resource_locks[resource] for resource in sorted(stage.resources)]
+        for lock in locks:
+            lock.acquire()
+        try:
+            stage_start = time.time()
+            stage.action()
+            stage_durations[stage.name] = time.time() - stage_start
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    @staticmethod
+    def _sort_stages(stages):
+        '''
+        @return: the stages ordered so every stage comes after its dependencies
+        @raise ValueError: in case of an unknown dependency or a dependency cycle
+        '''
+        stages_by_name = dict((stage.name, stage) for stage in stages)
+        ordered, visiting, visited = [], set(), set()
+
+        def visit(stage):
+            if stage.name in visited:
+                return
+            if stage.name in visiting:
+                raise ValueError('Stage {} depends on itself'.format(stage.name))
+            visiting.add(stage.name)
+            for name in stage.depends_on:
+                if name not in stages_by_name:
+                    raise ValueError('Stage {} depends on an unknown stage {}'.format(stage.name, name))
+                visit(stages_by_name[name])
+            visiting.discard(stage.name)
+            visited.add(stage.name)
+            ordered.append(stage)
+
+        for stage in stages:
+            visit(stage)
+        return ordered
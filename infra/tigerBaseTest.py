@@ -1,11 +1,8 @@
+from utils.stationLogging import get_logger
 
 
 class TigerBaseTest():
     '''
     This Class should contain all the shared funcs and procedures for all tests.
     '''
-
-    def print_to_log(self, msg):
-        print(self._format_msg(msg))
-        self.logger.info(msg)
-
+    logger = get_logger('test')
@@ -2,6 +2,7 @@ import time
 
 from serial import SerialException
 from utils.connections.serialCommunication import SerialCommunication
+from utils.stationLogging import get_logger
 from utils.validation import Validation
 
 
@@ -9,65 +10,71 @@ class TigerUUT(object):
     SYSTEM_RX_MODE = 'SYS_RX'
     SYSTEM_CW_MODE = 'SYS_CW'
     SUPPORTED_SYS_STATES = [SYSTEM_CW_MODE, SYSTEM_RX_MODE]
+    BOOT_POLL_INTERVAL = 0.05 # the delay [s] between GetVersion tries while the uut boots
+    BOOT_POLL_RESPONSE_TIMEOUT = 0.25 # the time [s] a GetVersion try waits for the answer while the uut boots
 
     def __init__(self, port_name = 'COM33', baud_rate = 115200):
         self.port_name = port_name
+        self.logger = get_logger('uut', port_name)
         self.baudrate = baud_rate
         self.connection = SerialCommunication(self.port_name, baud_rate)
         self.validate_uut_is_on()
 
     def validate_uut_is_on(self, timeout = 10):
-        self.print_to_log('Validating if UUT is on..')
+        '''
+        polls GetVersion until the uut answers - every try waits BOOT_POLL_RESPONSE_TIMEOUT, so the uut is detected right after it booted
+        @param timeout: the time [s] the uut has to boot
+        @raise UUTConnectionException: in case the uut didnt answer during the timeout
+        '''
+        self.logger.info('Validating if UUT is on..')
         start_time = time.time()
         while time.time() - start_time < timeout:
             try:
-                self.print_to_log('trying to get version from uut..')
-                resp = self.connection.send_receive('GetVersion\r\n')
-                if resp.__contains__('Version:'):
-                    self.print_to_log('UUT is up!')
+                self.logger.debug('trying to get version from uut..')
+                resp = self.connection.send_receive('GetVersion\r\n', timeout=self.BOOT_POLL_RESPONSE_TIMEOUT, match=self._is_version_frame)
+                if resp is not None:
+                    self.logger.info('UUT is up after %.2f seconds!', time.time() - start_time)
                     break
                 else:
-                    time.sleep(1)
+                    time.sleep(self.BOOT_POLL_INTERVAL)
             except SerialException:
-                time.sleep(1)
+                time.sleep(self.BOOT_POLL_INTERVAL)
         else:
-            self.print_to_log('UUT is not up after {} seconds, please check your uut manually and validate your setup.'.format(timeout))
+            self.logger.error('UUT is not up after %s seconds, please check your uut manually and validate your setup.', timeout)
             raise UUTConnectionException('UUT is not up after {} seconds, please check your uut manually and validate your setup.'.format(timeout))
 
     def get_version(self):
-        self.print_to_log('Getting UUT version..')
-        resp = self.connection.send_receive('GetVersion\r\n')
-        self.print_to_log('UUT version is {}'.format(resp))
+        self.logger.info('Getting UUT version..')
+        resp = self.connection.send_receive('GetVersion\r\n', match=self._is_version_frame)
+        self.logger.info('UUT version is %s', resp)
         return resp
 
+    @staticmethod
+    def _is_version_frame(frame):
+        return frame.__contains__('Version:')
+
     def set_system_mode(self, mode):
-        self.print_to_log('Moving system to {} mode..'.format(mode))
+        self.logger.info('Moving system to %s mode..', mode)
         Validation.validate_elements_in_list('System Mode', [mode], self.SUPPORTED_SYS_STATES)
-        self.connection.send('system state {}'.format(mode))
+        self.connection.send('system state {}\r\n'.format(mode))
         Validation.check_identical_value('System mode', self.get_system_mode(), mode, cast=str)
-        self.print_to_log('UUT system mode is {}'.format(self.get_system_mode()))
+        self.logger.info('UUT system mode is %s', self.get_system_mode())
 
     def get_system_mode(self):
-        self.print_to_log('getting system mode..')
+        self.logger.info('getting system mode..')
         resp = self.connection.send_receive('get system mode\r\n')
-        self.print_to_log('System mode is {}'.format(resp))
+        self.logger.info('System mode is %s', resp)
         return resp
 
     def transmit_cw(self, frequency = 1000000):
-        self.print_to_log('Transmit CW..')
+        self.logger.info('Transmit CW..')
         self.connection.send('CW {}\r\n'.format(frequency))
-        self.print_to_log('UUT is transmitting CW')
+        self.logger.info('UUT is transmitting CW')
 
     def close(self):
-        self.print_to_log('Closng..')
+        self.logger.info('Closng..')
         self.connection.close()
-        self.print_to_log('Closed!')
-
-    def print_to_log(self, msg):
-        print(self._format_msg(msg))
-
-    def _format_msg(self, msg):
-        return 'TigerUUT({}) : {}'.format(self.port_name, msg)
+        self.logger.info('Closed!')
 
 
 class UUTConnectionException(Exception):
@@ -0,0 +1,102 @@
+import asyncio
+import os
+
+from ATE.cmw.consts import CmwStates
+from ATE.cmw.rohdeSchwarzCMW500 import CMW500
+from infra.asyncInstruments import AsyncCMW500, AsyncTigerUUT
+from infra.tigerUUT import TigerUUT
+from tests.systemRFTest import SystemRFTest
+from utils.stationLogging import get_logger
+
+
+class MultiUUTSensitivityTest(SystemRFTest):
+    '''
+    RX sensetivity of up to four UUTs on one CMW500 - every UUT gets its own signaling channel and RF path, and the UUTs are tested concurrently.
+    '''
+    UUT_COMS = ['COM22', 'COM23', 'COM24', 'COM25']
+    START_POWER = -70.0
+    STOP_POWER = -80.0
+    LOG_FILE_PATH = r'C:\Tests_Logs\Multi_UUT_Sensitivity_Test'
+    logger = get_logger('multi_uut_sensitivity_test')
+
+    def setup(self):
+        'Init for all of the test componenets : log, CMW, uuts and their signaling channels'
+        self.set_logger()
+        self.logger.info('Test Setup..')
+        self.init_limits()
+        self.init_cmw()
+        self.uuts = {}
+        for uut_com in self.UUT_COMS:
+            lease = self.cmw.channel_leases.acquire(uut_com)
+            self.logger.info('UUT %s got signaling channel %s', uut_com, lease.channel)
+            self.uuts[lease.channel] = (lease, TigerUUT(uut_com))
+
+    def init_cmw(self):
+        self.logger.info('Init CMW')
+        self.cmw = CMW500(self.CMW_GPIB_ADDRESS)
+        self.cmw.preset()
+
+    def body(self):
+        self.logger.info('Test Body..')
+        sens_values = asyncio.run(self._check_rx_sensetivities())
+        channels = sorted(sens_values)
+        limit, mask, margins = self.limits.evaluate('rx_sensitivity', [sens_values[channel] for channel in channels], self.WIFI_STANDARD, self.WIFI_CHANNEL)
+        for channel, result, margin in zip(channels, mask, margins):
+            lease, uut = self.uuts[channel]
+            self.logger.info('UUT %s Sensetivity Threshold is %s, pass = %s, margin %s', uut.port_name, sens_values[channel], result, margin)
+
+    async def _check_rx_sensetivities(self):
+        '''
+        Tests every UUT on its own coroutine - the scenario, the channel turn on and the search of a UUT overlap those of the other UUTs.
+        @return(dict): signaling channel -> the sensetivity threshold of its UUT
+        '''
+        cmw = AsyncCMW500.wrap(self.cmw)
+        try:
+            channels = sorted(self.uuts)
+            sens_values = await asyncio.gather(*[self._check_rx_sensetivity(cmw, channel) for channel in channels])
+        finally:
+            cmw.release()
+        return dict(zip(channels, sens_values))
+
+    async def _check_rx_sensetivity(self, cmw, channel):
+        lease, uut = self.uuts[channel]
+        wlan, async_uut = cmw.signaling(channel), AsyncTigerUUT.wrap(uut)
+        try:
+            await wlan.ext_config_leased_wlan_scenario(lease, wifi_standard=self.WIFI_STANDARD, freq_channel=self.WIFI_CHANNEL)
+            await wlan.set_channel_state(channel, CmwStates.ON)
+            await async_uut.set_system_mode(uut.SYSTEM_RX_MODE)
+            return await wlan.ext_get_sesetivity_threshold(channel, start_power=self.START_POWER, stop_power=self.STOP_POWER)
+        finally:
+            async_uut.release()
+
+    def cleanup(self):
+        self.logger.info('Test Cleanup..')
+        for lease, uut in getattr(self, 'uuts', {}).values():
+            self.cmw.wlan.set_channel_state(lease.channel, CmwStates.OFF)
+            self.cmw.channel_leases.release(lease)
+            uut.close()
+        if hasattr(self, 'cmw'):
+            self.cmw.close()
+        self.close_visa_sessions()
+        self.close_log_file()
+
+
+def main():
+    try:
+        sensitivity_test = MultiUUTSensitivityTest()
+        sensitivity_test.set_logger()
+        sensitivity_test.logger.info("Multi UUT Sensitivity Test Starting:\n\n")
+        sensitivity_test.setup()
+        sensitivity_test.body()
+        sensitivity_test.logger.info("Multi UUT Sensitivity Test finished!!!\n\n")
+    finally:
+        sensitivity_test.cleanup()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print("Multi UUT Sensitivity Test failed!!!!\n\nEXCEPTION: {}".format(e))
+    finally:
+        os.system("pause")
@@ -0,0 +1,121 @@
+import argparse
+import sys
+
+from ATE.cmw.consts import CmwStates
+from ATE.cmw.modules.perEarlyStop import PEREarlyStopSettings
+from ATE.cmw.rohdeSchwarzCMW500 import CMW500
+from infra.tigerUUT import TigerUUT
+from utils.simulators.simulatedBench import PERCurve, SimulatedBench, SimulationTiming, set_default_bench
+
+
+class PERRunsSummary(object):
+    '''
+    The full and the early stopped PER runs of one AP power.
+    '''
+
+    def __init__(self, ap_power, expected_per, transport_blocks_amount):
+        self.ap_power = ap_power
+        self.expected_per = expected_per
+        self.transport_blocks_amount = transport_blocks_amount
+        self.full_runs = []
+        self.early_stop_runs = []
+
+    @property
+    def average_packets_sent(self):
+        return float(sum(result.packets_sent for result in self.early_stop_runs)) / len(self.early_stop_runs)
+
+    @property
+    def average_packets_saved(self):
+        return float(sum(result.packets_saved for result in self.early_stop_runs)) / len(self.early_stop_runs)
+
+    @property
+    def disagreements(self):
+        '''
+        the early stopped runs whose verdict differs from the full run they were paired with
+        '''
+        return sum(full.is_failed != early.is_failed for full, early in zip(self.full_runs, self.early_stop_runs))
+
+
+class PEREarlyStopBenchmark(object):
+    '''
+    Measures the packets the early stop PER mode saves - runs WLAN.ext_measure_per with and without early stop on the simulated CMW,
+    at AP powers across the PER curve of the UUT, and counts the verdicts the early stop changed.
+    '''
+    AP_POWERS = [-70.0, -73.0, -75.0, -76.0, -77.0, -79.0] # from far above the sensitivity to the midpoint of the default PER curve
+    TRANSPORT_BLOCKS_AMOUNT = 500
+    PER_THRESHOLD = 8.0
+    TRANSPORT_TIMEOUT = 300
+
+    def __init__(self, bench, early_stop_settings = None, ap_powers = None):
+        self.bench = bench
+        self.early_stop_settings = early_stop_settings or PEREarlyStopSettings()
+        self.ap_powers = ap_powers or self.AP_POWERS
+
+    def run(self, runs = 5):
+        '''
+        @param runs: the full and the early stopped runs at every AP power
+        @return(list): a PERRunsSummary per AP power
+        '''
+        set_default_bench(self.bench)
+        cmw = CMW500(SimulatedBench.CMW500_ADDRESS)
+        uut = None
+        lease = cmw.channel_leases.acquire(SimulatedBench.UUT_URL)
+        try:
+            cmw.preset()
+            cmw.wlan.ext_config_leased_wlan_scenario(lease)
+            uut = TigerUUT(SimulatedBench.UUT_URL)
+            cmw.wlan.set_channel_state(lease.channel, CmwStates.ON)
+            uut.set_system_mode(uut.SYSTEM_RX_MODE)
+            return [self._run_ap_power(cmw.wlan, lease.channel, ap_power, runs) for ap_power in self.ap_powers]
+        finally:
+            cmw.wlan.set_channel_state(lease.channel, CmwStates.OFF)
+            cmw.channel_leases.release(lease)
+            if uut is not None:
+                uut.close()
+            cmw.close()
+
+    def _run_ap_power(self, wlan, channel, ap_power, runs):
+        wlan.set_AP_power(channel, ap_power)
+        summary = PERRunsSummary(ap_power, self.bench.per_curve.per(ap_power), self.TRANSPORT_BLOCKS_AMOUNT)
+        for _ in range(runs):
+            summary.full_runs.append(wlan.ext_measure_per(channel, self.TRANSPORT_BLOCKS_AMOUNT, self.PER_THRESHOLD,
+                                                          transport_timeout = self.TRANSPORT_TIMEOUT))
+            summary.early_stop_runs.append(wlan.ext_measure_per(channel, self.TRANSPORT_BLOCKS_AMOUNT, self.PER_THRESHOLD,
+                                                                self.early_stop_settings, self.TRANSPORT_TIMEOUT))
+        return summary
+
+    @staticmethod
+    def format_report(summaries):
+        lines = ['{:<14}{:>10}{:>14}{:>15}{:>18}'.format('AP power [dBm]', 'PER [%]', 'packets sent', 'packets saved', 'changed verdicts')]
+        for summary in summaries:
+            lines.append('{:<14.1f}{:>10.2f}{:>14.1f}{:>15.1f}{:>14}/{:<3}'.format(summary.ap_power, summary.expected_per, summary.average_packets_sent,
+                                                                               summary.average_packets_saved, summary.disagreements,
+                                                                               len(summary.early_stop_runs)))
+        sent = sum(summary.average_packets_sent for summary in summaries) / len(summaries)
+        full = sum(summary.transport_blocks_amount for summary in summaries) / float(len(summaries))
+        lines.append('average packets sent: {:.1f} of {:.0f} ({:.1f}% saved)'.format(sent, full, 100.0 * (full - sent) / full))
+        return '\n'.join(lines)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Measures the packets the early stop PER mode saves on the simulated CMW')
+    parser.add_argument('--runs', type=int, default=5, help='full and early stopped runs at every AP power')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the bench random generator')
+    parser.add_argument('--packets-per-second', type=float, default=200, help='rate of the CMW PER packets - slow enough for the polls to see the run')
+    parser.add_argument('--poll-interval', type=float, default=0.1, help='time between the intermediate PER fetches [s]')
+    parser.add_argument('--per-midpoint', type=float, default=-79.0, help='AP power of 50%% PER [dBm]')
+    parser.add_argument('--per-slope', type=float, default=0.8, help='slope of the PER curve [1/dB]')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    bench = SimulatedBench(timing=SimulationTiming(per_packets_per_second=args.packets_per_second), per_curve=PERCurve(args.per_midpoint, args.per_slope),
+                           seed=args.seed)
+    benchmark = PEREarlyStopBenchmark(bench, PEREarlyStopSettings(poll_interval=args.poll_interval))
+    print(PEREarlyStopBenchmark.format_report(benchmark.run(args.runs)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import argparse
+import os
+import tempfile
+
+from tests.systemRFTest import SystemRFTest, main
+from utils.connections import ioTracer
+from utils.stationLogging import get_logger
+from utils.simulators.simulatedBench import PERCurve, SimulatedBench, SimulationTiming, set_default_bench
+
+
+class SimulatedSystemRFTest(SystemRFTest):
+    '''
+    System RF Test on the simulated bench - runs on any machine without the CMW500, the spectrum analyzer and the UUT.
+    '''
+    CMW_GPIB_ADDRESS = SimulatedBench.CMW500_ADDRESS
+    SPECTRUM_GPIB_ADDRESS = SimulatedBench.CXA_ADDRESS
+    UUT_COM = SimulatedBench.UUT_URL
+    LOG_FILE_PATH = os.path.join(tempfile.gettempdir(), 'System_RF_Test_Simulated.log')
+    RESULTS_DB_PATH = os.path.join(tempfile.gettempdir(), 'System_RF_Test_Simulated_Results.db')
+    logger = get_logger('simulated_system_rf_test')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Runs the System RF Test on the simulated bench')
+    parser.add_argument('--serial-number', default='SIM0001', help='serial number of the simulated unit')
+    parser.add_argument('--batch-id', default='SIM-BATCH', help='batch of the simulated unit')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the bench random generator, for repeatable runs')
+    parser.add_argument('--command-latency', type=float, default=0.002, help='bus latency of every VISA write and read [s]')
+    parser.add_argument('--settle-time', type=float, default=0.2, help='time a CMW signaling channel takes to turn on [s]')
+    parser.add_argument('--uut-boot-time', type=float, default=0.5, help='time the UUT doesnt answer after its port was opened [s]')
+    parser.add_argument('--packets-per-second', type=float, default=2000, help='rate of the CMW PER packets')
+    parser.add_argument('--per-midpoint', type=float, default=-79.0, help='AP power of 50%% PER [dBm]')
+    parser.add_argument('--per-slope', type=float, default=0.8, help='slope of the PER curve [1/dB]')
+    parser.add_argument('--drop-probability', type=float, default=0.0, help='chance the UUT drops the association when the AP power changes')
+    parser.add_argument('--peak-noise', type=float, default=0.1, help='standard deviation of the measured peak [dB]')
+    parser.add_argument('--trace', default=None, help='path of a Chrome trace JSON file of all the instrument I/O, prints the latency histogram too')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    set_default_bench(SimulatedBench(timing=SimulationTiming(command_latency=args.command_latency, per_packets_per_second=args.packets_per_second,
+                                                             channel_settle_time=args.settle_time, uut_boot_time=args.uut_boot_time),
+                                     per_curve=PERCurve(args.per_midpoint, args.per_slope), seed=args.seed,
+                                     association_drop_probability=args.drop_probability, peak_noise=args.peak_noise))
+    if args.trace is None:
+        main(SimulatedSystemRFTest, args.serial_number, args.batch_id)
+    else:
+        with ioTracer.tracing() as tracer:
+            try:
+                main(SimulatedSystemRFTest, args.serial_number, args.batch_id)
+            finally:
+                tracer.save_chrome_trace(args.trace)
+                print(tracer.format_histogram())
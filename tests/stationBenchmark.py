@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import sys
+from collections import OrderedDict
+
+from infra.busProfiler import BusProfile, BusProfiler
+from tests.simulatedSystemRFTest import SimulatedSystemRFTest
+from utils.simulators.simulatedBench import SimulatedBench, set_default_bench
+
+
+class StationBenchmark(object):
+    '''
+    Profiles the System RF Test flows on the simulated bench - the wall time, the bus round trips, the sleep time vs the I/O time
+    and the units per hour, and compares them to a stored baseline.
+    '''
+    FLOWS = ['setup', 'ext_config_wlan_scenario', 'check_tx_power', 'check_rx_sensetivity', 'per_step']
+    UNIT_FLOWS = ['setup', 'ext_config_wlan_scenario', 'check_tx_power', 'check_rx_sensetivity'] # the flows every unit goes through
+    PER_STEP_POWER = -74.0
+    PER_STEP_PACKETS = 500
+    PER_STEP_THRESHOLD = 8.0
+    PER_STEP_TIMEOUT = 300
+    SERIAL_NUMBER = 'BENCHMARK'
+    BATCH_ID = 'BENCHMARK'
+    DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'stationBenchmark.json')
+    SLEEP_TIME_TOLERANCE = 0.001 # absolute sleep time increase [s] that is a regression - the requested sleeps are counted, so they dont jitter
+
+    def __init__(self, bench = None, test_class = SimulatedSystemRFTest):
+        self.bench = bench or SimulatedBench(seed = 0)
+        self.test_class = test_class
+        self.profiler = BusProfiler()
+        self.bench.set_transport_wrappers(visa_wrapper = lambda instrument: self.profiler.wrap(instrument, BusProfiler.VISA_METHODS),
+                                          serial_wrapper = lambda port: self.profiler.wrap(port, BusProfiler.SERIAL_METHODS))
+
+    def run(self, repetitions = 1):
+        '''
+        Runs the flows of a whole unit, repetitions times.
+        @return(OrderedDict): flow name -> BusProfile, averaged over the repetitions
+        '''
+        totals = OrderedDict((flow, BusProfile()) for flow in self.FLOWS)
+        set_default_bench(self.bench)
+        with self.profiler.installed():
+            for _ in range(repetitions):
+                for flow, profile in self._run_unit().items():
+                    totals[flow] = totals[flow] + profile
+        return OrderedDict((flow, BusProfile(profile.wall_time / repetitions, int(round(float(profile.round_trips) / repetitions)),
+                                             profile.io_time / repetitions, profile.sleep_time / repetitions)) for flow, profile in totals.items())
+
+    def _run_unit(self):
+        rf_test = self.test_class(self.SERIAL_NUMBER, self.BATCH_ID)
+        profiles = OrderedDict()
+        try:
+            profiles['setup'] = self._measure(lambda: (rf_test.setup(), rf_test.wait_ready()))
+            profiles['ext_config_wlan_scenario'] = self._measure(rf_test.config_cmw_scenario)
+            profiles['check_tx_power'] = self._measure(rf_test.check_tx_power)
+            profiles['check_rx_sensetivity'] = self._measure(rf_test.check_rx_sensetivity)
+            profiles['per_step'] = self._measure(lambda: rf_test.cmw.wlan._is_per_threshold_crossed(rf_test.cmw_lease.channel, self.PER_STEP_POWER,
+                                                                                                     self.PER_STEP_PACKETS, self.PER_STEP_THRESHOLD,
+                                                                                                     self.PER_STEP_TIMEOUT))
+        finally:
+            rf_test.cleanup()
+        return profiles
+
+    def _measure(self, flow):
+        with self.profiler.measure() as profile:
+            flow()
+        return profile
+
+    @classmethod
+    def units_per_hour(cls, profiles):
+        '''
+        @return: the units the station tests in an hour, when the unit flows run one after the other
+        '''
+        unit_time = sum(profiles[flow].wall_time for flow in cls.UNIT_FLOWS)
+        return 3600.0 / unit_time if unit_time > 0 else 0.0
+
+    @classmethod
+    def to_baseline(cls, profiles):
+        return OrderedDict([('flows', OrderedDict((flow, profile.to_dict()) for flow, profile in profiles.items())),
+                            ('units_per_hour', round(cls.units_per_hour(profiles), 2))])
+
+    @classmethod
+    def save_baseline(cls, profiles, path):
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(path, 'w') as baseline_file:
+            json.dump(cls.to_baseline(profiles), baseline_file, indent = 4)
+
+    @classmethod
+    def load_baseline(cls, path):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+        return OrderedDict((flow, BusProfile.from_dict(values)) for flow, values in baseline['flows'].items())
+
+    @classmethod
+    def find_regressions(cls, profiles, baseline):
+        '''
+        A flow regressed if it takes more bus round trips or sleeps longer - both are counted, not timed, so they dont jitter.
+        the wall time is reported, but depends on the load of the machine, so it isnt gated.
+        @return(list): the regression descriptions, empty if there are none
+        '''
+        regressions = []
+        for flow, profile in profiles.items():
+            if flow not in baseline:
+                continue
+            expected = baseline[flow]
+            if profile.round_trips > expected.round_trips:
+                regressions.append('{}: {} bus round trips instead of {}'.format(flow, profile.round_trips, expected.round_trips))
+            if profile.sleep_time > expected.sleep_time + cls.SLEEP_TIME_TOLERANCE:
+                regressions.append('{}: sleeps {:.3f}s instead of {:.3f}s'.format(flow, profile.sleep_time, expected.sleep_time))
+        return regressions
+
+    @classmethod
+    def format_report(cls, profiles, baseline = None):
+        lines = ['{:<26}{:>10}{:>13}{:>10}{:>10}{:>10}'.format('flow', 'wall [s]', 'round trips', 'I/O [s]', 'sleep [s]', 'other [s]')]
+        for flow, profile in profiles.items():
+            lines.append('{:<26}{:>10.3f}{:>13}{:>10.3f}{:>10.3f}{:>10.3f}'.format(flow, profile.wall_time, profile.round_trips, profile.io_time,
+                                                                                    profile.sleep_time, profile.other_time))
+            if baseline is not None and flow in baseline:
+                expected = baseline[flow]
+                lines.append('{:<26}{:>10.3f}{:>13}{:>10.3f}{:>10.3f}{:>10.3f}'.format('  baseline', expected.wall_time, expected.round_trips,
+                                                                                        expected.io_time, expected.sleep_time, expected.other_time))
+        lines.append('units per hour: {:.1f}'.format(cls.units_per_hour(profiles)))
+        if baseline is not None:
+            lines.append('baseline units per hour: {:.1f}'.format(cls.units_per_hour(baseline)))
+        return '\n'.join(lines)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmarks the System RF Test flows on the simulated bench')
+    parser.add_argument('--repetitions', type=int, default=1, help='units to run, the results are averaged')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the bench random generator')
+    parser.add_argument('--baseline', default=StationBenchmark.DEFAULT_BASELINE_PATH, help='path of the baseline JSON file')
+    parser.add_argument('--update-baseline', action='store_true', help='store the results as the new baseline instead of comparing to it')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    benchmark = StationBenchmark(SimulatedBench(seed=args.seed))
+    profiles = benchmark.run(args.repetitions)
+    if args.update_baseline or not os.path.isfile(args.baseline):
+        StationBenchmark.save_baseline(profiles, args.baseline)
+        print(StationBenchmark.format_report(profiles))
+        print('Baseline saved to {}'.format(args.baseline))
+        return 0
+    baseline = StationBenchmark.load_baseline(args.baseline)
+    print(StationBenchmark.format_report(profiles, baseline))
+    regressions = StationBenchmark.find_regressions(profiles, baseline)
+    for regression in regressions:
+        print('REGRESSION - {}'.format(regression))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+import argparse
+import json
+import queue
+import socket
+import socketserver
+import threading
+from concurrent.futures import Future
+
+from tests.systemRFTest import SystemRFTest
+from utils.stationLogging import get_logger
+
+
+class UnitJob(object):
+
+    def __init__(self, uut_com, serial_number, batch_id = None):
+        self.uut_com = uut_com
+        self.serial_number = serial_number
+        self.batch_id = batch_id
+        self.future = Future()
+
+
+class StationDaemon(object):
+    '''
+    Long running System RF Test station - owns the CMW and the spectrum sessions and their configured state, and tests a stream of units.
+    the instruments are brought up once, every unit only swaps the uut : its bring up, the test body and its report.
+    the WLAN scenario is applied again on every unit, and its state cache leaves only the settings the previous unit changed to send.
+    the jobs are tested one after the other, in the order they were submitted - by submit() or over the local socket (see JobRequestHandler).
+    '''
+    DEFAULT_HOST = '127.0.0.1'
+    DEFAULT_PORT = 5025
+    logger = get_logger('station_daemon')
+
+    def __init__(self, test_class = SystemRFTest):
+        self.station = test_class()
+        self._jobs = queue.Queue()
+        self._worker = None
+        self._server = None
+
+    def start(self):
+        '''
+        Brings up the station and starts testing the submitted units.
+        '''
+        self.station.start_station()
+        self._worker = threading.Thread(target=self._run_jobs, name='StationDaemon')
+        self._worker.daemon = True
+        self._worker.start()
+        self.logger.info('Station is up, waiting for units')
+
+    def submit(self, uut_com, serial_number, batch_id = None):
+        '''
+        Queues a unit to test.
+        @param uut_com: the serial port of the uut
+        @param serial_number,batch_id: the unit identity
+        @return(Future): resolves to the result dict of the unit - see _to_result
+        '''
+        job = UnitJob(uut_com, serial_number, batch_id)
+        self._jobs.put(job)
+        return job.future
+
+    def serve(self, host = DEFAULT_HOST, port = DEFAULT_PORT):
+        '''
+        Accepts the jobs of local clients until stop() - every request is a JSON line, answered by the unit result JSON line once it was tested.
+        '''
+        self._server = JobServer((host, port), JobRequestHandler, self)
+        self.logger.info('Accepting units on %s:%s', host, port)
+        self._server.serve_forever()
+
+    def stop(self):
+        '''
+        Tests the queued units, then closes the station.
+        '''
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        self._jobs.put(None)
+        if self._worker is not None:
+            self._worker.join()
+        self.station.stop_station()
+
+    def _run_jobs(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            self.logger.info('Testing unit %s on %s', job.serial_number, job.uut_com)
+            error = None
+            try:
+                self.station.start_unit(job.serial_number, job.batch_id, job.uut_com)
+                self.station.body()
+            except Exception as e:
+                error = e
+                self.logger.error('Unit %s failed - %s', job.serial_number, e)
+            finally:
+                try:
+                    unit_result = self.station.finish_unit(error)
+                except Exception as e:
+                    unit_result, error = None, error or e
+                    self.logger.error('Closing unit %s failed - %s', job.serial_number, e)
+            job.future.set_result(self._to_result(job, unit_result, error))
+
+    @staticmethod
+    def _to_result(job, unit_result, error):
+        measurements = [] if unit_result is None else [dict(name=measurement.name, value=measurement.value, min_limit=measurement.min_limit,
+                                                            max_limit=measurement.max_limit, passed=measurement.passed)
+                                                       for measurement in unit_result.measurements]
+        return {'serial_number': job.serial_number,
+                'batch_id': job.batch_id,
+                'passed': error is None and unit_result is not None and unit_result.passed,
+                'measurements': measurements,
+                'error': str(error) if error is not None else None if unit_result is None else unit_result.error}
+
+
+class JobServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, handler_class, daemon):
+        socketserver.ThreadingTCPServer.__init__(self, address, handler_class)
+        self.station_daemon = daemon
+
+
+class JobRequestHandler(socketserver.StreamRequestHandler):
+    '''
+    Every line is a JSON job - {"uut_com": "COM22", "serial_number": "SN0001", "batch_id": "B01"} - answered by the unit result JSON line.
+    '''
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line.decode())
+                future = self.server.station_daemon.submit(request['uut_com'], request['serial_number'], request.get('batch_id'))
+                result = future.result()
+            except (ValueError, KeyError) as e:
+                result = {'error': 'invalid job {!r} - {}'.format(line.strip(), e)}
+            self.wfile.write((json.dumps(result) + '\n').encode())
+
+
+def submit_unit(uut_com, serial_number, batch_id = None, host = StationDaemon.DEFAULT_HOST, port = StationDaemon.DEFAULT_PORT, timeout = None):
+    '''
+    Sends a unit to a running station daemon, and waits for it to be tested.
+    @return(dict): the unit result
+    '''
+    with socket.create_connection((host, port), timeout=timeout) as connection:
+        connection.sendall((json.dumps({'uut_com': uut_com, 'serial_number': serial_number, 'batch_id': batch_id}) + '\n').encode())
+        return json.loads(connection.makefile('rb').readline().decode())
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Runs the System RF Test station, and tests the units sent to it over a local socket')
+    parser.add_argument('--host', default=StationDaemon.DEFAULT_HOST, help='address to accept the units on')
+    parser.add_argument('--port', type=int, default=StationDaemon.DEFAULT_PORT, help='port to accept the units on')
+    parser.add_argument('--simulated', action='store_true', help='run the station on the simulated bench')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    test_class = SystemRFTest
+    if args.simulated:
+        from tests.simulatedSystemRFTest import SimulatedSystemRFTest
+        test_class = SimulatedSystemRFTest
+    daemon = StationDaemon(test_class)
+    daemon.start()
+    try:
+        daemon.serve(args.host, args.port)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.stop()
+
+
+if __name__ == "__main__":
+    main()
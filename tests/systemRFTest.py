@@ -1,145 +1,365 @@
+import argparse
 import logging
 import os
+import platform
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
 
-from ATE.cmw.consts import CmwStates
+import numpy
+
+from ATE import spectrumAnalysis
+from ATE.cmw.consts import CmwStates, CmwWLANStandards
 from utils.validation import Validation
 from ATE.cmw.rohdeSchwarzCMW500 import CMW500
 from ATE.spectrumAnalyzer import SpectrumAnalyzer
+from infra.limitsTable import LimitsTable
+from infra.resultsStore import ResultsStore, UnitResult
+from infra.stageGraph import StageGraph, TestStage
 from infra.tigerBaseTest import TigerBaseTest
 from infra.tigerUUT import TigerUUT
+from utils.connections.visaCommunication import VerificationPolicies
+from utils.connections.visaSessionPool import get_session_pool
+from utils.stationLogging import configure_logging, get_logger, is_logging_configured, shutdown_logging
 
 
 class SystemRFTest(TigerBaseTest):
     CMW_GPIB_ADDRESS = 18
     SPECTRUM_GPIB_ADDRESS = 20
     UUT_COM = 'COM22'
-    MIN_PEAK = -10.0
-    MAX_PEAK = 20.0
-    MIN_SENSE = -75.0
-    MAX_SENSE = -78.0
+    LIMITS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'limits', 'systemRFTestLimits.json')
+    WIFI_STANDARD = CmwWLANStandards.W80211AC
+    WIFI_CHANNEL = 1
+    SPUR_MASK = spectrumAnalysis.SpectrumMask.flat(-40.0)
+    TX_CHANNEL_BANDWIDTH = 200E3
+    CW_FREQUENCY = 1000000
+    CW_SETTLE_TIME = 3 # the time [s] the UUT CW takes to settle once it started
+    CW_STEP_SETTLE_TIME = 0.01 # the time [s] the UUT CW takes to settle on a new frequency
+    TX_SWEEP_DWELL_TIME = 0.01
+    SPECTRUM_SPAN = 1E6
+    SPECTRUM_REF_LEVEL = 30.0
+    VERIFICATION_POLICY = VerificationPolicies.DEFERRED # how the instrument setters are verified - the error queue is drained once per configuration block
     LOG_FILE_PATH = r'C:\Tests_Logs\System_RF_Test'
+    LOG_LEVEL = logging.INFO
+    RESULTS_DB_PATH = r'C:\Tests_Logs\System_RF_Test_Results.db'
+    REQUIRED_MEASUREMENTS = ['tx_peak', 'tx_channel_power', 'tx_occupied_bandwidth', 'tx_spur_margin', 'rx_sensitivity'] # the measurements of body - a unit without all of them fails
+    logger = get_logger('system_rf_test')
+
+    def __init__(self, serial_number = None, batch_id = None):
+        '''
+        @param serial_number: the serial number of the tested unit
+        @param batch_id: the production batch of the unit
+        '''
+        self.serial_number = serial_number
+        self.batch_id = batch_id
 
     def setup(self):
-        'Init for all of the test componenets : ATE, log, uut, report'
+        '''
+        Init for all of the test componenets : log, limits, report, and the bring up of the ATE and the uut.
+        the CMW, the spectrum and the uut are brought up concurrently, and setup returns without waiting for them -
+        every test step waits only for the resources it uses, see wait_ready.
+        '''
+        self.logger.info('Test Setup..')
+        self.start_station()
+        self.start_unit(self.serial_number, self.batch_id)
+
+    def start_station(self):
+        '''
+        Brings up what the units of the station share : log, limits, results store, and the CMW and the spectrum on their own threads.
+        a station daemon calls it once, and then runs start_unit, body and finish_unit for every unit.
+        '''
         self.set_logger()
-        self.print_to_log('Test Setup..')
-        self.init_ate_instruments()
-        self.init_uut()
+        self.init_limits()
+        self.results_store = ResultsStore(self.RESULTS_DB_PATH)
+        self.ready = {}
+        self.start_bring_up(cmw=self.init_cmw, spectrum=self.init_spectrum_analyzer)
+
+    def start_unit(self, serial_number, batch_id, uut_com = None):
+        '''
+        Starts the test of a unit on the brought up station - opens its report and starts the uut bring up.
+        @param serial_number,batch_id: the unit identity
+        @param uut_com: the serial port of the uut, None for UUT_COM
+        '''
+        self.serial_number = serial_number
+        self.batch_id = batch_id
+        if uut_com is not None:
+            self.UUT_COM = uut_com
         self.init_report()
+        self.start_bring_up(uut=self.init_uut)
+
+    def start_bring_up(self, **bring_ups):
+        '''
+        Starts the bring up of every resource on its own thread.
+        self.ready maps every resource name (cmw, spectrum, uut) to the future of its bring up.
+        @param bring_ups: resource name -> the callable that brings it up
+        '''
+        executor = ThreadPoolExecutor(max_workers=len(bring_ups), thread_name_prefix='BringUp')
+        for resource, bring_up in bring_ups.items():
+            self.ready[resource] = executor.submit(bring_up)
+        executor.shutdown(wait=False)
+
+    def wait_ready(self, *resources):
+        '''
+        Blocks until the resources are up.
+        @param resources: the resource names, none for all the resources
+        @raise: the failure of the first resource bring up that failed
+        '''
+        for resource in resources or sorted(self.ready):
+            self.ready[resource].result()
+
+    def init_limits(self):
+        '''
+        Loads the compiled limits of the spec file - it is compiled only on the first unit, or after the file changed.
+        '''
+        self.limits = LimitsTable.load(self.LIMITS_PATH)
+        self.logger.info('Limits revision %s loaded from %s', self.limits.revision, self.LIMITS_PATH)
 
     def set_logger(self):
         '''
-        Creating a logger for System RF Test.
+        Routes the test and the drivers loggers to the console and the log file, through the background log writer.
         '''
-        self.print_to_log('Sets logger and log file..')
-        self.logger = logging.getLogger()
-        self.logger.setLevel(logging.DEBUG)
-        fh = logging.FileHandler(self.LOG_FILE_PATH)
-        fh.setLevel(logging.DEBUG)
-        self.logger.addHandler(fh)
+        if is_logging_configured():
+            return
+        configure_logging(self.LOG_FILE_PATH, self.LOG_LEVEL)
+        self.logger.info('Logger is set, log file %s', self.LOG_FILE_PATH)
 
     def init_ate_instruments(self):
-        self.print_to_log('Init instruments')
+        self.logger.info('Init instruments')
         self.init_cmw()
         self.init_spectrum_analyzer()
 
     def init_cmw(self):
-        self.print_to_log('Init CMW')
+        self.logger.info('Init CMW')
         self.cmw = CMW500(self.CMW_GPIB_ADDRESS)
-        self.cmw.preset()
+        with self.cmw.connection.batch():
+            self.cmw.preset()
+            self.cmw.connection.set_verification_policy(self.VERIFICATION_POLICY)
+        self.cmw_lease = self.cmw.channel_leases.acquire(self.UUT_COM)
+        self.logger.info('CMW signaling channel %s is leased', self.cmw_lease.channel)
 
     def init_spectrum_analyzer(self):
-        self.print_to_log('Init Spectrum')
+        self.logger.info('Init Spectrum')
         self.spectrum = SpectrumAnalyzer(self.SPECTRUM_GPIB_ADDRESS)
-        self.spectrum.reset()
+        with self.spectrum.connection.batch():
+            self.spectrum.reset()
+            self.spectrum.connection.set_verification_policy(self.VERIFICATION_POLICY)
+        self._config_spectrum()
 
     def _config_spectrum(self):
-        self.print_to_log('Config spectrum..')
-        self.print_to_log('Here you need to add few commands for configure the spectrum for CW measure..')
+        self.logger.info('Config spectrum..')
+        self.spectrum.ext_config_measurement(self.CW_FREQUENCY, self.SPECTRUM_SPAN, self.SPECTRUM_REF_LEVEL)
 
     def init_uut(self):
-        self.print_to_log('Init uut..')
+        self.logger.info('Init uut..')
         self.uut = TigerUUT(self.UUT_COM)
+        if hasattr(self, 'unit_result'):
+            self.unit_result.firmware_version = self.uut.get_version()
 
     def init_report(self):
-        self.print_to_log('Init report')
-        self.print_to_log('Here you need to add CSV file / JSON and add all the data you want to save')
-        self.print_to_log('Relevant data: 1. uut_serial_number 2. batch_id 3.fw version 4. test_results(only the relevant), date, pass/fail etc..')
+        '''
+        the firmware version of the unit is added once the uut is up, see init_uut
+        '''
+        self.logger.info('Init report')
+        self.unit_result = UnitResult(self.serial_number, self.batch_id, None, platform.node(), self.REQUIRED_MEASUREMENTS)
+        self.logger.info('Reporting unit %s of batch %s to %s', self.serial_number, self.batch_id, self.RESULTS_DB_PATH)
 
     def body(self):
-        self.print_to_log('Test Body..')
-        self.check_tx_power()
-        self.check_rx_sensetivity()
+        '''
+        Runs the checks as a stage graph - the CMW scenario is configured while the spectrum measures the CW peak.
+        '''
+        self.logger.info('Test Body..')
+        report = StageGraph([TestStage('config_cmw_scenario', self.config_cmw_scenario, resources=['cmw']),
+                             TestStage('check_tx_power', self.check_tx_power, resources=['uut', 'spectrum']),
+                             TestStage('check_rx_sensetivity', self.check_rx_sensetivity, depends_on=['config_cmw_scenario', 'check_tx_power'], resources=['cmw', 'uut'])]).run()
+        self.logger.info('Test Body finished - %s', report)
 
     def check_tx_power(self):
-        self.print_to_log('Checking UUT TX power..')
+        self.wait_ready('uut', 'spectrum')
+        self.logger.info('Checking UUT TX power..')
+        self.uut.set_system_mode(self.uut.SYSTEM_CW_MODE)
+        self.uut.transmit_cw(self.CW_FREQUENCY)
+        time.sleep(self.CW_SETTLE_TIME)
+        frequencies, levels, resolution_bandwidth = self.spectrum.fetch_trace()
+        measurements = spectrumAnalysis.analyze(frequencies, levels, self.TX_CHANNEL_BANDWIDTH, resolution_bandwidth, spur_mask=self.SPUR_MASK)
+        self.logger.info('The Peak power is %s at %s Hz, channel power %s, occupied bandwidth %s Hz, worst spur margin %s',
+                         measurements.peak_level, measurements.peak_frequency, measurements.channel_power, measurements.occupied_bandwidth,
+                         measurements.worst_spur_margin)
+        self.add_measurements(['tx_peak', 'tx_channel_power', 'tx_occupied_bandwidth', 'tx_spur_margin'],
+                              [measurements.peak_level, measurements.channel_power, measurements.occupied_bandwidth, measurements.worst_spur_margin])
+
+    def measure_tx_power_sweep(self, frequencies, dwell_time = None):
+        '''
+        Measures the UUT CW peak at several frequencies in a single list sweep - the spectrum gets all the points at once,
+        and the UUT CW steps through them in lockstep with the list triggers, so the sweep takes about the dwell and settle times.
+        every trigger returns once the spectrum measured its point, so the CW isnt stepped in the middle of a dwell.
+        @param frequencies: the CW frequencies [Hz]
+        @param dwell_time: the spectrum measurement time of every point [s], None for TX_SWEEP_DWELL_TIME
+        @return(numpy.ndarray): (points, 2) array - the frequency and its peak [dBm] in every row
+        '''
+        dwell_time = self.TX_SWEEP_DWELL_TIME if dwell_time is None else dwell_time
+        self.wait_ready('uut', 'spectrum')
+        self.logger.info('Sweeping UUT TX power over %s frequencies..', len(frequencies))
+        self.spectrum.configure_list_sweep(frequencies, dwell_time)
         self.uut.set_system_mode(self.uut.SYSTEM_CW_MODE)
-        self.uut.transmit_cw()
-        time.sleep(3)
-        peak = self.spectrum.get_peak()
-        self.print_to_log('The Peak power is {}'.format(peak))
-        result = Validation.is_limits_min_max(peak, self.MIN_PEAK, self.MAX_PEAK)
-        self.print_to_log('Here you need to add the result to the report (numeric and pass/fail)')
+        for index, frequency in enumerate(frequencies):
+            self.uut.transmit_cw(frequency)
+            time.sleep(self.CW_SETTLE_TIME if index == 0 else self.CW_STEP_SETTLE_TIME)
+            self.spectrum.trigger_list_point()
+        peaks = self.spectrum.fetch_list_sweep()
+        self.logger.info('TX power sweep finished - %s', ', '.join('{:.0f} Hz: {:.2f}'.format(frequency, peak) for frequency, peak in zip(frequencies, peaks)))
+        return numpy.column_stack((numpy.asarray(frequencies, dtype = float), peaks))
+
+    def add_measurements(self, names, values, standard = None, channel = None):
+        '''
+        Checks the measurements against their limits table entries in one call, and adds them to the unit result.
+        @param names,values(list): the test name and value of every measurement
+        @param standard,channel: the WLAN standard and broadcast channel of the measurements, None if they have none
+        @return: the pass mask of the measurements
+        '''
+        limits = [self.limits.get(name, standard, channel) for name in names]
+        min_limits, max_limits = [limit.min_limit for limit in limits], [limit.max_limit for limit in limits]
+        mask, margins = Validation.evaluate_limits(values, min_limits, max_limits)
+        for name, value, min_limit, max_limit, result, margin in zip(names, values, min_limits, max_limits, mask, margins):
+            if not result:
+                self.logger.warning('%s = %s is out of limits [%s, %s] by %s', name, value, min_limit, max_limit, -margin)
+            self.unit_result.add_measurement(name, float(value), min_limit, max_limit, bool(result))
+        return mask
+
+    def config_cmw_scenario(self):
+        '''
+        the scenario is applied on every unit - the previous unit search left the AP power at its last step, and only the settings
+        that differ from the state cache are sent, so the next units of a station daemon get about a single AP power write
+        '''
+        self.wait_ready('cmw')
+        self.logger.info('Configuring CMW WLAN scenario..')
+        self.cmw.wlan.ext_config_leased_wlan_scenario(self.cmw_lease, wifi_standard=self.WIFI_STANDARD, freq_channel=self.WIFI_CHANNEL)
 
     def check_rx_sensetivity(self):
-        self.print_to_log('Checking UUT RX Senesetivity..')
-        self.cmw.wlan.ext_config_wlan_scenario()
-        self.cmw.wlan.set_channel_state(1, CmwStates.ON)
+        self.wait_ready('cmw', 'uut')
+        self.logger.info('Checking UUT RX Senesetivity..')
+        self.cmw.wlan.set_channel_state(self.cmw_lease.channel, CmwStates.ON)
         self.uut.set_system_mode(self.uut.SYSTEM_RX_MODE)
-        sens_value = self.cmw.wlan.ext_get_sesetivity_threshold(1, start_power=-70.0, stop_power=-80.0)
-        result = Validation.is_limits_min_max(sens_value, self.MIN_SENSE, self.MAX_SENSE)
-        self.print_to_log('The Sensetivity Threshold is {}'.format(sens_value))
-        self.print_to_log('Here you need to add the result to the report (numeric and pass/fail)')
-
-    def cleanup(self):
-        self.print_to_log('Test Cleanup..')
-        self.close_spectrum()
-        self.close_cmw()
-        self.close_uut()
+        sens_value = self.cmw.wlan.ext_get_sesetivity_threshold(self.cmw_lease.channel, start_power=-70.0, stop_power=-80.0)
+        self.logger.info('The Sensetivity Threshold is %s', sens_value)
+        self.add_measurements(['rx_sensitivity'], [sens_value], self.WIFI_STANDARD, self.WIFI_CHANNEL)
+
+    def cleanup(self, error = None):
+        '''
+        @param error: the exception the test was aborted by, None if it ran to its end
+        '''
+        self.logger.info('Test Cleanup..')
+        try:
+            self.finish_unit(error)
+        finally:
+            self.stop_station()
+
+    def finish_unit(self, error = None):
+        '''
+        Ends the test of the unit - turns the signaling channel off, closes the uut and queues the unit result.
+        @param error: the exception the test of the unit was aborted by, None if it ran to its end - the unit is stored as failed with it
+        @return(UnitResult): the result of the unit, None if no unit was started
+        '''
+        wait(getattr(self, 'ready', {}).values())
+        try:
+            self.close_cmw_channel()
+            self.close_uut()
+        except Exception as e:
+            error = error or e
+            raise
+        finally:
+            unit_result = self.close_report(error)
+        return unit_result
+
+    def stop_station(self):
+        '''
+        Closes the station resources - the spectrum, the CMW, their VISA sessions, the results store and the log.
+        '''
+        wait(getattr(self, 'ready', {}).values())
+        try:
+            self.close_spectrum()
+            self.close_cmw()
+        finally:
+            self.close_visa_sessions()
+        self.close_results_store()
         self.close_log_file()
 
+    def close_report(self, error = None):
+        '''
+        Queues the unit result to the results store, the store writes it in the background.
+        @param error: the exception the test of the unit was aborted by, None if it ran to its end
+        @return(UnitResult): the result of the unit, None if no unit was started
+        '''
+        unit_result = getattr(self, 'unit_result', None)
+        if unit_result is not None:
+            unit_result.finish(error)
+            self.results_store.record(unit_result)
+            if unit_result.error is not None:
+                self.logger.error('Unit %s failed - %s', self.serial_number, unit_result.error)
+            else:
+                self.logger.info('Unit %s %s', self.serial_number, 'passed' if unit_result.passed else 'failed')
+            self.unit_result = None
+        return unit_result
+
+    def close_results_store(self):
+        '''
+        Waits for the store to write the queued unit results, and closes it.
+        '''
+        if hasattr(self, 'results_store'):
+            self.results_store.close()
+
     def close_spectrum(self):
         if hasattr(self, 'spectrum'):
             self.spectrum.close()
 
+    def close_cmw_channel(self):
+        if hasattr(self, 'cmw_lease'):
+            self.cmw.wlan.set_channel_state(self.cmw_lease.channel, CmwStates.OFF)
+
     def close_cmw(self):
+        if hasattr(self, 'cmw_lease'):
+            self.cmw.channel_leases.release(self.cmw_lease)
         if hasattr(self, 'cmw'):
-            self.cmw.wlan.set_channel_state(1, CmwStates.OFF)
             self.cmw.close()
 
+    def close_visa_sessions(self):
+        '''
+        Closes the pooled VISA sessions - the drivers only return their session to the pool, so it stays open for the next unit of the station.
+        '''
+        get_session_pool().close_all()
+
     def close_uut(self):
-        if hasattr(self, 'uut'):
+        if getattr(self, 'uut', None) is not None:
             self.uut.close()
+            self.uut = None
 
     def close_log_file(self):
         '''
-        Closing the logger and the log file connected to it.
+        Writes the queued log records, and closes the log file.
         '''
-        handlers = self.logger.handlers[:]
-        for handler in handlers:
-            handler.close()
-            self.logger.removeHandler(handler)
-
-    def _format_msg(self, msg):
-        return 'System RF Test: {}'.format(msg)
+        shutdown_logging()
 
-def main():
+def main(test_class = SystemRFTest, serial_number = None, batch_id = None):
+    rf_test = test_class(serial_number, batch_id)
+    error = None
     try:
-        rf_test = SystemRFTest()
-        rf_test.print_to_log("System RF Test Starting:\n\n")
+        rf_test.set_logger()
+        rf_test.logger.info("System RF Test Starting:\n\n")
         rf_test.setup()
         rf_test.body()
-        rf_test.print_to_log("System RF Test finished!!!\n\n")
-    except:
+        rf_test.logger.info("System RF Test finished!!!\n\n")
+    except Exception as e:
+        error = e
         raise
     finally:
-        rf_test.cleanup()
+        rf_test.cleanup(error)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='System RF Test of a single unit')
+    parser.add_argument('serial_number', help='serial number of the tested unit')
+    parser.add_argument('batch_id', help='production batch of the unit')
+    args = parser.parse_args()
     try:
-        main()
+        main(SystemRFTest, args.serial_number, args.batch_id)
     except Exception as e:
         print("Exodus installation failed!!!!\n\nEXCEPTION: {}".format(e))
     finally:
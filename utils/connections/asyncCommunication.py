@@ -0,0 +1,78 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.connections.serialCommunication import SerialCommunication
+from utils.connections.visaCommunication import VisaCommunication
+
+
+class AsyncDriver(object):
+    '''
+    asyncio counterpart of a blocking driver - every public method of the driver is awaited on the driver's own single worker executor,
+    so a sequencer can wait on one instrument while it works with another, all on one event loop, and the calls of a driver keep their order.
+    the blocking driver stays the implementation, and is still available as .sync.
+    '''
+    DRIVER_CLASS = None
+
+    def __init__(self, driver, executor):
+        self.sync = driver
+        self._executor = executor
+
+    @classmethod
+    async def open(cls, *args, **kwargs):
+        '''
+        Constructs the blocking driver on a new executor, without blocking the event loop.
+        @return: the async driver
+        '''
+        executor = cls._new_executor(cls.__name__)
+        try:
+            driver = await asyncio.get_running_loop().run_in_executor(executor, functools.partial(cls.DRIVER_CLASS, *args, **kwargs))
+        except Exception:
+            executor.shutdown(wait = False)
+            raise
+        return cls(driver, executor)
+
+    @classmethod
+    def wrap(cls, driver):
+        '''
+        @param driver: an open blocking driver - release() leaves it open
+        @return: the async driver of the blocking driver, on a new executor
+        '''
+        return cls(driver, cls._new_executor(cls.__name__))
+
+    @staticmethod
+    def _new_executor(name):
+        return ThreadPoolExecutor(max_workers = 1, thread_name_prefix = name)
+
+    def __getattr__(self, name):
+        attribute = getattr(self.sync, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        async def call(*args, **kwargs):
+            return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(attribute, *args, **kwargs))
+        return call
+
+    async def close(self):
+        try:
+            await self.__getattr__('close')()
+        finally:
+            self.release()
+
+    def release(self):
+        '''
+        Stops the executor of the async driver - the blocking driver is left open.
+        '''
+        self._executor.shutdown(wait = False)
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self.sync)
+
+
+class AsyncVisaCommunication(AsyncDriver):
+    DRIVER_CLASS = VisaCommunication
+
+
+class AsyncSerialCommunication(AsyncDriver):
+    DRIVER_CLASS = SerialCommunication
@@ -0,0 +1,106 @@
+from utils.stationLogging import get_logger
+
+
+class ProfileSetting(object):
+    '''
+    A single setting of a profile - the value it should have, how the driver sets it, and how it is read back.
+    '''
+
+    def __init__(self, name, query, value, apply, check):
+        '''
+        @param name: the setting name, for the logs
+        @param query: the read back query, its SCPI path is the state cache key of the setting
+        @param value: the value the setting should have, as it is kept at the state cache
+        @param apply: callable without arguments that sets the value through the driver (and caches it)
+        @param check: callable that gets the query answer and raises in case it isnt the value
+        '''
+        self.name = name
+        self.query = query
+        self.value = value
+        self.apply = apply
+        self.check = check
+
+    def __repr__(self):
+        return 'ProfileSetting({}={!r})'.format(self.name, self.value)
+
+
+class InstrumentProfile(object):
+    '''
+    A declarative instrument configuration - applying it sends only the settings that differ from the instrument state cache.
+    a profile can be stored at an instrument state register (*SAV) and recalled by a single command (*RCL).
+    the driver a profile is applied on has the connection of the instrument.
+    '''
+    logger = get_logger('profile')
+
+    def __init__(self, settings):
+        '''
+        @param settings: the ProfileSetting list of the profile, in the order they should be applied -
+                         or a callable that gets the driver and returns it, for settings that are set through the driver
+        '''
+        self._settings = settings
+
+    def settings(self, driver):
+        '''
+        @return(list): the ProfileSetting of every setting of the profile, in the order they should be applied
+        '''
+        return list(self._settings(driver) if callable(self._settings) else self._settings)
+
+    @staticmethod
+    def _setting(name, scpi_setting, suffixes, value, apply):
+        '''
+        @param scpi_setting(ScpiSetting): the setting, its query is read back and its value type normalizes the value
+        @param suffixes: the suffixes of the setting (the signaling channel etc.)
+        @return(ProfileSetting): the profile setting of the value
+        '''
+        value = scpi_setting.value_type.normalize(value)
+        return ProfileSetting(name, scpi_setting.query.format(*suffixes), value, apply, lambda ans: scpi_setting.check(ans, value, suffixes))
+
+    def diff(self, driver):
+        '''
+        @return(list): the settings whose value isnt the known (cached) state of the instrument
+        '''
+        state_cache = driver.connection.state_cache
+        return [setting for setting in self.settings(driver) if not state_cache.holds(state_cache.key_of(setting.query), setting.value)]
+
+    def apply(self, driver):
+        '''
+        Sends the settings that changed, as one batch.
+        @return(list): the names of the settings that were sent
+        '''
+        changed = self.diff(driver)
+        self.logger.info('Applying %s - %s settings changed %s', type(self).__name__, len(changed), [setting.name for setting in changed])
+        with driver.connection.batch():
+            for setting in changed:
+                setting.apply()
+        return [setting.name for setting in changed]
+
+    def save(self, driver, register):
+        '''
+        Applies the profile and stores the whole instrument state at the register.
+        @param register(int): the instrument state register
+        '''
+        self.apply(driver)
+        self.logger.info('Saving %s to register %s', type(self).__name__, register)
+        driver.connection.send('*SAV {}'.format(register), time_to_wait = 0)
+
+    def recall(self, driver, register, verify = True):
+        '''
+        Recalls the instrument state of a register that holds the profile - a single command instead of the settings.
+        @param register(int): the instrument state register the profile was saved to
+        @param verify(bool): read the settings back in one batch, whatever the verification policy of the connection is, and cache them -
+                             False to skip the read back, the state cache is left cleared then
+        @raise VerificationException: the first setting the register didnt hold, or the error of the recall - the state cache is cleared in that case
+        '''
+        connection = driver.connection
+        settings = self.settings(driver)
+        self.logger.info('Recalling %s from register %s', type(self).__name__, register)
+        connection.state_cache.invalidate()
+        with connection.batch():
+            connection.send('*RCL {}'.format(register))
+            if verify:
+                for setting in settings:
+                    connection.verify(setting.query, setting.check, read_back = True)
+        if not verify:
+            return
+        for setting in settings:
+            connection.state_cache.update(connection.state_cache.key_of(setting.query), setting.value)
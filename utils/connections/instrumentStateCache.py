@@ -0,0 +1,51 @@
+
+
+class InstrumentStateCache(object):
+    '''
+    Shadow registers of an instrument - the last value that was set and verified, keyed by the SCPI path (which includes the signaling channel).
+    a setter whose value is already cached skips both the write and the read back.
+    '''
+
+    def __init__(self):
+        self._values = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_of(query):
+        '''
+        @param query: the read back query of the setting, for example CONF:WLAN:SIGN1:RFS:BOP?
+        @return: the cache key - the SCPI path of the query
+        '''
+        return query.strip().rstrip('?').upper()
+
+    def is_cached(self, key, value):
+        '''
+        @return(bool): True if the value is the verified value of the key, the hit/miss counters are updated
+        '''
+        if key in self._values and self._values[key] == value:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def holds(self, key, value):
+        '''
+        @return(bool): True if the value is the verified value of the key, without counting a hit or a miss
+        '''
+        return key in self._values and self._values[key] == value
+
+    def update(self, key, value):
+        self._values[key] = value
+
+    def invalidate(self, key = None):
+        '''
+        @param key: the key to drop, None drops all the cached values
+        '''
+        if key is None:
+            self._values.clear()
+        else:
+            self._values.pop(key, None)
+
+    def __repr__(self):
+        return "InstrumentStateCache(hits={}, misses={}, cached={})".format(self.hits, self.misses, len(self._values))
@@ -0,0 +1,200 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+active_tracer = None # the tracer the connections record to, None when tracing is disabled
+
+
+def start_tracing(tracer = None):
+    '''
+    Makes VisaCommunication and SerialCommunication record every write and read to the tracer.
+    @param tracer(IOTracer): the tracer to record to, None for a new one
+    @return(IOTracer): the active tracer
+    '''
+    global active_tracer
+    active_tracer = tracer or IOTracer()
+    return active_tracer
+
+
+def stop_tracing():
+    '''
+    @return(IOTracer): the tracer that was active, None if tracing was disabled
+    '''
+    global active_tracer
+    tracer, active_tracer = active_tracer, None
+    return tracer
+
+
+@contextmanager
+def tracing(tracer = None):
+    tracer = start_tracing(tracer)
+    try:
+        yield tracer
+    finally:
+        stop_tracing()
+
+
+class IOTraceEvent(object):
+
+    def __init__(self, instrument, operation, command, text, start, duration, caller, thread_name, error = None):
+        '''
+        @param instrument: the port name of the connection
+        @param operation: write or read
+        @param command: the header of the command - for reads, the header of the last command written to the instrument
+        @param text: the message written or the answer read
+        @param start: monotonic start time [s]
+        @param duration: the operation duration [s]
+        @param caller: the driver method that called the connection, like WLAN.set_AP_power
+        @param thread_name: the name of the calling thread
+        @param error: the exception the operation raised, None if it succeeded
+        '''
+        self.instrument = instrument
+        self.operation = operation
+        self.command = command
+        self.text = text
+        self.start = start
+        self.duration = duration
+        self.caller = caller
+        self.thread_name = thread_name
+        self.error = error
+
+
+class IOTracer(object):
+    '''
+    Records the instrument I/O - every write and read of the connections, with the driver method that called it.
+    exports the records as Chrome trace events (chrome://tracing, Perfetto) and as a latency histogram per command.
+    '''
+    CONNECTION_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+    SKIPPED_FILES = ('contextlib.py', 'threading.py')
+    HISTOGRAM_BUCKETS = [0.0001, 0.001, 0.01, 0.1, 1.0, 10.0] # upper bounds of the latency buckets [s]
+
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+        self._last_commands = {}
+
+    @contextmanager
+    def trace(self, instrument, operation, text = ''):
+        '''
+        Records the operation inside the block.
+        @param instrument: the port name of the connection
+        @param operation: write or read
+        @param text: the message written - for reads the answer is set by the block with event.text
+        '''
+        caller = self._find_caller()
+        start = time.perf_counter()
+        event = IOTraceEvent(instrument, operation, None, self._decode(text), start, 0.0, caller, threading.current_thread().name)
+        try:
+            yield event
+        except Exception as e:
+            event.error = repr(e)
+            raise
+        finally:
+            event.duration = time.perf_counter() - start
+            event.text = self._decode(event.text)
+            self._record(event)
+
+    def _record(self, event):
+        with self._lock:
+            if event.operation == 'write':
+                event.command = self.command_header(event.text)
+                self._last_commands[event.instrument] = event.command
+            else:
+                event.command = self._last_commands.get(event.instrument, '')
+            self.events.append(event)
+
+    @staticmethod
+    def command_header(message):
+        '''
+        @return: the message without its arguments - the headers of a compound message are joined with ';'
+        '''
+        return ';'.join(command.strip().split(' ')[0] for command in message.strip().split(';') if command.strip())
+
+    @staticmethod
+    def _decode(text):
+        if text is None:
+            return ''
+        if isinstance(text, bytes):
+            text = text.decode('iso-8859-1')
+        return str(text).strip()
+
+    @classmethod
+    def _find_caller(cls):
+        '''
+        @return: Class.method of the closest frame outside the connections, or the function name if no method is found
+        '''
+        frame = sys._getframe(1)
+        function_name = None
+        while frame is not None:
+            code = frame.f_code
+            file_name = os.path.abspath(code.co_filename)
+            if os.path.dirname(file_name) != cls.CONNECTION_DIRECTORY and not file_name.endswith(cls.SKIPPED_FILES) and not code.co_name.startswith('<'):
+                owner = frame.f_locals.get('self')
+                if owner is not None:
+                    return '{}.{}'.format(type(owner).__name__, code.co_name)
+                function_name = function_name or code.co_name
+            frame = frame.f_back
+        return function_name or 'unknown'
+
+    def to_chrome_trace(self):
+        '''
+        @return(dict): the events in the Chrome trace event format - a process per instrument, a row per thread
+        '''
+        with self._lock:
+            events = list(self.events)
+        instruments = OrderedDict((instrument, index) for index, instrument in enumerate(OrderedDict.fromkeys(event.instrument for event in events), 1))
+        threads = OrderedDict((thread_name, index) for index, thread_name in enumerate(OrderedDict.fromkeys(event.thread_name for event in events), 1))
+        trace_events = []
+        for instrument, pid in instruments.items():
+            trace_events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': str(instrument)}})
+            for thread_name, tid in threads.items():
+                trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': thread_name}})
+        for event in events:
+            args = {'text': event.text, 'command': event.command, 'caller': event.caller}
+            if event.error is not None:
+                args['error'] = event.error
+            trace_events.append({'name': '{} {}'.format(event.caller, event.operation), 'cat': event.operation, 'ph': 'X',
+                                 'ts': event.start * 1E6, 'dur': event.duration * 1E6,
+                                 'pid': instruments[event.instrument], 'tid': threads[event.thread_name], 'args': args})
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, path):
+        with open(path, 'w') as trace_file:
+            json.dump(self.to_chrome_trace(), trace_file)
+
+    def latency_histogram(self):
+        '''
+        @return(OrderedDict): (instrument, operation, command) -> sorted durations, ordered by the total time
+        '''
+        with self._lock:
+            events = list(self.events)
+        durations = {}
+        for event in events:
+            durations.setdefault((event.instrument, event.operation, event.command), []).append(event.duration)
+        return OrderedDict(sorted(((key, sorted(values)) for key, values in durations.items()), key=lambda item: -sum(item[1])))
+
+    def format_histogram(self):
+        '''
+        @return(str): the latency summary of every command - count, total, mean, p50, p95, max and the counts per latency bucket
+        '''
+        bucket_titles = ['<={}ms'.format(bound * 1000) for bound in self.HISTOGRAM_BUCKETS] + ['>{}ms'.format(self.HISTOGRAM_BUCKETS[-1] * 1000)]
+        lines = ['{:<22}{:<6}{:<40}{:>7}{:>10}{:>10}{:>10}{:>10}{:>10}  {}'.format('instrument', 'op', 'command', 'count', 'total[s]', 'mean[ms]',
+                                                                                  'p50[ms]', 'p95[ms]', 'max[ms]', ' '.join(bucket_titles))]
+        for (instrument, operation, command), durations in self.latency_histogram().items():
+            buckets = [0] * (len(self.HISTOGRAM_BUCKETS) + 1)
+            for duration in durations:
+                buckets[next((index for index, bound in enumerate(self.HISTOGRAM_BUCKETS) if duration <= bound), len(self.HISTOGRAM_BUCKETS))] += 1
+            lines.append('{:<22}{:<6}{:<40}{:>7}{:>10.3f}{:>10.2f}{:>10.2f}{:>10.2f}{:>10.2f}  {}'.format(
+                str(instrument)[:21], operation, command[:39], len(durations), sum(durations), 1000 * sum(durations) / len(durations),
+                1000 * self._percentile(durations, 50), 1000 * self._percentile(durations, 95), 1000 * durations[-1],
+                ' '.join(str(count) for count in buckets)))
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _percentile(sorted_values, percent):
+        index = int(round((len(sorted_values) - 1) * percent / 100.0))
+        return sorted_values[index]
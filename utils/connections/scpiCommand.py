@@ -0,0 +1,301 @@
+import string
+
+import numpy
+
+from utils.validation import Validation
+
+
+class ScpiType(object):
+    '''
+    The type of a SCPI argument or answer - encodes the python value to the command text, and decodes the answer text back.
+    the base type is plain text.
+    '''
+
+    def encode(self, value):
+        return str(value)
+
+    def decode(self, text):
+        return str(text).strip()
+
+    def normalize(self, value):
+        '''
+        @return: the value as it is decoded from the instrument answer - the form it is compared and cached in
+        '''
+        return self.decode(self.encode(value))
+
+
+class Text(ScpiType):
+    pass
+
+
+class QuotedText(ScpiType):
+    '''
+    string parameters - sent and answered quoted
+    '''
+
+    def encode(self, value):
+        return '"{}"'.format(value)
+
+    def decode(self, text):
+        return str(text).strip().strip('"')
+
+
+class Float(ScpiType):
+
+    def encode(self, value):
+        return repr(float(value))
+
+    def decode(self, text):
+        try:
+            return float(text)
+        except ValueError:
+            raise ScpiDecodeException('expected a float and got {!r}'.format(text))
+
+
+class Int(ScpiType):
+
+    def encode(self, value):
+        return str(int(value))
+
+    def decode(self, text):
+        try:
+            return int(text)
+        except ValueError:
+            pass
+        try:
+            return int(float(text)) # counters answered in NR3 - 5.000000E+02
+        except ValueError:
+            raise ScpiDecodeException('expected an int and got {!r}'.format(text))
+
+
+class Enum(ScpiType):
+    '''
+    one of a list of supported values (the supported_* lists of the consts)
+    '''
+
+    def __init__(self, values, title = 'Value'):
+        self.values = list(values)
+        self.title = title
+
+    def encode(self, value):
+        Validation.validate_elements_in_list(self.title, [value], self.values, ScpiTypeException)
+        return str(value)
+
+    def decode(self, text):
+        value = ''.join(str(text).split()) # REAL, 32
+        if value not in self.values:
+            raise ScpiDecodeException('{} - unexpected answer {!r}, expected one of {}'.format(self.title, value, self.values))
+        return value
+
+
+class CsvTuple(ScpiType):
+    '''
+    comma separated fields of their own types, decoded to a tuple - the fields after the minimum are optional and decoded to None when missing
+    '''
+
+    def __init__(self, *field_types, **options):
+        self.field_types = field_types
+        self.minimum = options.get('minimum', len(field_types))
+
+    def encode(self, values):
+        if len(values) != len(self.field_types):
+            raise ScpiTypeException('expected {} fields and got {} - {}'.format(len(self.field_types), len(values), values))
+        return ','.join(field_type.encode(value) for field_type, value in zip(self.field_types, values))
+
+    def decode(self, text):
+        fields = str(text).strip().split(',')
+        if not self.minimum <= len(fields) <= len(self.field_types):
+            raise ScpiDecodeException('expected {} to {} fields and got {!r}'.format(self.minimum, len(self.field_types), text))
+        fields += [None] * (len(self.field_types) - len(fields))
+        return tuple(None if field is None else field_type.decode(field) for field_type, field in zip(self.field_types, fields))
+
+
+class CsvList(ScpiType):
+    '''
+    any amount of comma separated values of the same type, decoded to a tuple
+    '''
+
+    def __init__(self, item_type):
+        self.item_type = item_type
+
+    def encode(self, values):
+        return ','.join(self.item_type.encode(value) for value in values)
+
+    def decode(self, text):
+        return tuple(self.item_type.decode(item) for item in str(text).strip().split(','))
+
+
+class FloatArray(ScpiType):
+    '''
+    comma separated floats, decoded to a numpy array in one call
+    '''
+
+    def encode(self, values):
+        return ','.join(repr(float(value)) for value in values)
+
+    def decode(self, text):
+        try:
+            return numpy.array(str(text).strip().split(','), dtype = float)
+        except ValueError:
+            raise ScpiDecodeException('expected comma separated floats and got {!r}'.format(str(text)[:40]))
+
+    def normalize(self, values):
+        return tuple(float(value) for value in values)
+
+
+class Block(ScpiType):
+    '''
+    IEEE 488.2 definite length block of binary points - decoded to a numpy array that views the read buffer.
+    the block is read by VisaCommunication.query_binary_block, decode gets the data without the block header.
+    '''
+
+    def __init__(self, dtype):
+        self.dtype = numpy.dtype(dtype)
+
+    def decode(self, data):
+        if len(data) % self.dtype.itemsize:
+            raise ScpiDecodeException('a block of {} bytes isnt a whole amount of {} points'.format(len(data), self.dtype))
+        return numpy.frombuffer(data, dtype = self.dtype)
+
+
+class ScpiCommand(object):
+    '''
+    A SCPI command template with typed arguments - parsed once, every call only encodes the arguments into it.
+    the template has a {} placeholder per argument, argument_types has the ScpiType of every placeholder.
+    '''
+
+    def __init__(self, template, argument_types = ()):
+        parsed = list(string.Formatter().parse(template))
+        if any(field is not None and (field != '' or spec or conversion) for _, field, spec, conversion in parsed):
+            raise ScpiTypeException('{} - only {{}} placeholders are supported'.format(template))
+        placeholders = sum(1 for _, field, _, _ in parsed if field is not None)
+        if placeholders != len(argument_types):
+            raise ScpiTypeException('{} - {} placeholders and {} argument types'.format(template, placeholders, len(argument_types)))
+        self.template = template
+        self.argument_types = tuple(argument_types)
+        self._literals = [literal for literal, _, _, _ in parsed]
+        if len(self._literals) == placeholders:
+            self._literals.append('')
+
+    def format(self, *arguments):
+        '''
+        @return(str): the command text of the arguments
+        @raise ScpiTypeException: in case the arguments dont match the argument types
+        '''
+        if len(arguments) != len(self.argument_types):
+            raise ScpiTypeException('{} - expected {} arguments and got {}'.format(self.template, len(self.argument_types), len(arguments)))
+        parts = [self._literals[0]]
+        for argument_type, argument, literal in zip(self.argument_types, arguments, self._literals[1:]):
+            parts.append(argument_type.encode(argument))
+            parts.append(literal)
+        return ''.join(parts)
+
+    def send(self, connection, *arguments, **options):
+        '''
+        @param options: time_to_wait of the send
+        '''
+        connection.send(self.format(*arguments), **options)
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self.template)
+
+
+class ScpiQuery(ScpiCommand):
+    '''
+    A SCPI query and the type its answer is decoded by.
+    '''
+
+    def __init__(self, template, argument_types = (), response_type = Text()):
+        ScpiCommand.__init__(self, template, argument_types)
+        self.response_type = response_type
+
+    def decode(self, answer):
+        '''
+        @raise ScpiDecodeException: in case the answer doesnt match the response type
+        '''
+        return self.response_type.decode(answer)
+
+    def query(self, connection, *arguments, **options):
+        '''
+        Sends the query and decodes its answer.
+        @param options: time_to_wait - the delay before the answer is read (as send_receive), 0 to read it right away
+        @return: the decoded answer
+        '''
+        message = self.format(*arguments)
+        if isinstance(self.response_type, Block):
+            return self.decode(connection.query_binary_block(message))
+        time_to_wait = options.get('time_to_wait', 0.1)
+        return self.decode(connection.send_receive(message, time_to_wait) if time_to_wait > 0 else connection.query(message))
+
+
+class ScpiSetting(object):
+    '''
+    An instrument setting - the setter command and its query share the header, the value is the last argument of the setter.
+    the header placeholders (suffixes like the signaling channel) are typed by suffix_types, the value by value_type.
+    '''
+
+    def __init__(self, header, value_type, suffix_types = (), title = None, tolerance = None, cached = True):
+        '''
+        @param title: the setting name at the verification errors, formatted with the suffixes
+        @param tolerance: the allowed absolute difference of the read back value, None for an identical value
+        @param cached: skip the setter when the state cache already holds the value
+        '''
+        self.value_type = value_type
+        self.command = ScpiCommand(header + ' {}', tuple(suffix_types) + (value_type,))
+        self.query = ScpiQuery(header + '?', suffix_types, value_type)
+        self.title = title or header
+        self.tolerance = tolerance
+        self.cached = cached
+
+    def set(self, connection, *arguments, **options):
+        '''
+        Sets the value and verifies it by the verification policy of the connection.
+        @param arguments: the suffixes followed by the value
+        @param options: tolerance - the allowed difference of the read back value, instead of the tolerance of the setting
+        '''
+        suffixes, value = arguments[:-1], self.value_type.normalize(arguments[-1])
+        tolerance = options.get('tolerance', self.tolerance)
+        connection.set_and_verify(self.command.format(*(suffixes + (value,))), self.query.format(*suffixes),
+                                  lambda answer: self.check(answer, value, suffixes, tolerance), cached_value = value if self.cached else None)
+
+    def get(self, connection, *suffixes, **options):
+        return self.query.query(connection, *suffixes, **options)
+
+    def check(self, answer, value, suffixes = (), tolerance = None):
+        '''
+        @param value: the normalized value the setting should have
+        @param suffixes: the suffixes of the setting, for the error title
+        @param tolerance: the allowed absolute difference, None for the tolerance of the setting
+        @raise ValueError: in case the read back answer isnt the value
+        '''
+        title = self.title.format(*suffixes)
+        current_value = self.query.decode(answer)
+        tolerance = self.tolerance if tolerance is None else tolerance
+        if tolerance is None:
+            Validation.check_identical_value(title, current_value, value)
+        else:
+            Validation.validate_limits_abs_tolerance(title, current_value, value, tolerance)
+
+    def __repr__(self):
+        return 'ScpiSetting({!r})'.format(self.query.template)
+
+
+def query_all(connection, *queries):
+    '''
+    Sends several queries as one compound query and decodes their answers.
+    @param queries: tuples of a ScpiQuery and its arguments
+    @return(list): the decoded answers, in the order of the queries
+    '''
+    message = ';'.join(query.format(*arguments) for query, arguments in queries)
+    answers = connection.split_answers(connection.query(message).strip())
+    if len(answers) != len(queries):
+        raise ScpiDecodeException('{} - expected {} answers and got {}'.format(message, len(queries), answers))
+    return [query.decode(answer) for (query, _), answer in zip(queries, answers)]
+
+
+class ScpiTypeException(ValueError):
+    pass
+
+
+class ScpiDecodeException(ValueError):
+    pass
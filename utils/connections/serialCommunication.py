@@ -1,57 +1,140 @@
 
-import serial
+import queue
+import threading
 import time
 
+import serial
+
+from utils.connections import ioTracer
 
-class SerialCommunication(serial.Serial):
-    RETRY = 2
 
-    def __init__(self, port_name, baud_rate=19200, timeout=1):
+class SerialCommunication(object):
+    RETRY = 2
+    EOL = b'\n'
+    ENCODING = 'iso-8859-1'
+    SIMULATOR_SCHEME = 'sim://' # URLs of the UUT of the simulated bench
 
-        serial.Serial.__init__(self, port=port_name, baudrate=baud_rate, timeout=timeout)
-        self.flushInput()
-        self.flushOutput()
+    def __init__(self, port_name, baud_rate=19200, timeout=1, prompts=(), response_timeout=2.0):
+        '''
+        Opens the port and starts a reader thread, that splits the incoming bytes into frames - lines, or the text before a prompt.
+        @param port_name: the port name (COM22, /dev/ttyUSB0), a pyserial URL or a sim:// URL of the simulated UUT
+        @param baud_rate: the port baud rate
+        @param timeout: the read timeout of the port - the longest time the reader thread is blocked on a read
+        @param prompts: byte strings that end a frame like EOL does, for devices that end their answer with a prompt
+        @param response_timeout: the default time send_receive waits for a frame, before it retries
+        '''
+        self.port_name = port_name
+        self.prompts = tuple(prompts)
+        self.response_timeout = response_timeout
+        if port_name.startswith(self.SIMULATOR_SCHEME):
+            from utils.simulators.simulatedBench import get_default_bench
+            self.serial_port = get_default_bench().open_serial_port(port_name, baudrate=baud_rate, timeout=timeout)
+        else:
+            self.serial_port = serial.serial_for_url(port_name, baudrate=baud_rate, timeout=timeout)
+        self.serial_port.reset_input_buffer()
+        self.serial_port.reset_output_buffer()
+        self.frames = queue.Queue()
+        self._reader_error = None
+        self._stop_reading = threading.Event()
+        self._reader = threading.Thread(target=self._read_frames, name='SerialReader({})'.format(port_name))
+        self._reader.daemon = True
+        self._reader.start()
         self.send(b'')
 
-    def send(self, message, time_to_wait=0.1):
+    def send(self, message, time_to_wait=0):
+        '''
+        Sends the message to the device. frames that were received and not consumed are dropped, like flushing the input.
+        @param message: message to send (str or bytes)
+        @param time_to_wait: time to wait after sending the message
+        '''
         message = message if type(message) == bytes else message.encode()
-        self.flushInput()
-        self.flushOutput()
-        self.write(message)
-        time.sleep(time_to_wait)  # Sleep was made in order to let the 'send' command get the device
-
-    def send_receive(self, message, time_to_wait=0.1, eol=False):
-        retry = 0
-        response = None
-        while (response == None or response == "") and retry < self.RETRY:
-            self.send(message)
-            time.sleep(time_to_wait)
-            if eol:
-                response = self.receive_until_EOL()
-                if response == None or response == "":
-                    time.sleep(time_to_wait)
-                    response = self.receive_until_EOL()
-            else:
-                response = self.receive()
-                if response == None or response == "":
-                    time.sleep(time_to_wait)
-                    response = self.receive()
-            retry += 1
-
-        return response
-
-    def receive(self, block_size=None, timeout=5.0):
-        start_time = time.time()
-        while (self.inWaiting() < block_size) and (time.time() - start_time < timeout):
-            time.sleep(0.1)
-        if self.inWaiting() >= block_size:
-            data = self.read(block_size)
-            data = data.decode("iso-8859-1")
+        self._raise_reader_error()
+        self._drop_frames()
+        if ioTracer.active_tracer is None:
+            self.serial_port.write(message)
         else:
-            self.log_manager.log_info_msg(
-                "Serial Connection on port '%s': Failed to read %s characters from serial buffer after %s sec" % (
-                self.port_name, block_size, timeout))
-            data = None
-        return data
+            with ioTracer.active_tracer.trace(self.port_name, 'write', message):
+                self.serial_port.write(message)
+        if time_to_wait > 0:
+            time.sleep(time_to_wait)
+
+    def send_receive(self, message, timeout=None, match=None):
+        '''
+        Sends the message and returns as soon as the answer frame arrives, the message is resent up to RETRY times.
+        @param message: message to send (str or bytes)
+        @param timeout: time to wait for the answer of every try, None for the default response timeout
+        @param match: callable that gets a frame and returns True if it is the answer, None takes the first frame
+        @return: the answer frame, or None if it didnt arrive
+        '''
+        timeout = self.response_timeout if timeout is None else timeout
+        for _ in range(self.RETRY):
+            self.send(message)
+            deadline = time.time() + timeout
+            response = self.receive(deadline - time.time())
+            while response is not None and match is not None and not match(response):
+                response = self.receive(deadline - time.time())
+            if response:
+                return response
+        return None
+
+    def receive(self, timeout=5.0):
+        '''
+        Returns the next frame sent from the device.
+        @param timeout: time to wait for the frame
+        @return: the frame string, or None in case no frame arrived during the timeout
+        '''
+        try:
+            if ioTracer.active_tracer is None:
+                return self.frames.get(timeout=max(timeout, 0))
+            with ioTracer.active_tracer.trace(self.port_name, 'read') as event:
+                event.text = self.frames.get(timeout=max(timeout, 0))
+            return event.text
+        except queue.Empty:
+            self._raise_reader_error()
+            return None
+
+    def close(self):
+        self._stop_reading.set()
+        self.serial_port.close()
+        self._reader.join(timeout=2)
+
+    def _read_frames(self):
+        buffer = b''
+        while not self._stop_reading.is_set():
+            try:
+                data = self.serial_port.read(self.serial_port.in_waiting or 1)
+            except (serial.SerialException, TypeError, AttributeError) as e:
+                if not self._stop_reading.is_set():
+                    self._reader_error = e
+                return
+            if not data:
+                continue
+            buffer += data
+            frame, buffer = self._split_frame(buffer)
+            while frame is not None:
+                frame = frame.decode(self.ENCODING).strip()
+                if frame:
+                    self.frames.put(frame)
+                frame, buffer = self._split_frame(buffer)
+
+    def _split_frame(self, buffer):
+        '''
+        @return: the first complete frame of the buffer (None if there isnt) and the rest of the buffer
+        '''
+        ends = [(buffer.find(terminator), terminator) for terminator in (self.EOL,) + self.prompts]
+        ends = [(index, terminator) for index, terminator in ends if index >= 0]
+        if not ends:
+            return None, buffer
+        index, terminator = min(ends)
+        return buffer[:index], buffer[index + len(terminator):]
 
+    def _drop_frames(self):
+        while True:
+            try:
+                self.frames.get_nowait()
+            except queue.Empty:
+                return
 
+    def _raise_reader_error(self):
+        if self._reader_error is not None:
+            raise serial.SerialException('Serial Connection on port {}: the reader stopped - {}'.format(self.port_name, self._reader_error))
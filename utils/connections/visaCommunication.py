@@ -1,39 +1,411 @@
+import threading
 import time
+from contextlib import contextmanager
 import visa
 
+from utils.connections import ioTracer
+from utils.connections.instrumentStateCache import InstrumentStateCache
+from utils.validation import Validation
+
+
+_resource_manager = None
+_resource_manager_lock = threading.Lock()
+
+
+def get_resource_manager():
+    '''
+    @return: the process wide VISA ResourceManager - the VISA library is loaded once, by the first call
+    '''
+    global _resource_manager
+    with _resource_manager_lock:
+        if _resource_manager is None:
+            _resource_manager = visa.ResourceManager('')
+        return _resource_manager
+
+
+def open_visa_resource(address):
+    '''
+    @return: the opened resource of the address, an instrument of the simulated bench for SIM:: addresses
+    '''
+    if str(address).upper().startswith(VisaCommunication.SIMULATOR_PREFIX):
+        from utils.simulators.simulatedBench import get_default_bench
+        return get_default_bench().open_resource(address)
+    return get_resource_manager().open_resource(address)
+
+
+class VerificationPolicies():
+    FULL_READBACK = 'FULL_READBACK' # every setter is read back by its query and checked
+    DEFERRED = 'DEFERRED' # the error queue is drained once per batch (once per setter outside a batch), the values arent read back
+    NONE = 'NONE' # the setters are trusted as they were sent
+
+    supported_verification_policies = [FULL_READBACK, DEFERRED, NONE]
+
 
 class VisaCommunication(object):
+    OPC_EVENT_BIT = 0x01 # operation complete bit at the standard event status register
+    ESB_SERVICE_REQUEST_BIT = 0x20 # event status bit at the status byte, raises SRQ when enabled
+    MAX_BATCH_MESSAGE_LENGTH = 1024 # longest compound message written in a single bus transaction
+    SIMULATOR_PREFIX = 'SIM::' # addresses of the instruments of the simulated bench
+    QUERY_ERROR_QUEUE = 'SYST:ERR?'
+    MAX_ERROR_QUEUE_LENGTH = 32 # errors read at most when the error queue is drained
 
     def __init__(self, port_name):
-        rm = visa.ResourceManager('')
-        self.visa_instrument = rm.open_resource(port_name)
+        self.visa_instrument = open_visa_resource(port_name)
         self.port_name = port_name
+        self.state_cache = InstrumentStateCache()
+        self.last_io_time = time.time()
+        self._bus_error = False
+        self.verification_policy = VerificationPolicies.FULL_READBACK
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    @property
+    def _batch(self):
+        '''
+        the messages queued by the batch() block of the calling thread, None outside a batch
+        '''
+        return getattr(self._local, 'batch', None)
+
+    @_batch.setter
+    def _batch(self, batch):
+        self._local.batch = batch
+
+    @property
+    def _deferred(self):
+        '''
+        the state cache updates of the setters of the batch() block of the calling thread that werent read back, None outside a batch
+        '''
+        return getattr(self._local, 'deferred', None)
+
+    @_deferred.setter
+    def _deferred(self, deferred):
+        self._local.deferred = deferred
+
+    def set_verification_policy(self, policy):
+        '''
+        Sets how set_and_verify and verify make sure the instrument applied the setters - see VerificationPolicies.
+        the error queue is cleared when the policy is DEFERRED, so the errors it reports belong to the setters that were verified by it.
+        @param policy(VerificationPolicies): the verification policy
+        '''
+        Validation.validate_elements_in_list('Verification policy', policy, VerificationPolicies.supported_verification_policies)
+        self.verification_policy = policy
+        if policy == VerificationPolicies.DEFERRED:
+            self.send('*CLS', time_to_wait = 0)
+
+    @property
+    def lock(self):
+        '''
+        serializes the bus transactions of all threads that share the session, hold it to keep several transactions together
+        '''
+        return self._lock
 
     def send(self, message, time_to_wait = 0.1):
         '''
         Send the message to the the device.
+        inside a batch() block the message is queued and written with the rest of the batch.
         @param message: message to send
         @param time_to_wait: time to wait after sending the message 
         '''
-        self.visa_instrument.write(message)
-        time.sleep(time_to_wait)
+        if self._batch is not None:
+            self._batch.append((message.rstrip(), None))
+            return
+        with self._lock:
+            self._write(message, time_to_wait)
     
     def receive(self):
         '''
         Returns a string sent from the device to the computer
         '''
-        return self.visa_instrument.read()
+        try:
+            if ioTracer.active_tracer is None:
+                return self.visa_instrument.read()
+            with ioTracer.active_tracer.trace(self.port_name, 'read') as event:
+                event.text = self.visa_instrument.read()
+            return event.text
+        except Exception:
+            self._on_bus_error()
+            raise
 
     def send_receive(self, message, time_to_wait = 0.1):
         '''
         Sends the string message to the device and returns the answer string from the device.
+        inside a batch() block the queued messages are flushed first, since the answer is needed right away.
         @param message: message to send
         @param time_to_wait: time to wait after sending the message, before reading the answer.
         '''
-        self.send(message)
+        with self._lock:
+            self.flush()
+            self._write(message)
+            if time_to_wait > 0:
+                time.sleep(time_to_wait)
+            return self.receive()
+
+    def set_and_verify(self, command, query, check, cached_value = None):
+        '''
+        Sends a setter command and verifies it with the matching query.
+        inside a batch() block both are queued, and the check runs when the batch is flushed.
+        @param command: the setter command
+        @param query: the query that reads the value back
+        @param check: callable that gets the query answer and raises in case the value is wrong
+        @param cached_value: the value the command sets - if given, the command and the query are skipped when the state cache
+                             already holds it, and the state cache is updated once the command was verified
+        @raise VerificationException: in case the check failed, or the error queue reported an error of the command (see VerificationPolicies)
+        '''
+        key = None
+        if cached_value is not None:
+            key = self.state_cache.key_of(query)
+            if self.state_cache.is_cached(key, cached_value):
+                return
+            self.state_cache.invalidate(key)
+        if self.verification_policy != VerificationPolicies.FULL_READBACK:
+            with self.batch():
+                self._batch.append((command.rstrip(), None))
+                self._deferred.append((key, cached_value))
+            return
+        check = self._named_check(command, check)
+        if key is not None:
+            check = self._cache_after_check(key, cached_value, check)
+        if self._batch is not None:
+            self._batch.append((command.rstrip(), None))
+            self._batch.append((query.rstrip(), check))
+            return
+        with self._lock:
+            self.send(command)
+            answer = self.send_receive(query)
+        try:
+            check(answer)
+        except Exception:
+            self.state_cache.invalidate()
+            raise
+
+    def verify(self, query, check, read_back = False):
+        '''
+        Reads a setting back and checks it, inside a batch() block the query is queued and checked when the batch is flushed.
+        with the DEFERRED policy the error queue is drained instead, and nothing is verified with the NONE policy.
+        @param read_back(bool): read the setting back whatever the policy is - for values no setter of the connection sent,
+                                like the settings of a recalled register, that the error queue cant vouch for
+        @param query: the query that reads the value
+        @param check: callable that gets the query answer and raises in case the value is wrong
+        @raise VerificationException: in case the check failed, or the error queue reported an error
+        '''
+        if self.verification_policy == VerificationPolicies.NONE and not read_back:
+            return
+        if self.verification_policy == VerificationPolicies.DEFERRED:
+            with self.batch():
+                self._deferred.append((None, None))
+            if not read_back:
+                return
+        check = self._named_check(query, check)
+        if self._batch is not None:
+            self._batch.append((query.rstrip(), check))
+            return
+        answer = self.send_receive(query)
+        try:
+            check(answer)
+        except Exception:
+            self.state_cache.invalidate()
+            raise
+
+    def _named_check(self, command, check):
+        def named_check(answer):
+            try:
+                check(answer)
+            except VerificationException:
+                raise
+            except Exception as e:
+                raise VerificationException(self.port_name, [command.rstrip()], str(e))
+        return named_check
+
+    def _cache_after_check(self, key, value, check):
+        def check_and_cache(answer):
+            check(answer)
+            self.state_cache.update(key, value)
+        return check_and_cache
+
+    @contextmanager
+    def batch(self):
+        '''
+        Queues every send and set_and_verify inside the block, and writes them joined with ';' in as few bus transactions as possible.
+        the read back queries of the block are answered in one compound response, and their checks run after it was read.
+        with the DEFERRED verification policy the error queue query is added to the block instead of the read backs.
+        a send_receive inside the block flushes the queue first. nothing is written if the block raised.
+        '''
+        if self._batch is not None:
+            yield self
+            return
+        self._batch = []
+        self._deferred = []
+        try:
+            yield self
+            self.flush()
+        finally:
+            self._batch = None
+            self._deferred = None
+
+    def flush(self):
+        '''
+        Writes the queued batch messages and runs the checks of their read back queries.
+        the setters that werent read back are verified by draining the error queue (DEFERRED policy), and cached once they were.
+        '''
+        if not self._batch:
+            return
+        pending, self._batch[:] = list(self._batch), []
+        deferred, self._deferred[:] = list(self._deferred), []
+        if deferred and self.verification_policy == VerificationPolicies.DEFERRED:
+            commands = [message for message, check in pending if check is None]
+            pending.append((self.QUERY_ERROR_QUEUE, lambda answer: self._drain_error_queue(answer, commands)))
+        chunk, chunk_length = [], 0
+        for message, check in pending:
+            if chunk and chunk_length + len(message) + 2 > self.MAX_BATCH_MESSAGE_LENGTH:
+                self._write_compound(chunk)
+                chunk, chunk_length = [], 0
+            chunk.append((message, check))
+            chunk_length += len(message) + 2
+        self._write_compound(chunk)
+        for key, value in deferred:
+            if key is not None:
+                self.state_cache.update(key, value)
+
+    def _drain_error_queue(self, answer, commands):
+        '''
+        @param answer: the answer of the error queue query that ended the block
+        @param commands: the commands of the block
+        @raise InstrumentErrorException: in case the error queue wasnt empty - with the commands the errors name (all the block if they dont)
+        '''
+        errors = []
+        while int(answer.split(',', 1)[0]) != 0 and len(errors) < self.MAX_ERROR_QUEUE_LENGTH:
+            errors.append(answer.strip())
+            answer = self.query(self.QUERY_ERROR_QUEUE)
+        if not errors:
+            return
+        headers = dict((command, command.lstrip(':').split(' ', 1)[0].upper()) for command in commands)
+        failed = [command for command in commands if any(headers[command] in error.upper() for error in errors)]
+        self.state_cache.invalidate()
+        raise InstrumentErrorException(self.port_name, failed or commands, '; '.join(errors))
+
+    def _write_compound(self, chunk):
+        checks = [check for _, check in chunk if check is not None]
+        with self._lock:
+            self._write(';'.join(message if message.startswith('*') else ':' + message.lstrip(':') for message, _ in chunk), time_to_wait = 0)
+            if not checks:
+                return
+            answers = self.split_answers(self.receive().rstrip())
+        if len(answers) != len(checks):
+            self.state_cache.invalidate()
+            raise BatchResponseException('{} : expected {} answers for the batch and got {} - {}'.format(self.port_name, len(checks), len(answers), answers))
+        try:
+            for check, answer in zip(checks, answers):
+                check(answer)
+        except Exception:
+            self.state_cache.invalidate()
+            raise
+
+    @staticmethod
+    def split_answers(response):
+        '''
+        @return(list): the answers of a compound response - split at the ';' that arent inside a quoted string
+        '''
+        answers, start, quoted = [], 0, False
+        for index, char in enumerate(response):
+            if char == '"':
+                quoted = not quoted
+            elif char == ';' and not quoted:
+                answers.append(response[start:index])
+                start = index + 1
+        answers.append(response[start:])
+        return answers
+
+    def _write(self, message, time_to_wait = 0.1):
+        if self._bus_error:
+            self.reconnect()
+        try:
+            if ioTracer.active_tracer is None:
+                self.visa_instrument.write(message)
+            else:
+                with ioTracer.active_tracer.trace(self.port_name, 'write', message):
+                    self.visa_instrument.write(message)
+        except Exception:
+            self._on_bus_error()
+            raise
+        self.last_io_time = time.time()
         if time_to_wait > 0:
             time.sleep(time_to_wait)
-        return self.receive()
+
+    def _on_bus_error(self):
+        '''
+        the session is reopened before its next transaction - what the instrument sent after the error is dropped with the old session
+        '''
+        self._bus_error = True
+        self.state_cache.invalidate()
+
+    def reconnect(self):
+        '''
+        Closes the resource and opens it again, the state cache is cleared.
+        '''
+        with self._lock:
+            try:
+                self.visa_instrument.close()
+            except Exception:
+                pass
+            self.visa_instrument = open_visa_resource(self.port_name)
+            self.state_cache.invalidate()
+            self._bus_error = False
+            self.last_io_time = time.time()
+
+    def is_healthy(self, query = '*OPC?'):
+        '''
+        @param query: a cheap query that every instrument answers with 1
+        @return(bool): True if the instrument answered the query
+        '''
+        try:
+            return self.query(query).strip() == '1'
+        except Exception:
+            return False
+
+    def query_binary_block(self, message):
+        '''
+        Sends a query that is answered by an IEEE 488.2 definite length block (#<digits><length><data>), and reads the answer in one transfer.
+        @param message: the query to send
+        @return(memoryview): the block data without the header and the termination - a view of the read buffer, nothing is copied
+        @raise BinaryBlockException: in case the answer isnt a complete definite length block
+        '''
+        with self._lock:
+            self.flush()
+            self._write(message, time_to_wait = 0)
+            raw = self._read_raw()
+        offset, length = self.definite_length_block_bounds(raw)
+        return memoryview(raw)[offset:offset + length]
+
+    @classmethod
+    def definite_length_block_bounds(cls, raw):
+        '''
+        @param raw(bytes): the answer of a binary block query
+        @return(tuple): the offset of the block data in the answer and its length
+        @raise BinaryBlockException: in case the answer isnt a complete definite length block
+        '''
+        start = raw.find(b'#')
+        if start < 0 or start + 2 > len(raw) or not raw[start + 1:start + 2].isdigit() or raw[start + 1:start + 2] == b'0':
+            raise BinaryBlockException('expected a definite length block and got {!r}'.format(raw[:20]))
+        digits = int(raw[start + 1:start + 2])
+        length_field = raw[start + 2:start + 2 + digits]
+        if len(length_field) != digits or not length_field.isdigit():
+            raise BinaryBlockException('invalid definite length block header {!r}'.format(raw[start:start + 2 + digits]))
+        offset, length = start + 2 + digits, int(length_field)
+        if offset + length > len(raw):
+            raise BinaryBlockException('the definite length block is {} bytes and only {} bytes were read'.format(length, len(raw) - offset))
+        return offset, length
+
+    def _read_raw(self):
+        try:
+            if ioTracer.active_tracer is None:
+                return self.visa_instrument.read_raw()
+            with ioTracer.active_tracer.trace(self.port_name, 'read') as event:
+                raw = self.visa_instrument.read_raw()
+                event.text = '<{} bytes>'.format(len(raw))
+            return raw
+        except Exception:
+            self._on_bus_error()
+            raise
 
     def recieve_until_str(self, str_to_wait, timeout = 0):
         '''
@@ -41,8 +413,123 @@ class VisaCommunication(object):
         @param str_to_wait: the "end" string
         @param timeout: not relevant for GPIB connection      
         '''
-        return self.visa_instrument.read(termination = str_to_wait)
+        try:
+            if ioTracer.active_tracer is None:
+                return self.visa_instrument.read(termination = str_to_wait)
+            with ioTracer.active_tracer.trace(self.port_name, 'read') as event:
+                event.text = self.visa_instrument.read(termination = str_to_wait)
+            return event.text
+        except Exception:
+            self._on_bus_error()
+            raise
         
     def close(self):
         self.visa_instrument.close()
 
+    @property
+    def supports_srq(self):
+        '''
+        True if the transport can block on a service request (GPIB), otherwise completion is polled.
+        '''
+        return hasattr(self.visa_instrument, 'wait_for_srq')
+
+    def start_operation(self, message, poll_interval = 0.05):
+        '''
+        Sends an overlapped command followed by *OPC, so the instrument sets the operation complete bit once it finished.
+        the event status register is enabled to raise SRQ on completion and cleared (by reading *ESR?) before the command is sent.
+        @param message: the overlapped command to send
+        @param poll_interval: the delay between *ESR? polls, used only on transports that lack SRQ
+        @return(OperationCompleteEvent): an event that fires when the instrument finished the command
+        '''
+        with self._lock:
+            self.query('*ESE {};*SRE {};*ESR?'.format(self.OPC_EVENT_BIT, self.ESB_SERVICE_REQUEST_BIT))
+            self._write('{};*OPC'.format(message), time_to_wait = 0)
+        return OperationCompleteEvent(self, poll_interval)
+
+    def wait_for_operation_complete(self, message, timeout, poll_interval = 0.05):
+        '''
+        Sends an overlapped command and blocks until the instrument finished it.
+        @param message: the overlapped command to send
+        @param timeout: timeout in seconds
+        @return(bool): True if the command finished before the timeout
+        '''
+        return self.start_operation(message, poll_interval).wait(timeout)
+
+    def _is_operation_complete(self):
+        return bool(int(self.query('*ESR?')) & self.OPC_EVENT_BIT)
+
+    def query(self, message):
+        '''
+        Sends a query and reads its answer right away, without the delays of send_receive.
+        @param message: the query to send
+        @return: the answer string
+        '''
+        with self._lock:
+            self.flush()
+            self._write(message, time_to_wait = 0)
+            return self.receive()
+
+
+class OperationCompleteEvent(object):
+    '''
+    Fires when the instrument sets the operation complete bit of a command started by VisaCommunication.start_operation.
+    blocks on the instrument service request when the transport supports SRQ, and falls back to polling *ESR? otherwise.
+    '''
+
+    def __init__(self, connection, poll_interval):
+        self.connection = connection
+        self.poll_interval = poll_interval
+        self._is_set = False
+
+    def is_set(self):
+        if not self._is_set:
+            self._is_set = self.connection._is_operation_complete()
+        return self._is_set
+
+    def wait(self, timeout):
+        '''
+        Blocks until the operation is complete or the timeout passed.
+        @param timeout: timeout in seconds
+        @return(bool): True if the operation is complete
+        '''
+        if self._is_set:
+            return True
+        if self.connection.supports_srq:
+            try:
+                self.connection.visa_instrument.wait_for_srq(int(timeout * 1000))
+            except visa.VisaIOError:
+                return self.is_set()
+            return self.is_set()
+        start = time.time()
+        while not self.is_set():
+            if time.time() - start >= timeout:
+                return False
+            time.sleep(self.poll_interval)
+        return True
+
+
+class BatchResponseException(Exception):
+    pass
+
+
+class VerificationException(Exception):
+    '''
+    A setter the instrument didnt apply - names the commands that failed.
+    '''
+
+    def __init__(self, port_name, commands, reason):
+        Exception.__init__(self, '{} : {} failed - {}'.format(port_name, ', '.join(commands), reason))
+        self.port_name = port_name
+        self.commands = commands
+        self.reason = reason
+
+
+class InstrumentErrorException(VerificationException):
+    '''
+    The error queue reported errors for the commands of a block.
+    '''
+    pass
+
+
+class BinaryBlockException(Exception):
+    pass
@@ -0,0 +1,90 @@
+import atexit
+import threading
+import time
+
+from utils.connections.visaCommunication import VisaCommunication
+from utils.stationLogging import get_logger
+
+
+class VisaSessionPool(object):
+    '''
+    Process wide pool of the VISA sessions - one open session per resource address, shared by every driver and every unit of the station.
+    the ResourceManager is loaded once (see visaCommunication.get_resource_manager), and a released session stays open for the next unit.
+    a session that was idle longer than HEALTH_CHECK_IDLE_TIME is health checked before it is handed out, and reopened if it failed;
+    a session that had a bus error is reopened by its next transaction.
+    the sessions are closed by close_all - SystemRFTest.stop_station calls it, and it is registered to run at exit for any other script.
+    '''
+    HEALTH_CHECK_IDLE_TIME = 30.0 # sessions used more recently [s] are handed out without a health check
+    HEALTH_CHECK_QUERY = '*OPC?'
+
+    def __init__(self):
+        self.logger = get_logger('visa_pool')
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def acquire(self, address):
+        '''
+        @param address: the VISA resource address
+        @return(VisaCommunication): the open session of the address
+        '''
+        key = self._key_of(address)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                self.logger.info('Opening VISA session %s', address)
+                session = self._sessions[key] = VisaCommunication(address)
+                return session
+        if time.time() - session.last_io_time > self.HEALTH_CHECK_IDLE_TIME and not session.is_healthy(self.HEALTH_CHECK_QUERY):
+            self.logger.warning('VISA session %s failed its health check, reconnecting', address)
+            session.reconnect()
+        return session
+
+    def release(self, session):
+        '''
+        Returns the session to the pool - it stays open for the next acquire of its address.
+        '''
+        self.logger.debug('VISA session %s released, %s', session.port_name, session.state_cache)
+
+    def close(self, address):
+        '''
+        Closes the session of the address, the next acquire opens a new one.
+        '''
+        with self._lock:
+            session = self._sessions.pop(self._key_of(address), None)
+        if session is not None:
+            self.logger.info('Closing VISA session %s', address)
+            session.close()
+
+    def close_all(self):
+        '''
+        Closes all the sessions - a session that failed closing is logged, and the rest are still closed.
+        '''
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            self.logger.info('Closing VISA session %s', session.port_name)
+            try:
+                session.close()
+            except Exception as e:
+                self.logger.error('Closing VISA session %s failed - %s', session.port_name, e)
+
+    @staticmethod
+    def _key_of(address):
+        '''
+        the sessions of the simulated bench belong to the bench they were opened on
+        '''
+        if str(address).upper().startswith(VisaCommunication.SIMULATOR_PREFIX):
+            from utils.simulators.simulatedBench import get_default_bench
+            return address, get_default_bench()
+        return address
+
+
+_default_pool = VisaSessionPool()
+atexit.register(_default_pool.close_all)
+
+
+def get_session_pool():
+    '''
+    @return(VisaSessionPool): the process wide session pool
+    '''
+    return _default_pool
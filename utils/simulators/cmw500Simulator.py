@@ -0,0 +1,135 @@
+import math
+import time
+
+from utils.simulators.scpiSimulator import SimulatedSCPIInstrument
+
+
+class SimulatedCMW500(SimulatedSCPIInstrument):
+    '''
+    R&S CMW500 WLAN signaling - channel states with a settle time, client association, PER runs that follow the bench PER curve.
+    '''
+    IDENTITY = 'Rohde&Schwarz,CMW500,1201.0002k50/000000,3.7.30'
+    SETTING_PREFIXES = ('CONF:', 'ROUT:')
+    APPROXIMATE_BURST_OFFSET = 3.0 # the approximate rx burst power is the EPEP power minus this offset
+    DEFAULT_SETTINGS = dict(item for signaling_channel in '1234' for item in (('CONF:WLAN:SIGN{}:RFS:BOP'.format(signaling_channel), '-40.0'),
+                                                                              ('CONF:WLAN:SIGN{}:RFS:EPEP'.format(signaling_channel), '-20.0'),
+                                                                              ('CONF:WLAN:SIGN{}:RFS:CHAN'.format(signaling_channel), '1'),
+                                                                              ('CONF:WLAN:SIGN{}:PER:PACK'.format(signaling_channel), '1000')))
+
+    def __init__(self, address, bench):
+        SimulatedSCPIInstrument.__init__(self, address, bench)
+        self.add_handler(r'SOUR:WLAN:SIGN(\d):STAT', self._set_channel_state)
+        self.add_handler(r'SOUR:WLAN:SIGN(\d):STAT\?', lambda match, args: self._channel_state(match.group(1)))
+        self.add_handler(r'CONF:WLAN:SIGN(\d):RFS:BOP', self._set_ap_power)
+        self.add_handler(r'FETC:WLAN:SIGN(\d):(PS|CS)W:STAT\?', lambda match, args: 'ASS' if self._is_associated(match.group(1)) else 'IDLE')
+        self.add_handler(r'CALL:WLAN:SIGN(\d):ACT:DISC', lambda match, args: self._dropped.add(match.group(1)))
+        self.add_handler(r'SENS:WLAN:SIGN(\d):UES:ARXB\?', lambda match, args: self._approximate_burst_power(match.group(1)))
+        self.add_handler(r'SENS:WLAN:SIGN(\d):UES:RXBP\?', lambda match, args: '{:.2f}'.format(self.bench.uut.cw_power))
+        self.add_handler(r'SENS:WLAN:SIGN(\d):UES:UEAD:IPV4\?', lambda match, args: '"192.168.1.{}"'.format(10 + int(match.group(1))))
+        self.add_handler(r'SENS:WLAN:SIGN(\d):UES:UEAD:IPV6\?', lambda match, args: '"fe80::{}"'.format(match.group(1)))
+        self.add_handler(r'SENS:WLAN:SIGN(\d):UEC:MAC:ADDR\?', lambda match, args: '"00:1A:2B:3C:4D:5{}"'.format(match.group(1)))
+        self.add_handler(r'SENS:WLAN:SIGN(\d):ELOG:ALL\?', lambda match, args: 'EMPT,""')
+        self.add_handler(r'INIT:WLAN:SIGN(\d):PER', self._start_per)
+        self.add_handler(r'ABOR(T)?:WLAN:SIGN(\d):PER', lambda match, args: self._abort_per(match.group(2)))
+        self.add_handler(r'FETC:WLAN:SIGN(\d):PER:STAT:ALL\?', lambda match, args: self._per_state(match.group(1)))
+        self.add_handler(r'FETC:WLAN:SIGN(\d):PER\?', lambda match, args: self._per_results(match.group(1)))
+
+    def preset(self):
+        SimulatedSCPIInstrument.preset(self)
+        self._channel_on_at = {}
+        self._dropped = set()
+        self._per_runs = {}
+
+    def operations_complete_at(self):
+        pending = [on_at for on_at in self._channel_on_at.values()]
+        pending += [run.finished_at for run in self._per_runs.values() if not run.aborted]
+        return max(pending) if pending else 0
+
+    def _is_setting(self, header):
+        return header.startswith(self.SETTING_PREFIXES)
+
+    def _set_channel_state(self, match, arguments):
+        channel = match.group(1)
+        if arguments and arguments[0].upper() == 'ON':
+            self._channel_on_at.setdefault(channel, time.time() + self.timing.channel_settle_time)
+        else:
+            self._channel_on_at.pop(channel, None)
+            self._per_runs.pop(channel, None)
+
+    def _channel_state(self, channel):
+        return 'ON' if self._is_channel_on(channel) else 'OFF'
+
+    def _is_channel_on(self, channel):
+        return channel in self._channel_on_at and time.time() >= self._channel_on_at[channel]
+
+    def _ap_power(self, channel):
+        return float(self.settings['CONF:WLAN:SIGN{}:RFS:BOP'.format(channel)])
+
+    def _set_ap_power(self, match, arguments):
+        channel = match.group(1)
+        self.settings['CONF:WLAN:SIGN{}:RFS:BOP'.format(channel)] = arguments[0]
+        self._dropped.discard(channel)
+        if self.bench.random.random() < self.bench.association_drop_probability:
+            self._dropped.add(channel)
+
+    def _is_associated(self, channel):
+        return (self._is_channel_on(channel) and self.bench.uut.mode == self.bench.uut.RX_MODE and channel not in self._dropped
+                and self._ap_power(channel) >= self.bench.association_drop_power)
+
+    def _approximate_burst_power(self, channel):
+        return '{:.2f}'.format(float(self.settings['CONF:WLAN:SIGN{}:RFS:EPEP'.format(channel)]) - self.APPROXIMATE_BURST_OFFSET)
+
+    def _start_per(self, match, arguments):
+        channel = match.group(1)
+        if not self._is_associated(channel):
+            self._per_runs.pop(channel, None)
+            return
+        packets_amount = int(self.settings['CONF:WLAN:SIGN{}:PER:PACK'.format(channel)])
+        self._per_runs[channel] = SimulatedPERRun(packets_amount, self.bench.per_curve.per(self._ap_power(channel)), self.timing.per_packets_per_second, self.bench.random)
+
+    def _abort_per(self, channel):
+        if channel in self._per_runs:
+            self._per_runs[channel].abort()
+
+    def _per_state(self, channel):
+        run = self._per_runs.get(channel)
+        if run is None:
+            return 'OFF,INV,INV'
+        return 'RUN,ADJ,ACT' if run.packets_sent() < run.packets_amount and not run.aborted else 'RDY,ADJ,INV'
+
+    def _per_results(self, channel):
+        run = self._per_runs.get(channel)
+        if run is None:
+            return 'INV,INV,INV'
+        packets_sent = run.packets_sent()
+        return '0,{:.3f},{}'.format(run.per(packets_sent), packets_sent)
+
+
+class SimulatedPERRun(object):
+    '''
+    A PER run - packets are sent at a constant rate, and every packet is lost with the probability of the true PER.
+    '''
+
+    def __init__(self, packets_amount, true_per, packets_per_second, generator):
+        self.packets_amount = packets_amount
+        self.started_at = time.time()
+        self.finished_at = self.started_at + packets_amount / float(packets_per_second)
+        self.packets_per_second = packets_per_second
+        self.aborted = False
+        self._aborted_packets = None
+        self._lost = [generator.random() < true_per / 100.0 for _ in range(packets_amount)]
+
+    def packets_sent(self):
+        if self._aborted_packets is not None:
+            return self._aborted_packets
+        return min(int(math.floor((time.time() - self.started_at) * self.packets_per_second)), self.packets_amount)
+
+    def abort(self):
+        if not self.aborted:
+            self._aborted_packets = self.packets_sent()
+            self.aborted = True
+
+    def per(self, packets_sent):
+        if packets_sent == 0:
+            return 0.0
+        return 100.0 * sum(self._lost[:packets_sent]) / packets_sent
@@ -0,0 +1,114 @@
+import math
+import struct
+import time
+
+from utils.simulators.scpiSimulator import SimulatedSCPIInstrument
+
+
+class SimulatedKeysightCXA(SimulatedSCPIInstrument):
+    '''
+    Keysight CXA N9000B - the peak is the CW of the bench UUT when it is inside the span, with gaussian noise, otherwise the noise floor.
+    the trace is the noise floor with the CW shaped by the resolution bandwidth, in the FORM:DATA format and the FORM:BORD byte order.
+    the list sweep measures its next point on every *TRG, at the UUT CW of that moment.
+    '''
+    IDENTITY = 'Keysight CXA N9000B,SIM00001,A.24.05'
+    SETTING_PREFIXES = ('SPEC:', 'FORM:', 'SWE:', 'LIST:')
+    DEFAULT_SETTINGS = {'SPEC:REF': '0.0',
+                        'SPEC:CENT': '1000000000.0',
+                        'SPEC:SPAN': '10000000.0',
+                        'FORM:DATA': 'ASC,8',
+                        'FORM:BORD': 'NORM',
+                        'SWE:POIN': '1001',
+                        'LIST:FREQ': '1000000000.0',
+                        'LIST:SWE:TIME': '0.001',
+                        'LIST:BAND:RES': '10000.0',
+                        'LIST:TRIG:SOUR': 'IMM'}
+    RESOLUTION_BANDWIDTH_RATIO = 0.01 # the resolution bandwidth of the simulated sweep, relative to the span
+    INT32_SCALE = 1000 # INT,32 trace points are in 1/1000 dBm
+
+    def __init__(self, address, bench):
+        SimulatedSCPIInstrument.__init__(self, address, bench)
+        self.add_handler(r'SPEC:PEAK\?', lambda match, args: '{:.3f}'.format(self._sweep_peak()))
+        self.add_handler(r'TRAC(E)?(:DATA)?\?', lambda match, args: self._trace_data())
+        self.add_handler(r'BAND(:RES)?\?', lambda match, args: repr(self._resolution_bandwidth()))
+        self.add_handler(r'INIT:LIST', lambda match, args: self._init_list())
+        self.add_handler(r'\*TRG', lambda match, args: self._trigger_list_point())
+        self.add_handler(r'FETC:LIST\?', lambda match, args: ','.join('{:.3f}'.format(peak) for peak in self._list_peaks))
+        self.add_handler(r'CLOS', lambda match, args: None)
+
+    def preset(self):
+        SimulatedSCPIInstrument.preset(self)
+        self._list_peaks = []
+
+    def _is_setting(self, header):
+        return header.startswith(self.SETTING_PREFIXES)
+
+    def _resolution_bandwidth(self):
+        '''
+        the RBW is coupled to the span
+        '''
+        return float(self.settings['SPEC:SPAN']) * self.RESOLUTION_BANDWIDTH_RATIO
+
+    def _is_cw_in_span(self, center, span):
+        uut = self.bench.uut
+        return uut.mode == uut.CW_MODE and uut.cw_frequency is not None and abs(uut.cw_frequency - center) <= span / 2.0
+
+    def _sweep_peak(self):
+        time.sleep(self.timing.sweep_time)
+        center = float(self.settings['SPEC:CENT'])
+        span = float(self.settings['SPEC:SPAN'])
+        uut = self.bench.uut
+        if self._is_cw_in_span(center, span):
+            return uut.cw_power - self.bench.path_loss + self.bench.random.gauss(0, self.bench.peak_noise)
+        return self.bench.noise_floor + self.bench.random.gauss(0, self.bench.peak_noise)
+
+    def _cw_level(self, frequency, resolution_bandwidth):
+        '''
+        @return: the level of the UUT CW at the frequency, shaped by the resolution bandwidth - None if it is buried in the noise floor
+        '''
+        uut = self.bench.uut
+        if uut.mode != uut.CW_MODE or uut.cw_frequency is None:
+            return None
+        offset = (frequency - uut.cw_frequency) / resolution_bandwidth
+        if abs(offset) >= 5:
+            return None
+        return uut.cw_power - self.bench.path_loss - 10 * math.log10(math.e) * 4 * math.log(2) * offset ** 2 + self.bench.random.gauss(0, self.bench.peak_noise)
+
+    def _init_list(self):
+        self._list_peaks = []
+
+    def _trigger_list_point(self):
+        frequencies = [float(frequency) for frequency in self.settings['LIST:FREQ'].split(',')]
+        if len(self._list_peaks) >= len(frequencies):
+            self._errors.append('-211,"Trigger ignored"')
+            return None
+        noise = self.bench.noise_floor + self.bench.random.gauss(0, self.bench.peak_noise)
+        cw = self._cw_level(frequencies[len(self._list_peaks)], float(self.settings['LIST:BAND:RES']))
+        self._list_peaks.append(noise if cw is None else max(noise, cw))
+        return None
+
+    def _sweep_trace(self):
+        time.sleep(self.timing.sweep_time)
+        center = float(self.settings['SPEC:CENT'])
+        span = float(self.settings['SPEC:SPAN'])
+        points = int(self.settings['SWE:POIN'])
+        start = center - span / 2.0
+        step = span / (points - 1) if points > 1 else 0.0
+        levels = [self.bench.noise_floor + self.bench.random.gauss(0, self.bench.peak_noise) for _ in range(points)]
+        if self._is_cw_in_span(center, span):
+            resolution_bandwidth = self._resolution_bandwidth()
+            for index in range(points):
+                cw = self._cw_level(start + index * step, resolution_bandwidth)
+                if cw is not None:
+                    levels[index] = max(levels[index], cw)
+        return levels
+
+    def _trace_data(self):
+        levels = self._sweep_trace()
+        data_format = self.settings['FORM:DATA'].upper().replace(' ', '')
+        byte_order = '<' if self.settings['FORM:BORD'].upper().startswith('SWAP') else '>'
+        if data_format.startswith('REAL'):
+            return self.definite_length_block(struct.pack('{}{}f'.format(byte_order, len(levels)), *levels))
+        if data_format.startswith('INT'):
+            return self.definite_length_block(struct.pack('{}{}i'.format(byte_order, len(levels)), *[int(round(level * self.INT32_SCALE)) for level in levels]))
+        return ','.join('{:.3f}'.format(level) for level in levels)
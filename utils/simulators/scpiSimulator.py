@@ -0,0 +1,142 @@
+import re
+import threading
+import time
+
+
+class SimulatedSCPIInstrument(object):
+    '''
+    Base of the in-process SCPI instruments - behaves like an open VISA resource (write/read/close).
+    every write is split to its ';' separated commands, the answers of the queries in it are read back as one ';' separated response.
+    settings without a dedicated handler are stored as they were written and returned by the matching query.
+    '''
+    IDENTITY = ''
+    DEFAULT_SETTINGS = {}
+    ENCODING = 'iso-8859-1'
+
+    def __init__(self, address, bench):
+        self.address = address
+        self.bench = bench
+        self.timing = bench.timing
+        self._responses = []
+        self._errors = []
+        self._lock = threading.RLock()
+        self._handlers = []
+        self._event_status = 0
+        self._opc_armed_at = None
+        self._saved_states = {}
+        self.preset()
+        self.add_handler(r'\*IDN\?', lambda match, args: self.IDENTITY)
+        self.add_handler(r'\*RST|SYST:PRES(:ALL)?', lambda match, args: self.preset())
+        self.add_handler(r'\*CLS', lambda match, args: self._clear_status())
+        self.add_handler(r'\*ESE\??|\*SRE\??', self._status_enable)
+        self.add_handler(r'\*ESR\?', lambda match, args: str(self._read_event_status()))
+        self.add_handler(r'\*OPC', lambda match, args: self._arm_opc())
+        self.add_handler(r'\*OPC\?', lambda match, args: self._wait_operations_complete())
+        self.add_handler(r'SYST:ERR\?', lambda match, args: self._errors.pop(0) if self._errors else '0,"No error"')
+        self.add_handler(r'\*SAV', self._save_state)
+        self.add_handler(r'\*RCL', self._recall_state)
+
+    def add_handler(self, pattern, handler):
+        '''
+        @param pattern: regular expression of the command header (without arguments)
+        @param handler: callable(match, arguments) - returns the answer of a query, None for a command
+        '''
+        self._handlers.append((re.compile(pattern + '$', re.IGNORECASE), handler))
+
+    def preset(self):
+        self.settings = dict(self.DEFAULT_SETTINGS)
+
+    def operations_complete_at(self):
+        '''
+        @return: the time when all the pending overlapped operations are complete
+        '''
+        return 0
+
+    def write(self, message):
+        time.sleep(self.timing.command_latency)
+        with self._lock:
+            answers = []
+            for command in message.split(';'):
+                command = command.strip().lstrip(':')
+                if command:
+                    answer = self._execute(command)
+                    if answer is not None:
+                        answers.append(answer if isinstance(answer, bytes) else str(answer).encode(self.ENCODING))
+            if answers:
+                self._responses.append(b';'.join(answers) + b'\n')
+
+    def read(self, termination = None):
+        return self.read_raw().decode(self.ENCODING)
+
+    def read_raw(self, size = None):
+        time.sleep(self.timing.command_latency)
+        with self._lock:
+            if not self._responses:
+                self._errors.append('-420,"Query UNTERMINATED"')
+                raise SimulatedTimeoutError('{} : read timeout - no query is waiting for an answer'.format(self.address))
+            return self._responses.pop(0)
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def definite_length_block(data):
+        '''
+        @return(bytes): the data as an IEEE 488.2 definite length block - #<digits of the length><length><data>
+        '''
+        length = str(len(data))
+        return '#{}{}'.format(len(length), length).encode('ascii') + data
+
+    def _execute(self, command):
+        header, _, arguments = command.partition(' ')
+        arguments = [argument.strip().strip('"') for argument in arguments.split(',')] if arguments.strip() else []
+        for pattern, handler in self._handlers:
+            match = pattern.match(header)
+            if match:
+                return handler(match, arguments)
+        if header.endswith('?') and header[:-1].upper() in self.settings:
+            return self.settings[header[:-1].upper()]
+        if not header.endswith('?') and arguments and self._is_setting(header.upper()):
+            self.settings[header.upper()] = ','.join(arguments)
+            return None
+        self._errors.append('-113,"Undefined header;{}"'.format(command))
+        return None
+
+    def _is_setting(self, header):
+        return True
+
+    def _save_state(self, match, arguments):
+        self._saved_states[arguments[0] if arguments else '0'] = dict(self.settings)
+
+    def _recall_state(self, match, arguments):
+        register = arguments[0] if arguments else '0'
+        if register not in self._saved_states:
+            self._errors.append('-222,"Data out of range;*RCL {}"'.format(register))
+            return None
+        self.settings = dict(self._saved_states[register])
+
+    def _status_enable(self, match, arguments):
+        return '0' if match.group(0).endswith('?') else None
+
+    def _arm_opc(self):
+        self._opc_armed_at = max(time.time(), self.operations_complete_at())
+
+    def _read_event_status(self):
+        if self._opc_armed_at is not None and time.time() >= self._opc_armed_at:
+            self._event_status |= 0x01
+            self._opc_armed_at = None
+        event_status, self._event_status = self._event_status, 0
+        return event_status
+
+    def _clear_status(self):
+        self._event_status = 0
+        self._opc_armed_at = None
+        del self._errors[:]
+
+    def _wait_operations_complete(self):
+        time.sleep(max(self.operations_complete_at() - time.time(), 0))
+        return '1'
+
+
+class SimulatedTimeoutError(IOError):
+    pass
@@ -0,0 +1,140 @@
+import math
+import random
+import threading
+
+from utils.simulators.cmw500Simulator import SimulatedCMW500
+from utils.simulators.keysightCXASimulator import SimulatedKeysightCXA
+from utils.simulators.tigerUUTSimulator import SimulatedTigerUUTPort
+
+
+class SimulationTiming(object):
+    '''
+    The timing of the simulated bench, all the times are in seconds.
+    '''
+
+    def __init__(self, command_latency = 0.002, per_packets_per_second = 2000, channel_settle_time = 0.2, uut_boot_time = 0.5,
+                 uut_response_latency = 0.005, sweep_time = 0.05):
+        '''
+        @param command_latency: the bus latency of every VISA write and read
+        @param per_packets_per_second: the rate of the PER packets of the CMW500
+        @param channel_settle_time: the time a CMW500 signaling channel takes to turn on
+        @param uut_boot_time: the time the UUT doesnt answer after its port was opened
+        @param uut_response_latency: the time the UUT takes to answer a query
+        @param sweep_time: the time of a spectrum analyzer sweep
+        '''
+        self.command_latency = command_latency
+        self.per_packets_per_second = per_packets_per_second
+        self.channel_settle_time = channel_settle_time
+        self.uut_boot_time = uut_boot_time
+        self.uut_response_latency = uut_response_latency
+        self.sweep_time = sweep_time
+
+
+class PERCurve(object):
+    '''
+    PER [%] vs the AP power - a logistic curve, the PER is 50% at the midpoint power.
+    '''
+
+    def __init__(self, midpoint = -79.0, slope = 0.8):
+        '''
+        @param midpoint: the AP power [dBm] of 50% PER
+        @param slope: how steep the PER rises below the midpoint [1/dB]
+        '''
+        self.midpoint = midpoint
+        self.slope = slope
+
+    def per(self, power):
+        return 100.0 / (1.0 + math.exp(self.slope * (power - self.midpoint)))
+
+
+class SimulatedUUTState(object):
+    '''
+    The RF state of the simulated UUT, shared by its serial port and the instruments it is connected to.
+    '''
+    RX_MODE = 'SYS_RX'
+    CW_MODE = 'SYS_CW'
+
+    def __init__(self, cw_power = 10.0):
+        self.mode = None
+        self.cw_frequency = None
+        self.cw_power = cw_power
+
+
+class SimulatedBench(object):
+    '''
+    A CMW500, a Keysight CXA and a Tiger UUT that are connected to each other.
+    VisaCommunication opens the instruments of the bench by their SIM:: address, SerialCommunication opens the UUT by its sim:// URL.
+    '''
+    CMW500_ADDRESS = 'SIM::CMW500::18'
+    CXA_ADDRESS = 'SIM::CXA::20'
+    UUT_URL = 'sim://tiger'
+    INSTRUMENT_CLASSES = {'CMW500': SimulatedCMW500,
+                          'CXA': SimulatedKeysightCXA}
+
+    def __init__(self, timing = None, per_curve = None, seed = None, association_drop_power = -90.0, association_drop_probability = 0.0,
+                 peak_noise = 0.1, path_loss = 0.5, noise_floor = -90.0, cw_power = 10.0):
+        '''
+        @param timing(SimulationTiming): the latencies and settle times
+        @param per_curve(PERCurve): the PER vs AP power of the UUT
+        @param seed: the seed of the random generator, for repeatable runs
+        @param association_drop_power: the UUT isnt associated below this AP power [dBm]
+        @param association_drop_probability: the chance the UUT drops the association when the AP power changes
+        @param peak_noise: the standard deviation of the peaks the spectrum analyzer measures [dB]
+        @param path_loss: the loss between the UUT and the spectrum analyzer [dB]
+        @param noise_floor: the peak the spectrum analyzer measures when the CW is out of span [dBm]
+        @param cw_power: the CW power the UUT transmits [dBm]
+        '''
+        self.timing = timing or SimulationTiming()
+        self.per_curve = per_curve or PERCurve()
+        self.random = random.Random(seed)
+        self.association_drop_power = association_drop_power
+        self.association_drop_probability = association_drop_probability
+        self.peak_noise = peak_noise
+        self.path_loss = path_loss
+        self.noise_floor = noise_floor
+        self.uut = SimulatedUUTState(cw_power)
+        self.visa_wrapper = None
+        self.serial_wrapper = None
+        self._instruments = {}
+        self._lock = threading.Lock()
+
+    def open_resource(self, address):
+        '''
+        @param address: SIM::<instrument>::<address>, the instrument is one of INSTRUMENT_CLASSES
+        @return: the instrument of the address, an address opened again gets the same instrument
+        '''
+        with self._lock:
+            if address not in self._instruments:
+                parts = address.split('::')
+                if len(parts) < 2 or parts[1].upper() not in self.INSTRUMENT_CLASSES:
+                    raise ValueError('Unknown simulated instrument {}, supported: {}'.format(address, sorted(self.INSTRUMENT_CLASSES)))
+                self._instruments[address] = self.INSTRUMENT_CLASSES[parts[1].upper()](address, self)
+            instrument = self._instruments[address]
+        return self.visa_wrapper(instrument) if self.visa_wrapper else instrument
+
+    def open_serial_port(self, url, baudrate = 115200, timeout = 1):
+        port = SimulatedTigerUUTPort(url, self, baudrate, timeout)
+        return self.serial_wrapper(port) if self.serial_wrapper else port
+
+    def set_transport_wrappers(self, visa_wrapper = None, serial_wrapper = None):
+        '''
+        @param visa_wrapper: callable that gets an opened instrument and returns the object the connection uses, None to use it as is
+        @param serial_wrapper: callable that gets an opened UUT port and returns the object the connection uses, None to use it as is
+        '''
+        self.visa_wrapper = visa_wrapper
+        self.serial_wrapper = serial_wrapper
+
+
+_default_bench = SimulatedBench()
+
+
+def get_default_bench():
+    return _default_bench
+
+
+def set_default_bench(bench):
+    '''
+    Replaces the bench the SIM:: and sim:// connections are opened on.
+    '''
+    global _default_bench
+    _default_bench = bench
@@ -0,0 +1,88 @@
+import threading
+import time
+
+from serial import SerialException
+
+
+class SimulatedTigerUUTPort(object):
+    '''
+    The serial port of a Tiger UUT - behaves like an open pyserial port (write/read/in_waiting).
+    the UUT doesnt answer until it finished booting, and answers every query line after the response latency.
+    '''
+    VERSION = 'Version: 1.0.0-sim'
+
+    def __init__(self, url, bench, baudrate = 115200, timeout = 1):
+        self.url = url
+        self.bench = bench
+        self.timing = bench.timing
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.is_open = True
+        self._booted_at = time.time() + self.timing.uut_boot_time
+        self._input = b''
+        self._output = []
+        self._condition = threading.Condition()
+        self.bench.uut.mode = None
+
+    @property
+    def in_waiting(self):
+        with self._condition:
+            return sum(len(data) for available_at, data in self._output if available_at <= time.time())
+
+    def reset_input_buffer(self):
+        with self._condition:
+            self._output = []
+
+    def reset_output_buffer(self):
+        pass
+
+    def write(self, data):
+        with self._condition:
+            self._input += data
+            while b'\n' in self._input:
+                line, self._input = self._input.split(b'\n', 1)
+                answer = self._execute(line.decode('iso-8859-1').strip())
+                if answer is not None and time.time() >= self._booted_at:
+                    self._output.append((time.time() + self.timing.uut_response_latency, (answer + '\r\n').encode('iso-8859-1')))
+                    self._condition.notify_all()
+        return len(data)
+
+    def read(self, size = 1):
+        deadline = time.time() + (self.timeout if self.timeout is not None else 3600)
+        with self._condition:
+            while self.is_open:
+                if self._output and self._output[0][0] <= time.time():
+                    available_at, data = self._output.pop(0)
+                    if len(data) > size:
+                        self._output.insert(0, (available_at, data[size:]))
+                    return data[:size]
+                now = time.time()
+                if now >= deadline:
+                    return b''
+                wait = deadline - now
+                if self._output:
+                    wait = min(wait, max(self._output[0][0] - now, 0.0005))
+                self._condition.wait(wait)
+            raise SerialException('{} is closed'.format(self.url))
+
+    def close(self):
+        with self._condition:
+            self.is_open = False
+            self._condition.notify_all()
+
+    def _execute(self, line):
+        if time.time() < self._booted_at:
+            return None
+        uut = self.bench.uut
+        words = line.split()
+        if line == 'GetVersion':
+            return self.VERSION
+        if line == 'get system mode':
+            return uut.mode
+        if len(words) == 3 and words[:2] == ['system', 'state']:
+            uut.mode = words[2]
+            return None
+        if len(words) == 2 and words[0] == 'CW':
+            uut.cw_frequency = float(words[1])
+            return None
+        return None if not line else 'Unknown command: {}'.format(line)
@@ -0,0 +1,109 @@
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+
+ROOT_LOGGER_NAME = 'tiger'
+LOG_FORMAT = '%(asctime)s %(levelname)-7s %(threadName)s %(source)s : %(message)s'
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def get_logger(name, instrument = None):
+    '''
+    Returns the named logger of a driver or a test - the messages are formatted lazily, only if their level is enabled:
+    logger.debug('PER of channel %s is %s', channel, per) costs a level check when debug is off.
+    @param name: the logger name under the station logger, like cmw500.wlan
+    @param instrument: the port name or address of the driver instance, shown with every message
+    @return(StationLoggerAdapter): the logger
+    '''
+    return StationLoggerAdapter(logging.getLogger('{}.{}'.format(ROOT_LOGGER_NAME, name)), instrument)
+
+
+def configure_logging(log_file_path = None, level = logging.INFO, console = True):
+    '''
+    Routes the station loggers through a queue to a background thread, that formats the records and writes them to the console and the file.
+    the calling threads only put the record on the queue. calling it again replaces the previous configuration.
+    @param log_file_path: path of the log file, None for no file
+    @param level: the lowest level that is logged
+    @param console: True to write the records to stdout too
+    '''
+    global _listener
+    with _listener_lock:
+        _stop_listener()
+        formatter = StationFormatter(LOG_FORMAT)
+        handlers = []
+        if console:
+            handlers.append(logging.StreamHandler(sys.stdout))
+        if log_file_path is not None:
+            handlers.append(logging.FileHandler(log_file_path))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        records = queue.Queue()
+        root = logging.getLogger(ROOT_LOGGER_NAME)
+        root.setLevel(level)
+        root.propagate = False
+        root.addHandler(DeferredQueueHandler(records))
+        _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level = True)
+        _listener.start()
+
+
+def set_level(level):
+    logging.getLogger(ROOT_LOGGER_NAME).setLevel(level)
+
+
+def shutdown_logging():
+    '''
+    Writes the queued records and closes the console and file handlers.
+    '''
+    with _listener_lock:
+        _stop_listener()
+
+
+def is_logging_configured():
+    return _listener is not None
+
+
+def _stop_listener():
+    global _listener
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    for handler in root.handlers[:]:
+        if isinstance(handler, DeferredQueueHandler):
+            root.removeHandler(handler)
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+class StationLoggerAdapter(logging.LoggerAdapter):
+    '''
+    Adds the instrument of the driver instance to the records.
+    '''
+
+    def __init__(self, logger, instrument = None):
+        logging.LoggerAdapter.__init__(self, logger, {'instrument': instrument})
+
+
+class StationFormatter(logging.Formatter):
+    '''
+    Formats the record source as logger_name(instrument), or just the logger name if the record has no instrument.
+    '''
+
+    def format(self, record):
+        name = record.name[len(ROOT_LOGGER_NAME) + 1:] if record.name.startswith(ROOT_LOGGER_NAME + '.') else record.name
+        instrument = getattr(record, 'instrument', None)
+        record.source = '{}({})'.format(name, instrument) if instrument is not None else name
+        return logging.Formatter.format(self, record)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    '''
+    Queues the record as is - the message is merged with its arguments by the listener thread instead of the logging thread.
+    '''
+
+    def prepare(self, record):
+        return record
@@ -1,15 +1,20 @@
 
 
+import numpy
+
+
 class Validation(object):
     @classmethod
-    def check_identical_value(cls, title, current_value, expected_value):
+    def check_identical_value(cls, title, current_value, expected_value, cast = None):
         '''
         Generic function to check that two values are identical.
         @param current_value: First value to compare
         @param expected_value: Second value to compare
+        @param cast(cast type): cast both values to this type (strings are stripped first), can be None incase no cast needed
         @raise ValueError: In case value is empty or not equal
         '''
-
+        if cast is not None:
+            current_value, expected_value = cls._cast_value(current_value, cast), cls._cast_value(expected_value, cast)
         if not cls.is_identical_value(current_value, expected_value):
             raise ValueError("{} expected value = {}, current value = {}".format(title.title(), expected_value, current_value))
     
@@ -23,10 +28,20 @@ class Validation(object):
         @raise exception: if any an element of elements_list is not in supported_list, raise exception(info)
         @note: a single value can be inserted as elements_list or supported_list
         '''
+        elements_list, supported_list = cls._as_list(elements_list), cls._as_list(supported_list)
         for element in elements_list:
             if element not in supported_list:
                 raise exception("{} - {} not in {}".format(title, element, supported_list))
     
+    @classmethod
+    def _as_list(cls, value):
+        '''
+        @return: the value if it is a list of values, otherwise a list of the single value (strings are single values)
+        '''
+        if isinstance(value, (list, tuple, set, frozenset, range)):
+            return value
+        return [value]
+
     @classmethod
     def is_identical_value(cls, current_val, expected_val):
         '''
@@ -37,6 +52,25 @@ class Validation(object):
         result = (current_val == expected_val)
         return result
     
+    @classmethod
+    def validate_limits_abs_tolerance(cls, title, current_val, expected_val, tolerance, cast = float):
+        '''
+        validate value is close to the expected value
+        @param current_val,expected_val: |current_val - expected_val| <= tolerance
+        @param tolerance(int\float): the allowed absolute difference
+        @param cast(cast type): cast both values to this type (strings are stripped first)
+        @raise ValueError: In case the difference is bigger than the tolerance
+        '''
+        current_val, expected_val = cls._cast_value(current_val, cast), cls._cast_value(expected_val, cast)
+        if abs(current_val - expected_val) > tolerance:
+            raise ValueError("{} expected value = {} +- {}, current value = {}".format(title.title(), expected_val, tolerance, current_val))
+
+    @classmethod
+    def _cast_value(cls, value, cast):
+        if isinstance(value, str):
+            value = value.strip()
+        return cast(value)
+
     @classmethod
     def validate_limits_min_max(cls, current_val, min_limit, max_limit, info = "value is out-of-limits", exception = Exception):
         '''
@@ -58,6 +92,32 @@ class Validation(object):
         result = (min_limit <= current_val <= max_limit)
         return result
 
+    @classmethod
+    def evaluate_limits(cls, values, min_limits = None, max_limits = None):
+        '''
+        check many values against their limits in one vectorized call - nothing is raised, the out-of-limits values are marked in the mask
+        @param values(array like): the measured values, any shape - NaN values fail
+        @param min_limits,max_limits(array like\float): the limits, broadcast against the values - None (as a whole or per element) for no limit on that side
+        @return(tuple): the pass mask (bool array) and the margins (float array) - the distance to the nearest limit, negative when out-of-limits
+        '''
+        values = numpy.asarray(values, dtype = float)
+        min_limits = cls._limits_array(min_limits, -numpy.inf)
+        max_limits = cls._limits_array(max_limits, numpy.inf)
+        mask = (min_limits <= values) & (values <= max_limits)
+        with numpy.errstate(invalid = 'ignore'):
+            margins = numpy.fmin(values - min_limits, max_limits - values) # fmin - an infinite value against an infinite limit has the margin of its other side
+        return mask, margins
+
+    @classmethod
+    def _limits_array(cls, limits, unbounded):
+        '''
+        @return: the limits as a float array, the None limits replaced by the unbounded limit
+        '''
+        if limits is None:
+            return numpy.asarray(unbounded, dtype = float)
+        limits = numpy.asarray(limits, dtype = object)
+        return numpy.where(numpy.equal(limits, None), unbounded, limits).astype(float)
+
     @classmethod
     def validate_input_parameter_in_range(self, name, value, from_val = None, to_val = None, exception = ValueError):
         '''